@@ -0,0 +1,69 @@
+"""
+Admin paneli senaryo listesi. Liste sayfalı (keyset: id > son görülen id) ve hafif kolonlarla
+döner; code_payload ve uzun metinler sadece satır seçilince get_scenario ile gelir.
+Index'ler: sql/007_scenario_search.sql
+"""
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+LIST_SQL = """
+    SELECT scenario_id AS id, group_name, risk_title, source_type, is_active, is_pinned
+    FROM scenarios
+    WHERE scenario_id > %(after)s
+      AND (%(group)s::text IS NULL OR group_name = %(group)s)
+      AND (%(pattern)s::text IS NULL OR
+           ghost_scenario_search_text(risk_title, group_name, risk_message, description) ILIKE %(pattern)s)
+    ORDER BY scenario_id
+    LIMIT %(limit)s
+"""
+
+DETAIL_SQL = """
+    SELECT scenario_id AS id, group_name, risk_title, description, code_payload, source_type,
+           risk_message, legislation, risk_reason, solution_suggestion,
+           cross_check_rule AS cross_check, is_active, is_pinned, payload_hash
+    FROM scenarios
+    WHERE scenario_id = %s
+"""
+
+GROUPS_SQL = """
+    SELECT group_name FROM scenario_groups
+    UNION
+    SELECT DISTINCT group_name FROM scenarios WHERE group_name IS NOT NULL
+    ORDER BY 1
+"""
+
+
+def _like_pattern(text):
+    # Kullanıcının yazdığı % ve _ joker olarak yorumlanmasın
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{text}%"
+
+
+def list_scenarios(conn, group=None, q=None, after=0, limit=PAGE_SIZE):
+    """Bir sayfa senaryo döner. next_cursor None ise son sayfadır."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    q = (q or "").strip()
+    cursor = conn.cursor()
+    # Bir fazla satır çekip sonraki sayfa var mı anlaşılır (COUNT(*) yok)
+    cursor.execute(LIST_SQL, {
+        "after": int(after or 0),
+        "group": group or None,
+        "pattern": _like_pattern(q) if q else None,
+        "limit": limit + 1,
+    })
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"items": rows, "next_cursor": rows[-1]["id"] if has_more else None}
+
+
+def get_scenario(conn, scenario_id):
+    cursor = conn.cursor()
+    cursor.execute(DETAIL_SQL, (scenario_id,))
+    return cursor.fetchone()
+
+
+def list_groups(conn):
+    cursor = conn.cursor()
+    cursor.execute(GROUPS_SQL)
+    return [row["group_name"] for row in cursor.fetchall()]
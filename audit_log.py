@@ -0,0 +1,314 @@
+import os
+import glob
+import json
+import time
+import uuid
+import fcntl
+import threading
+from collections import deque
+
+from psycopg2.extras import execute_values
+
+from db_pool import get_pool
+from metrics import Gauge, COLLECTORS
+
+# sync  : log satırı kredi düşümüyle aynı SQL'de yazılır (varsayılan, eski davranış)
+# async : bellekte kuyruk, toplu INSERT; çökmede kuyruktaki kayıtlar kaybolabilir
+# spool : kayıt önce yerel dosyaya yazılır (write-ahead), toplu INSERT sonrası silinir
+AUDIT_LOG_MODE = os.environ.get("AUDIT_LOG_MODE", "sync").lower()
+AUDIT_LOG_BATCH = int(os.environ.get("AUDIT_LOG_BATCH", "500"))
+AUDIT_LOG_INTERVAL = float(os.environ.get("AUDIT_LOG_INTERVAL", "1.0"))
+AUDIT_LOG_MAX_QUEUE = int(os.environ.get("AUDIT_LOG_MAX_QUEUE", "100000"))
+AUDIT_LOG_SPOOL_DIR = os.environ.get("AUDIT_LOG_SPOOL_DIR", "log_spool")
+AUDIT_LOG_FSYNC = os.environ.get("AUDIT_LOG_FSYNC", "1") == "1"
+
+LOG_COLUMNS = ("user_id", "action", "scenario_id", "details", "credit_cost")
+INSERT_SQL = "INSERT INTO logs (user_id, action, scenario_id, details, credit_cost) VALUES %s"
+
+
+def _try_flock(path):
+    """Dosyayı açıp kilitlemeyi dener. Başka süreç tutuyorsa None, yoksa açık fd."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class AuditLogWriter:
+    """
+    logs tablosu için toplu yazıcı. Kayıtlar kuyruğa girer, arka plan thread'i
+    AUDIT_LOG_BATCH adet birikince veya AUDIT_LOG_INTERVAL saniyede bir tek
+    multi-row INSERT ile yazar. Kapanışta kuyruk boşaltılır.
+    """
+
+    def __init__(self, mode=AUDIT_LOG_MODE, batch_size=AUDIT_LOG_BATCH, interval=AUDIT_LOG_INTERVAL,
+                 max_queue=AUDIT_LOG_MAX_QUEUE, spool_dir=AUDIT_LOG_SPOOL_DIR, fsync=AUDIT_LOG_FSYNC):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.spool_dir = spool_dir
+        self.fsync = fsync
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._spool_file = None
+        self._spool_seq = 0
+        # Spool dosya adlarındaki sahip kimliği (PID tekrar kullanılabilir, bu kullanılmaz).
+        # Sahip yaşadığı sürece audit-<id>.lock üzerinde flock tutar; kilit boşsa sahip ölmüştür.
+        self._owner = uuid.uuid4().hex[:12]
+        self._owner_lock = None
+        # fsync global kilidin dışında: istek thread'leri yazılan kayıt sayısına göre tek fsync'i paylaşır
+        self._spool_written = 0
+        self._spool_synced = 0
+        self._sync_lock = threading.Lock()
+        # Yazılamayan parti: (kayıtlar, mühürlü spool dosyaları) -> bir sonraki turda tekrar denenir
+        self._pending = None
+        self.stats = {
+            "written": 0,
+            "dropped": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+            "last_batch_size": 0,
+        }
+
+    @property
+    def inline(self):
+        """True ise log, kredi düşümüyle aynı SQL cümlesinde yazılmalı."""
+        return self.mode not in ("async", "spool")
+
+    def queue_depth(self):
+        depth = len(self._queue)
+        if self._pending is not None:
+            depth += len(self._pending[0])
+        return depth
+
+    def enqueue(self, user_id, action, scenario_id=None, details=None, credit_cost=0):
+        record = (user_id, action, scenario_id, details, credit_cost)
+        seq = None
+        with self._lock:
+            if self.mode == "spool":
+                seq = self._spool_write(record)
+            elif len(self._queue) >= self.max_queue:
+                # Fire-and-forget modunda bellek sınırsız büyümesin
+                self._queue.popleft()
+                self.stats["dropped"] += 1
+            self._queue.append(record)
+            full = len(self._queue) >= self.batch_size
+        if seq is not None and self.fsync:
+            self._spool_sync(seq)
+        if full:
+            self._wakeup.set()
+
+    # --- SPOOL ---
+    def _spool_path(self, suffix):
+        return os.path.join(self.spool_dir, f"audit-{self._owner}-{suffix}")
+
+    def _lock_path(self, owner):
+        return os.path.join(self.spool_dir, f"audit-{owner}.lock")
+
+    def _hold_owner_lock(self):
+        """Bu sürecin spool dosyalarını sahiplenir (süreç bitince kilit kendiliğinden düşer)."""
+        if self._owner_lock is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._owner_lock = _try_flock(self._lock_path(self._owner))
+            if self._owner_lock is None:
+                raise RuntimeError(f"Audit log spool kilidi alınamadı: {self._owner}")
+
+    def _release_owner_lock(self):
+        if self._owner_lock is not None:
+            _remove_quietly(self._lock_path(self._owner))
+            os.close(self._owner_lock)
+            self._owner_lock = None
+
+    def _spool_write(self, record):
+        if self._spool_file is None:
+            self._hold_owner_lock()
+            self._spool_file = open(self._spool_path("current.jsonl"), "a", encoding="utf-8")
+        self._spool_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._spool_file.flush()
+        self._spool_written += 1
+        return self._spool_written
+
+    def _spool_sync(self, seq):
+        """
+        seq. kayda kadar yazılanlar diske inene kadar bekler. Global kilit tutulmaz; o sırada
+        bekleyen istekler tek fsync'i paylaşır (group commit).
+        """
+        with self._sync_lock:
+            if self._spool_synced >= seq:
+                return
+            with self._lock:
+                spool_file, upto = self._spool_file, self._spool_written
+            if spool_file is not None:
+                try:
+                    os.fsync(spool_file.fileno())
+                except (ValueError, OSError):
+                    # Bu arada mühürlendiyse _seal_spool kapatmadan önce diske indirdi
+                    if not spool_file.closed:
+                        raise
+            self._spool_synced = max(self._spool_synced, upto)
+
+    def _seal_spool(self):
+        """Mevcut spool dosyasını kapatıp mühürler; yeni kayıtlar yeni dosyaya gider."""
+        if self._spool_file is None:
+            return []
+        if self.fsync and self._spool_synced < self._spool_written:
+            # Çoğunlukla istek thread'leri zaten indirmiştir; kalan kuyruk için tur başına tek fsync
+            os.fsync(self._spool_file.fileno())
+            self._spool_synced = self._spool_written
+        self._spool_file.close()
+        self._spool_file = None
+        self._spool_seq += 1
+        sealed = self._spool_path(f"{int(time.time())}-{self._spool_seq}.sealed")
+        os.replace(self._spool_path("current.jsonl"), sealed)
+        return [sealed]
+
+    def _recover_spool(self):
+        """
+        Ölmüş süreçlerden (çökme dahil) kalan spool dosyalarını kuyruğa geri alır.
+        Dosyalar önce bu sürecin adına taşınır (atomik rename): aynı anda başlayan iki worker'dan
+        sadece biri bir dosyayı alır, kurtaran da çökerse dosyayı sonraki başlangıç tekrar kurtarır.
+        """
+        self._hold_owner_lock()
+        by_owner = {}
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "audit-*-*"))):
+            owner = os.path.basename(path).split("-")[1]
+            # Bu sürecin kayıtları zaten kuyrukta
+            if owner != self._owner:
+                by_owner.setdefault(owner, []).append(path)
+        files = []
+        for owner, paths in by_owner.items():
+            lock = _try_flock(self._lock_path(owner))
+            if lock is None:
+                continue  # sahibi çalışıyor
+            try:
+                for path in paths:
+                    self._spool_seq += 1
+                    claimed = self._spool_path(f"claimed-{self._spool_seq}-{os.path.basename(path)}")
+                    try:
+                        os.rename(path, claimed)
+                    except FileNotFoundError:
+                        continue  # başka bir süreç aldı
+                    files.append(claimed)
+                _remove_quietly(self._lock_path(owner))
+            finally:
+                os.close(lock)
+        records = []
+        for path in files:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(tuple(json.loads(line)))
+        if files:
+            print(f"Audit log spool kurtarıldı: {len(records)} kayıt")
+            self._pending = (records, files)
+
+    # --- FLUSH ---
+    def _take_batch(self):
+        with self._lock:
+            if self.mode == "spool":
+                # Spool dosyası ile parti birebir örtüşsün: kuyruğun tamamı + dosya mühürlenir
+                records = list(self._queue)
+                self._queue.clear()
+                return records, self._seal_spool()
+            records = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+        return records, []
+
+    def flush(self):
+        """Bekleyen tüm kayıtları yazar. Hata olursa parti saklanır, False döner."""
+        while True:
+            if self._pending is not None:
+                records, files = self._pending
+                self._pending = None
+            else:
+                records, files = self._take_batch()
+            if not records:
+                for path in files:
+                    os.remove(path)
+                return True
+            if not self._write(records):
+                self._pending = (records, files)
+                return False
+            for path in files:
+                os.remove(path)
+
+    def _write(self, records):
+        started = time.perf_counter()
+        try:
+            conn = get_pool().acquire()
+            try:
+                cursor = conn.cursor()
+                execute_values(cursor, INSERT_SQL, records, page_size=self.batch_size)
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Audit Log Yazma Hatası: {e}")
+            self.stats["failed_flushes"] += 1
+            return False
+        self.stats["written"] += len(records)
+        self.stats["last_batch_size"] = len(records)
+        self.stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if not self.flush():
+                # DB yoksa sıkıştırmayalım
+                self._stop.wait(self.interval)
+
+    def start(self):
+        if self.inline or self._thread is not None:
+            return
+        if self.mode == "spool":
+            self._recover_spool()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ghost-audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        # Kapanışta kalanları boşalt
+        if not self.flush() and self.mode == "spool":
+            with self._lock:
+                self._seal_spool()
+        # Kalan dosyalar kilitsiz kalır; sonraki başlangıç onları kurtarır
+        self._release_owner_lock()
+
+    def snapshot(self):
+        return dict(self.stats, mode=self.mode, queue_depth=self.queue_depth())
+
+
+audit_log = AuditLogWriter()
+
+audit_log_stats = Gauge("ghost_audit_log", "Audit log yazıcısı sayaçları", ("stat",))
+
+
+def _collect_audit_log():
+    for key, value in audit_log.snapshot().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            audit_log_stats.set(key, value=value)
+
+
+COLLECTORS.append(_collect_audit_log)
@@ -0,0 +1,131 @@
+"""
+/api/get-balance için kullanıcı bazında bakiye önbelleği.
+- Kredi düşen yollar (CreditManager.deduct) commit sonrası yeni bakiyeyi buraya yazar.
+- Başka worker'daki düşümler ve admin yüklemeleri users tablosundaki trigger'ın
+  NOTIFY'ı ile gelir (sql/008_balance_notify.sql); bildirim yeni bakiyeyi taşır.
+- Her değer users.balance_seq ile gelir (her bakiye değişiminde satır kilidi altında +1).
+  Yazma sonrası değer, NOTIFY ve (gecikmeli replikadan olabilecek) DB okuması hangi sırayla
+  gelirse gelsin, elimizdekinden eski sıra numaralı değer yok sayılır.
+- LRU ile sınırlıdır; NOTIFY kaçarsa diye kayıtlar BALANCE_CACHE_TTL sonra DB'den tazelenir.
+- Uzun bekleme (long-poll): istemci elindeki sürümü gönderir, bakiye değişene kadar beklenir.
+  Sürüm balance_seq'tir: bakiye A -> B -> A dönse bile sürüm değişir, düşüm + iade kaçmaz.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from db_listener import listener
+from metrics import cache_requests
+
+BALANCE_CACHE_SIZE = int(os.environ.get("BALANCE_CACHE_SIZE", "20000"))
+BALANCE_CACHE_TTL = float(os.environ.get("BALANCE_CACHE_TTL", "60"))
+# Long-poll'da istemcinin isteyebileceği en uzun bekleme (sn)
+BALANCE_MAX_WAIT = float(os.environ.get("BALANCE_MAX_WAIT", "30"))
+BALANCE_CHANNEL = "ghost_balance"
+
+
+def balance_version(seq):
+    """Bakiyenin opak sürümü (users.balance_seq). Her worker'da aynı değişiklik aynı sürümü verir."""
+    return str(seq)
+
+
+class BalanceCache:
+    def __init__(self, max_size=BALANCE_CACHE_SIZE, ttl=BALANCE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # user_id -> (bakiye, son kullanma, balance_seq)
+        self._lock = threading.Lock()
+        self._waiters = {}              # user_id -> [(loop, future)]
+
+    def get(self, user_id):
+        """(bakiye, sürüm) veya önbellekte yoksa / süresi dolduysa None."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                cache_requests.inc("balance", "miss")
+                return None
+            self._entries.move_to_end(user_id)
+        cache_requests.inc("balance", "hit")
+        return entry[0], balance_version(entry[2])
+
+    def update(self, user_id, balance, seq):
+        """
+        Bakiye ve balance_seq (commit sonrası, NOTIFY veya DB okuması). Süresi dolmuş olsa bile
+        elimizdeki kayıttan eski sıra numaralı değer yazılmaz. Dönüş: önbellekteki güncel (bakiye, seq).
+        """
+        if balance is None or seq is None:
+            return balance, seq
+        with self._lock:
+            old = self._entries.get(user_id)
+            if old is not None and old[2] > seq:
+                return old[0], old[2]
+            self._put(user_id, balance, seq)
+            changed = old is None or old[2] != seq
+        if changed:
+            self._wake(user_id)
+        return balance, seq
+
+    def invalidate(self, payload=None):
+        if payload:
+            try:
+                user_id, seq, balance = str(payload).split(":")
+                self.update(int(user_id), Decimal(balance), int(seq))
+            except (ValueError, InvalidOperation):
+                print(f"UYARI: Geçersiz bakiye bildirimi: {payload!r}")
+            return
+        # Dinleyici koptu: bu sürede kaçan değişiklikler bilinmiyor
+        with self._lock:
+            self._entries.clear()
+            waiting = list(self._waiters)
+        for user_id in waiting:
+            self._wake(user_id)
+
+    def _put(self, user_id, balance, seq):
+        self._entries[user_id] = (balance, time.monotonic() + self.ttl, seq)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    # --- LONG-POLL ---
+    async def wait_for_change(self, user_id, known_version, timeout):
+        """Bakiye known_version'dan farklı olana (veya timeout'a) kadar bekler. Değiştiyse True."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.setdefault(user_id, []).append((loop, future))
+            # Okuma ile kayıt arasında gelen değişiklik kaçmasın
+            entry = self._entries.get(user_id)
+            if entry is None or balance_version(entry[2]) != known_version:
+                future.set_result(True)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(user_id, [])
+                if (loop, future) in waiters:
+                    waiters.remove((loop, future))
+                if not waiters:
+                    self._waiters.pop(user_id, None)
+
+    def _wake(self, user_id):
+        with self._lock:
+            waiters = self._waiters.pop(user_id, [])
+        for loop, future in waiters:
+            # Değişiklik DB thread'inden veya dinleyici thread'inden gelir
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+balance_cache = BalanceCache()
+listener.subscribe(BALANCE_CHANNEL, balance_cache.invalidate)
+listener.on_reconnect(balance_cache.invalidate)
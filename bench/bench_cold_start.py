@@ -0,0 +1,114 @@
+"""
+Soğuk başlangıç ölçümü: sunucu sürecini başlatır ve
+    - port açılana kadar (/health/live)
+    - ilk başarılı login'e kadar
+    - ısınma bitene kadar (/health/ready)
+geçen süreleri ölçer, süreci kapatıp --runs kez tekrarlar. Sunucunun kendi ölçtüğü
+süreç başlangıcı -> ilk giriş süresi (ghost_first_login_seconds) de rapora eklenir.
+
+DB doldurulmuş olmalı (python -m bench.seed --reset). Sunucu bu script tarafından başlatılır.
+
+Kullanım:
+    python -m bench.bench_cold_start --runs 5 --label warmup --output cold.json
+    WARMUP_ENABLED=0 python -m bench.bench_cold_start --runs 5 --label no-warmup --compare cold.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench.common import http_call, server_env, summarize
+from bench.run import git_commit
+from bench.seed import DEFAULT_PASSWORD, EMAIL_TEMPLATE
+
+MEASURES = ("live_ms", "first_login_ms", "ready_ms", "server_first_login_ms")
+
+
+def wait_for(check, timeout, interval=0.01):
+    """check() True dönene kadar dener; geçen süre (ms) veya zaman aşımında None."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if check():
+                return (time.perf_counter() - started) * 1000
+        except OSError:
+            pass
+        time.sleep(interval)
+    return None
+
+
+def one_run(args, index):
+    base_url = f"http://127.0.0.1:{args.port}"
+    login_payload = {"email": EMAIL_TEMPLATE.format(args.user), "password": args.password,
+                     "hwid": f"BENCH-COLD-{index}", "pc_name": "bench"}
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main_server:app",
+                               "--port", str(args.port), "--log-level", "warning"],
+                              env=server_env())
+    try:
+        def since_start(ms):
+            return None if ms is None else round((time.perf_counter() - started) * 1000, 1)
+
+        live = since_start(wait_for(lambda: http_call(base_url, "GET", "/health/live", timeout=1)[0] == 200,
+                                    args.timeout))
+        first_login = since_start(wait_for(
+            lambda: http_call(base_url, "POST", "/api/login", login_payload, timeout=args.timeout)[0] == 200,
+            args.timeout))
+        ready = since_start(wait_for(lambda: http_call(base_url, "GET", "/health/ready", timeout=1)[0] == 200,
+                                     args.timeout))
+        status = json.loads(http_call(base_url, "GET", "/health/ready", timeout=5)[2] or b"{}")
+        server_first_login = status.get("first_login_after")
+        return {
+            "live_ms": live,
+            "first_login_ms": first_login,
+            "ready_ms": ready,
+            "server_first_login_ms": round(server_first_login * 1000, 1) if server_first_login else None,
+            "warmup_steps": status.get("steps"),
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Süreç başlangıcından ilk başarılı girişe kadar geçen süre")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--user", type=int, default=1, help="Seed hesabı numarası")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="Önceki koşunun JSON çıktısı")
+    args = parser.parse_args()
+
+    runs = [one_run(args, i) for i in range(args.runs)]
+    result = {
+        "label": args.label,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "warmup_enabled": os.environ.get("WARMUP_ENABLED", "1") == "1",
+        "runs": runs,
+        "summary": {name: summarize([r[name] for r in runs if r[name] is not None]) for name in MEASURES},
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nKarşılaştırma (p50): {baseline.get('label') or args.compare} -> {result['label'] or 'bu koşu'}")
+        for name in MEASURES:
+            old, new = baseline["summary"].get(name), result["summary"][name]
+            if old and old["count"] and new["count"]:
+                print(f"{name:<24}{old['p50_ms']:>10.1f} -> {new['p50_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
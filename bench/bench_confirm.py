@@ -0,0 +1,93 @@
+"""
+Kredi düşümü yük testi: aynı kullanıcıdan eşzamanlı /api/confirm-transaction.
+- Bakiye asla eksiye düşmemeli (overdraft yok)
+- Son bakiye = başlangıç - (başarılı onay sayısı * maliyet)
+
+Bakiye kurulumu/kontrolü için DB'ye doğrudan bağlanır (DATABASE_URL veya yerel ayarlar).
+Tek token'dan yüzlerce eşzamanlı onay atar: sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı,
+yoksa isteklerin çoğu 429 alır ve DB'ye hiç ulaşmaz (429'lar ayrı sayılır).
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_confirm --email a@b.com --password 123 --type group --item-id "Stok İşlemleri"
+"""
+import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from bench.common import DEFAULT_BASE_URL, Tally, http_call, login, warn_rate_limited
+from db_pool import get_dsn_kwargs
+
+
+def db_query(sql, params):
+    conn = psycopg2.connect(**get_dsn_kwargs())
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        row = cur.fetchone() if cur.description else None
+        conn.commit()
+        return row
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--type", default="group", choices=["group", "single"])
+    parser.add_argument("--item-id", required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--initial-balance", type=int, default=None,
+                        help="Verilmezse maliyet * istek/2 (yarısı yetersiz bakiyeye düşsün)")
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+    user_id = db_query("SELECT user_id FROM users WHERE email = %s", (args.email,))[0]
+
+    # Maliyeti öğrenmek için bakiyeyi geçici olarak bol yapıp tek onay at
+    db_query("UPDATE users SET credits_balance = %s WHERE user_id = %s", (10 ** 9, user_id))
+    _, _, body, _ = http_call(args.base_url, "POST", "/api/confirm-transaction",
+                              {"token": token, "type": args.type, "item_id": args.item_id})
+    cost = json.loads(body)["deducted"]
+
+    initial = args.initial_balance if args.initial_balance is not None else cost * args.requests // 2
+    db_query("UPDATE users SET credits_balance = %s WHERE user_id = %s", (initial, user_id))
+
+    tally, statuses = Tally(), {}
+    lock = threading.Lock()
+
+    def one(_):
+        status, ms, _, _ = http_call(args.base_url, "POST", "/api/confirm-transaction",
+                                     {"token": token, "type": args.type, "item_id": args.item_id})
+        tally.add(status, ms)
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+
+    final = db_query("SELECT credits_balance FROM users WHERE user_id = %s", (user_id,))[0]
+    succeeded = statuses.get(200, 0)
+    result = {
+        "cost": cost,
+        "initial_balance": initial,
+        "final_balance": final,
+        "statuses": statuses,
+        "overdraft": final < 0,
+        "balance_consistent": final == initial - succeeded * cost,
+        "confirm_transaction": tally.summary(),
+    }
+    print(json.dumps(result, indent=2, default=str))
+    warn_rate_limited(tally.rate_limited)
+    if result["overdraft"] or not result["balance_consistent"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
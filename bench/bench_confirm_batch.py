@@ -0,0 +1,96 @@
+"""
+Toplu onay karşılaştırması: aynı kalem listesini
+    - N ayrı /api/confirm-transaction çağrısıyla (istemcinin bugünkü davranışı)
+    - tek /api/confirm-batch çağrısıyla
+onaylar ve toplam süreleri raporlar. İki yolun düştüğü toplam kredi de karşılaştırılır.
+
+Bakiye kurulumu için DB'ye doğrudan bağlanır (DATABASE_URL veya yerel ayarlar).
+Sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı (confirm-transaction ve confirm-batch bütçeleri
+birkaç turda dolar). Limit açıksa 429 alan turlar karşılaştırmaya katılmaz, ayrı sayılır.
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_confirm_batch --email bench_user_0@ghost.local --password bench123 \\
+        --group "Stok İşlemleri" --single 1 --single 2 --single 3 --rounds 50
+"""
+import argparse
+import json
+
+from bench.bench_confirm import db_query
+from bench.common import DEFAULT_BASE_URL, RATE_LIMITED, http_call, login, summarize, warn_rate_limited
+
+
+def run_sequential(base_url, token, items):
+    """(toplam_ms, düşülen) veya tur 429'a takıldıysa None."""
+    total_ms, deducted = 0.0, 0
+    for item in items:
+        status, ms, body, _ = http_call(base_url, "POST", "/api/confirm-transaction", dict(item, token=token))
+        total_ms += ms
+        if status == RATE_LIMITED:
+            return None
+        if status != 200:
+            raise SystemExit(f"confirm-transaction başarısız ({status}): {body[:200]!r}")
+        deducted += json.loads(body)["deducted"]
+    return total_ms, deducted
+
+
+def run_batch(base_url, token, items):
+    status, ms, body, _ = http_call(base_url, "POST", "/api/confirm-batch", {"token": token, "items": items})
+    if status == RATE_LIMITED:
+        return None
+    if status != 200:
+        raise SystemExit(f"confirm-batch başarısız ({status}): {body[:200]!r}")
+    return ms, json.loads(body)["deducted"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--group", action="append", default=[], help="Grup kalemi (tekrarlanabilir)")
+    parser.add_argument("--single", action="append", default=[], type=int, help="Senaryo kalemi (tekrarlanabilir)")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    items = [{"type": "group", "item_id": g} for g in args.group]
+    items += [{"type": "single", "item_id": s} for s in args.single]
+    if not items:
+        raise SystemExit("En az bir --group veya --single verilmeli")
+
+    token = login(args.base_url, args.email, args.password)
+    user_id = db_query("SELECT user_id FROM users WHERE email = %s", (args.email,))[0]
+    db_query("UPDATE users SET credits_balance = %s WHERE user_id = %s", (10 ** 9, user_id))
+
+    sequential, batch = [], []
+    seq_deducted = batch_deducted = rate_limited = 0
+    for _ in range(args.rounds):
+        # Tur ancak iki yol da limite takılmadan biterse sayılır (toplamlar karşılaştırılabilir kalsın)
+        seq = run_sequential(args.base_url, token, items)
+        bat = run_batch(args.base_url, token, items) if seq else None
+        if seq is None or bat is None:
+            rate_limited += 1
+            continue
+        sequential.append(seq[0])
+        seq_deducted += seq[1]
+        batch.append(bat[0])
+        batch_deducted += bat[1]
+
+    seq_summary, batch_summary = summarize(sequential), summarize(batch)
+    result = {
+        "items_per_round": len(items),
+        "rounds": args.rounds,
+        "rate_limited_rounds": rate_limited,
+        "sequential": seq_summary,
+        "batch": batch_summary,
+        "p50_speedup": round(seq_summary["p50_ms"] / batch_summary["p50_ms"], 2) if batch_summary["p50_ms"] else None,
+        "same_total": seq_deducted == batch_deducted,
+    }
+    print(json.dumps(result, indent=2, default=str))
+    warn_rate_limited(rate_limited)
+    if not result["same_total"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Eşzamanlı installer indirmeleri API'yi aç bırakıyor mu?
+N adet /api/download-full-package indirmesi sürerken /api/check-version ve
+/api/get-balance gecikmeleri ölçülür ve boştaki değerlerle karşılaştırılır.
+
+get-balance probları rate limit'e takılmasın diye sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı
+(429'lar gecikmelere katılmaz, ayrı sayılır).
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_downloads --email a@b.com --password 123 --downloads 200
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.common import DEFAULT_BASE_URL, Tally, http_call, login, summarize, warn_rate_limited
+
+
+def download(base_url, results, lock):
+    parsed = urllib.parse.urlparse(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=600)
+    started = time.perf_counter()
+    conn.request("GET", "/api/download-full-package")
+    resp = conn.getresponse()
+    size = 0
+    while True:
+        block = resp.read(1024 * 1024)
+        if not block:
+            break
+        size += len(block)
+    conn.close()
+    with lock:
+        results.append((resp.status, size, (time.perf_counter() - started) * 1000))
+
+
+def probe_api(base_url, token, count, concurrency):
+    tallies = {"check_version": Tally(), "get_balance": Tally()}
+
+    def one(i):
+        if i % 2:
+            status, ms, _, _ = http_call(base_url, "GET", "/api/check-version")
+            tallies["check_version"].add(status, ms)
+        else:
+            status, ms, _, _ = http_call(base_url, "GET", f"/api/get-balance?token={token}")
+            tallies["get_balance"].add(status, ms)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    return {name: tally.summary() for name, tally in tallies.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+    idle = probe_api(args.base_url, token, args.probes, args.concurrency)
+
+    results, lock = [], threading.Lock()
+    threads = [threading.Thread(target=download, args=(args.base_url, results, lock), daemon=True)
+               for _ in range(args.downloads)]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+    loaded = probe_api(args.base_url, token, args.probes, args.concurrency)
+    for t in threads:
+        t.join()
+
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(json.dumps({
+        "api_idle": idle,
+        "api_during_downloads": loaded,
+        "downloads": {
+            "statuses": statuses,
+            "bytes_total": sum(size for _, size, _ in results),
+            "latency": summarize([ms for _, _, ms in results]),
+        },
+    }, indent=2))
+    warn_rate_limited(sum(probe["rate_limited"] for probe in (*idle.values(), *loaded.values())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Event loop bloklanma testi:
+/api/get-balance p99 gecikmesi, aynı anda yavaş /api/get-group-package istekleri
+uçuştayken de sabit kalmalı.
+
+get-balance bütçesi düşük (1/sn): sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı, yoksa 429
+cevapları ölçülür. 429'lar gecikmelere katılmaz, "rate_limited" olarak ayrı sayılır.
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_event_loop --email a@b.com --password 123 --group "Stok İşlemleri"
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.common import DEFAULT_BASE_URL, Tally, http_call, login, warn_rate_limited
+
+
+def measure_balance(base_url, token, count, concurrency):
+    tally = Tally()
+
+    def one(_):
+        status, ms, _, _ = http_call(base_url, "GET", f"/api/get-balance?token={token}")
+        tally.add(status, ms)
+        return status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    return tally.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--group", required=True, help="Büyük (yavaş) bir senaryo grubu")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-inflight", type=int, default=4, help="Aynı anda uçuşan get-group-package sayısı")
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+
+    baseline = measure_balance(args.base_url, token, args.requests, args.concurrency)
+
+    stop = threading.Event()
+    slow = Tally()
+
+    def slow_loop():
+        while not stop.is_set():
+            status, ms, _, _ = http_call(args.base_url, "POST", "/api/get-group-package",
+                                         {"token": token, "group_name": args.group})
+            slow.add(status, ms)
+
+    slow_threads = [threading.Thread(target=slow_loop, daemon=True) for _ in range(args.slow_inflight)]
+    for t in slow_threads:
+        t.start()
+    time.sleep(0.5)  # yavaş istekler uçuşa geçsin
+    under_load = measure_balance(args.base_url, token, args.requests, args.concurrency)
+    stop.set()
+    for t in slow_threads:
+        t.join()
+
+    print(json.dumps({
+        "get_balance_idle": baseline,
+        "get_balance_with_slow_group_package": under_load,
+        "get_group_package": slow.summary(),
+    }, indent=2))
+    warn_rate_limited(baseline["rate_limited"] + under_load["rate_limited"] + slow.rate_limited)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+/api/get-group-package: normal mod ile stream modunu karşılaştırır.
+- TTFB (ilk byte süresi) ve toplam süre
+- Sunucu sürecinin RSS / tepe RSS değeri (--server-pid, Linux /proc üzerinden)
+
+--seed N verilirse "BENCH_STREAM" grubuna N adet senaryo eklenir (DB'ye doğrudan yazar).
+
+Kullanım (get-group-package bütçesi düşük: rate limit kapalı çalıştırın, 429 alan turlar ayrı sayılır):
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app &   # PID'i not edin
+    python -m bench.bench_group_package --email a@b.com --password 123 --seed 10000 --server-pid 1234
+"""
+import argparse
+import http.client
+import json
+import time
+import urllib.parse
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from bench.common import DEFAULT_BASE_URL, RATE_LIMITED, login, summarize, warn_rate_limited
+from db_pool import get_dsn_kwargs
+
+BENCH_GROUP = "BENCH_STREAM"
+
+
+def seed(count, payload_kb):
+    conn = psycopg2.connect(**get_dsn_kwargs())
+    try:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM scenarios WHERE group_name = %s", (BENCH_GROUP,))
+        payload = "df = df[df['tutar'] < 0]  # " + "x" * (payload_kb * 1024)
+        rows = [(BENCH_GROUP, f"Bench Senaryo {i}", payload, "HAM VERI", "Tespit mesajı " * 10,
+                 "VUK 219", "Risk nedeni " * 10, "Çözüm önerisi " * 10, True)
+                for i in range(count)]
+        execute_values(cur, """
+            INSERT INTO scenarios (group_name, risk_title, code_payload, source_type, risk_message,
+                                   legislation, risk_reason, solution_suggestion, is_active)
+            VALUES %s
+        """, rows, page_size=1000)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_rss_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                values[key] = int(value.split()[0])
+    return values
+
+
+def fetch(base_url, token, group, stream):
+    parsed = urllib.parse.urlparse(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=600)
+    body = json.dumps({"token": token, "group_name": group, "stream": stream}).encode()
+    started = time.perf_counter()
+    conn.request("POST", "/api/get-group-package", body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    resp.read(1)
+    ttfb = (time.perf_counter() - started) * 1000
+    size = 1 + len(resp.read())
+    total = (time.perf_counter() - started) * 1000
+    conn.close()
+    return resp.status, ttfb, total, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--group", default=BENCH_GROUP)
+    parser.add_argument("--seed", type=int, default=0, help="BENCH_STREAM grubuna eklenecek senaryo sayısı")
+    parser.add_argument("--payload-kb", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--server-pid", type=int)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed, args.payload_kb)
+    token = login(args.base_url, args.email, args.password)
+
+    result = {"group": args.group}
+    # Stream modunu önce ölç: normal modun tepe RSS'i VmHWM'i kirletmesin
+    for mode in (True, False):
+        ttfbs, totals, size, status, limited = [], [], 0, None, 0
+        for _ in range(args.rounds):
+            status, ttfb, total, size = fetch(args.base_url, token, args.group, mode)
+            if status == RATE_LIMITED:
+                limited += 1
+                continue
+            ttfbs.append(ttfb)
+            totals.append(total)
+        warn_rate_limited(limited)
+        entry = {"status": status, "bytes": size, "ttfb": summarize(ttfbs), "total": summarize(totals),
+                 "rate_limited": limited}
+        if args.server_pid:
+            entry["server_memory_kb"] = read_rss_kb(args.server_pid)
+        result["stream" if mode else "buffered"] = entry
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
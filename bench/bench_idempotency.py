@@ -0,0 +1,95 @@
+"""
+Idempotency tekrar yolu ölçümü: /api/confirm-transaction
+    - anahtarsız (her istek fiyatlar + düşer + loglar)
+    - aynı anahtarla tekrar (süreç içi LRU'dan cevap, DB'ye gitmez)
+gecikmelerini karşılaştırır ve tekrarların bakiyeden ikinci kez düşmediğini kontrol eder.
+Birden fazla worker varsa tekrarların bir kısmı diğer worker'a düşer ve tablo yolundan cevaplanır.
+
+Bakiye kurulumu/kontrolü için DB'ye doğrudan bağlanır (DATABASE_URL veya yerel ayarlar).
+Sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı (confirm-transaction bütçesi ~20 istekte dolar).
+Limit açıksa 429 alan istekler gecikmelere katılmaz, ayrı sayılır.
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_idempotency --email bench_user_0@ghost.local --password bench123 \\
+        --item-id "Stok İşlemleri" --requests 500
+"""
+import argparse
+import json
+import time
+import uuid
+
+from bench.bench_confirm import db_query
+from bench.common import DEFAULT_BASE_URL, RATE_LIMITED, Tally, http_call, login, warn_rate_limited
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--type", default="group", choices=["group", "single"])
+    parser.add_argument("--item-id", required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    token = login(args.base_url, args.email, args.password)
+    user_id = db_query("SELECT user_id FROM users WHERE email = %s", (args.email,))[0]
+    db_query("UPDATE users SET credits_balance = %s WHERE user_id = %s", (10 ** 9, user_id))
+    payload = {"token": token, "type": args.type, "item_id": args.item_id}
+
+    def confirm(tally, key=None):
+        """(cevap, başlıklar) veya 429'da None."""
+        status, ms, body, headers = http_call(args.base_url, "POST", "/api/confirm-transaction",
+                                              dict(payload, idempotency_key=key) if key else payload)
+        if not tally.add(status, ms):
+            return None
+        if status != 200:
+            raise SystemExit(f"confirm-transaction başarısız ({status}): {body[:200]!r}")
+        return json.loads(body), headers
+
+    fresh = Tally()
+    for _ in range(args.requests):
+        confirm(fresh)
+
+    key = uuid.uuid4().hex
+    # İlk anahtarlı istek mutlaka işlenmeli: 429 alırsa (hiçbir şey düşülmedi) bekleyip tekrar dene
+    while True:
+        status, _, body, headers = http_call(args.base_url, "POST", "/api/confirm-transaction",
+                                             dict(payload, idempotency_key=key))
+        if status != RATE_LIMITED:
+            break
+        time.sleep(float(headers.get("retry-after") or headers.get("Retry-After") or 1))
+    if status != 200:
+        raise SystemExit(f"confirm-transaction başarısız ({status}): {body[:200]!r}")
+    first = json.loads(body)
+    balance_after_first = db_query("SELECT credits_balance FROM users WHERE user_id = %s", (user_id,))[0]
+    retries, replayed = Tally(), 0
+    for _ in range(args.requests):
+        response = confirm(retries, key)
+        if response is None:
+            continue
+        body, headers = response
+        # Starlette başlık adlarını küçük harfle yollar
+        replayed += (headers.get("idempotent-replayed") or headers.get("Idempotent-Replayed")) == "true"
+        if body != first:
+            raise SystemExit(f"Tekrar farklı sonuç döndü: {body} != {first}")
+    final = db_query("SELECT credits_balance FROM users WHERE user_id = %s", (user_id,))[0]
+
+    fresh_summary, retry_summary = fresh.summary(), retries.summary()
+    result = {
+        "cost": first["deducted"],
+        "without_key": fresh_summary,
+        "retry_same_key": retry_summary,
+        "retries_from_memory": replayed,
+        "p99_speedup": round(fresh_summary["p99_ms"] / retry_summary["p99_ms"], 2) if retry_summary["p99_ms"] else None,
+        "charged_once": final == balance_after_first,
+    }
+    print(json.dumps(result, indent=2, default=str))
+    warn_rate_limited(fresh.rate_limited + retries.rate_limited)
+    if not result["charged_once"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
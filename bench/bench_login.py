@@ -0,0 +1,69 @@
+"""
+/api/login gecikme ölçümü (p50/p95/p99). Aynı yerel Postgres'e karşı önceki ve sonraki
+commit'lerde çalıştırıp --output dosyalarını karşılaştırın.
+
+Her istek farklı hwid ile (cihaz kaydı yolu) veya --same-device ile (son login güncelleme yolu) atılır.
+
+Login bütçesi düşük (0.2/sn): sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı.
+429'lar gecikmelere katılmaz, "rate_limited" olarak ayrı sayılır.
+
+Kullanım:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+    python -m bench.bench_login --email a@b.com --password 123 --label after --output login_after.json
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.common import DEFAULT_BASE_URL, Tally, http_call, warn_rate_limited
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--same-device", action="store_true", help="Tüm istekler aynı hwid ile")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    tally, statuses = Tally(), {}
+    lock = threading.Lock()
+
+    def one(i):
+        hwid = "BENCH-HWID" if args.same_device else f"BENCH-{uuid.uuid4().hex[:12]}"
+        status, ms, _, _ = http_call(args.base_url, "POST", "/api/login",
+                                     {"email": args.email, "password": args.password,
+                                      "hwid": hwid, "pc_name": "bench"})
+        tally.add(status, ms)
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "label": args.label,
+        "same_device": args.same_device,
+        "concurrency": args.concurrency,
+        "throughput_rps": round(len(tally.latencies) / elapsed, 1),
+        "statuses": statuses,
+        "login": tally.summary(),
+    }
+    print(json.dumps(result, indent=2))
+    warn_rate_limited(tally.rate_limited)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Senaryo ağırlıklı yanıtların ölçümü (get-menu, get-group-package).
+
+1) Sunucusuz (her zaman): bench.seed ile aynı üreticiden gerçekçi bir katalog kurulur.
+   - Serialize CPU: eski yol (jsonable_encoder + json.dumps) ile dump_json karşılaştırılır
+   - Gövde boyutu: ham / gzip / br (brotli kuruluysa) ve sıkıştırma süreleri
+2) --email/--password verilirse çalışan sunucuya karşı, Accept-Encoding başına
+   kablodaki byte ve p50/p95/p99 ölçülür. Sunucu RATE_LIMIT_ENABLED=0 ile çalışmalı;
+   429'lar gecikmelere katılmaz, ayrı sayılır.
+
+Kullanım:
+    python -m bench.bench_responses --scenarios 3000
+    python -m bench.bench_responses --email bench_user_0@ghost.local --password bench123 \\
+        --group "Stok İşlemleri" --requests 200
+"""
+import argparse
+import json
+import random
+import time
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from bench.common import DEFAULT_BASE_URL, Tally, http_call, login, warn_rate_limited
+from bench.seed import GROUP_NAMES, _code_payload, _paragraph, _sentence
+from catalog_cache import dump_json, orjson
+from compression import SUPPORTED_ENCODINGS, compress
+
+
+def build_catalog(count, payload_min_kb, payload_max_kb, seed=42):
+    """MENU_SQL / GROUP_PACKAGE_SQL kolonlarıyla, DB'den gelmiş gibi satırlar."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1,
+            "group_name": rnd.choice(GROUP_NAMES),
+            "risk_title": f"Risk {i + 1}: {_sentence(rnd, 5)}",
+            "description": _paragraph(rnd, 2),
+            "code_payload": _code_payload(rnd, payload_min_kb, payload_max_kb),
+            "risk_message": _paragraph(rnd, 3),
+            "legislation": _paragraph(rnd, 2),
+            "risk_reason": _paragraph(rnd, 2),
+            "solution_suggestion": _paragraph(rnd, 3),
+            "source_type": rnd.choice(("SQL", "EXCEL", "PYTHON")),
+            "cost_per_run": Decimal(rnd.choice((10, 20, 25, 50))),
+            "is_active": True,
+            "is_pinned": rnd.random() < 0.02,
+            "cross_check": "",
+            "payload_hash": "%032x" % rnd.getrandbits(128),
+        })
+    return rows
+
+
+def timed(fn, repeat):
+    """fn'i repeat kez çalıştırır; (son sonuç, çağrı başına ortalama ms)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) * 1000 / repeat
+
+
+def old_dump(content):
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def measure_offline(rows, group, repeat):
+    menu_rows = [{k: v for k, v in row.items() if k != "code_payload"} for row in rows]
+    package_rows = [row for row in rows if row["group_name"] == group]
+    bodies = {
+        "get-menu": {"scenarios": menu_rows},
+        "get-group-package": {"success": True, "cost_to_deduct": 50, "scenarios": package_rows},
+    }
+    report = {"json_backend": "orjson" if orjson is not None else "json"}
+    for name, content in bodies.items():
+        old_body, old_ms = timed(lambda: old_dump(content), repeat)
+        body, new_ms = timed(lambda: dump_json(content), repeat)
+        if json.loads(old_body) != json.loads(body):
+            raise SystemExit(f"{name}: dump_json çıktısı eski yol ile aynı değil")
+        entry = {
+            "scenarios": len(content["scenarios"]),
+            "serialize_ms": {"jsonable_encoder+json": round(old_ms, 2), "dump_json": round(new_ms, 2)},
+            "bytes": {"identity": len(body)},
+            "compress_ms": {},
+        }
+        for encoding in SUPPORTED_ENCODINGS:
+            for precompress in (False, True):
+                label = encoding + ("-precompress" if precompress else "")
+                data, ms = timed(lambda: compress(body, encoding, precompress), max(1, repeat // 5))
+                entry["bytes"][label] = len(data)
+                entry["compress_ms"][label] = round(ms, 2)
+        report[name] = entry
+    return report
+
+
+def measure_server(args):
+    token = login(args.base_url, args.email, args.password)
+    calls = {
+        "get-menu": ("GET", f"/api/get-menu?token={token}", None),
+        "get-group-package": ("POST", "/api/get-group-package", {"token": token, "group_name": args.group}),
+    }
+    report = {}
+    for name, (method, path, payload) in calls.items():
+        report[name] = {}
+        for encoding in ("identity",) + SUPPORTED_ENCODINGS:
+            tally, size = Tally(), 0
+            for _ in range(args.requests):
+                status, ms, body, headers = http_call(args.base_url, method, path, payload,
+                                                      {"Accept-Encoding": encoding})
+                if not tally.add(status, ms):
+                    continue
+                if status != 200:
+                    raise SystemExit(f"{name} başarısız ({status}): {body[:200]!r}")
+                size = len(body)  # urllib açmaz: kablodaki byte
+            warn_rate_limited(tally.rate_limited)
+            report[name][encoding] = dict(tally.summary(), wire_bytes=size)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", type=int, default=3000)
+    parser.add_argument("--payload-min-kb", type=int, default=1)
+    parser.add_argument("--payload-max-kb", type=int, default=8)
+    parser.add_argument("--group", default=GROUP_NAMES[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_catalog(args.scenarios, args.payload_min_kb, args.payload_max_kb)
+    result = {"offline": measure_offline(rows, args.group, args.repeat)}
+    if args.email and args.password:
+        result["server"] = measure_server(args)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark scriptlerinin ortak yardımcıları (sadece standart kütüphane).
+Sunucu ayrı bir süreçte, rate limit kapalı çalışıyor olmalı:
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app
+Limit açıkken aynı token/IP'den gelen yük 429 alır. Benchmark'lar 429'ları gecikmelere
+katmaz, "rate_limited" olarak ayrı sayar ve uyarı basar.
+"""
+import os
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+
+DEFAULT_BASE_URL = "http://127.0.0.1:8000"
+RATE_LIMITED = 429
+
+
+def server_env(**extra):
+    """Benchmark'ın kendisi başlattığı sunucu süreci için ortam (rate limit kapalı)."""
+    return dict(os.environ, RATE_LIMIT_ENABLED="0", **extra)
+
+
+def http_call(base_url, method, path, payload=None, headers=None, timeout=60):
+    """İsteği atar, (status, süre_ms, body_bytes, response_headers) döner."""
+    data = None
+    req_headers = dict(headers or {})
+    if payload is not None:
+        data = json.dumps(payload).encode("utf-8")
+        req_headers.setdefault("Content-Type", "application/json")
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers=req_headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            status = resp.status
+            resp_headers = dict(resp.headers)
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status = e.code
+        resp_headers = dict(e.headers or {})
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return status, elapsed_ms, body, resp_headers
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies_ms):
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "max_ms": round(max(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+
+
+class Tally:
+    """Thread'ler arası gecikme toplayıcı; 429'lar gecikmeye katılmaz, ayrı sayılır."""
+
+    def __init__(self):
+        self.latencies = []
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def add(self, status, ms):
+        """İstek limite takılmadıysa True."""
+        with self._lock:
+            if status == RATE_LIMITED:
+                self.rate_limited += 1
+                return False
+            self.latencies.append(ms)
+        return True
+
+    def summary(self):
+        return dict(summarize(self.latencies), rate_limited=self.rate_limited)
+
+
+def warn_rate_limited(count):
+    if count:
+        print(f"UYARI: {count} istek 429 aldı (gecikmelere katılmadı). "
+              f"Sunucuyu RATE_LIMIT_ENABLED=0 ile başlatın.")
+
+
+def login(base_url, email, password, hwid="BENCH-HWID", pc_name="bench"):
+    status, _, body, _ = http_call(base_url, "POST", "/api/login",
+                                   {"email": email, "password": password, "hwid": hwid, "pc_name": pc_name})
+    if status == RATE_LIMITED:
+        raise SystemExit("Login 429 aldı: sunucuyu RATE_LIMIT_ENABLED=0 ile başlatın.")
+    if status != 200:
+        raise SystemExit(f"Login başarısız ({status}): {body[:200]!r}")
+    return json.loads(body)["token"]
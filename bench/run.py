@@ -0,0 +1,201 @@
+"""
+Uçtan uca yük testi: gerçek istemci akışını eşzamanlı sanal kullanıcılarla koşar
+    login -> get-menu -> get-group-package -> confirm-transaction -> get-balance
+ve her endpoint için throughput ile p50/p95/p99 raporlar. Sonuç JSON'u commit'ler arasında
+karşılaştırmak için saklanır.
+
+Önce veritabanı doldurulmalı (python -m bench.seed --reset) ve sunucu ayrı süreçte, rate limit
+kapalı çalışmalı (açıkken login'ler aynı IP kovasına düşer, hesapların çoğu 429 ile atlanır):
+    RATE_LIMIT_ENABLED=0 uvicorn main_server:app --workers 2
+429 alan istekler gecikmelere katılmaz, endpoint başına "rate_limited" olarak sayılır.
+
+Kullanım:
+    python -m bench.run --users 200 --concurrency 50 --iterations 5 --label before --output before.json
+    python -m bench.run --users 200 --concurrency 50 --iterations 5 --label after --output after.json \\
+        --compare before.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from bench.common import DEFAULT_BASE_URL, RATE_LIMITED, http_call, summarize, warn_rate_limited
+from bench.seed import DEFAULT_PASSWORD, EMAIL_TEMPLATE
+
+ENDPOINTS = ("login", "get-menu", "get-group-package", "confirm-transaction", "get-balance")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.rate_limited = {name: 0 for name in ENDPOINTS}
+        self.statuses = {name: {} for name in ENDPOINTS}
+        self.flows = 0
+        self.skipped_accounts = 0
+        self._lock = threading.Lock()
+
+    def record(self, name, status, ms):
+        with self._lock:
+            self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+            if status == RATE_LIMITED:
+                self.rate_limited[name] += 1
+            else:
+                self.latencies[name].append(ms)
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+    def skip(self):
+        with self._lock:
+            self.skipped_accounts += 1
+
+
+def call(rec, name, base_url, method, path, payload=None, headers=None):
+    status, ms, body, resp_headers = http_call(base_url, method, path, payload, headers)
+    rec.record(name, status, ms)
+    return status, body, resp_headers
+
+
+def virtual_user(index, args, rec, deadline):
+    rnd = random.Random(args.seed * 100003 + index)
+    status, body, _ = call(rec, "login", args.base_url, "POST", "/api/login", {
+        "email": EMAIL_TEMPLATE.format(index), "password": args.password,
+        "hwid": f"BENCH-RUN-{index}", "pc_name": "bench"})
+    if status != 200:
+        # Pasif hesap veya cihaz limiti: sonraki hesaba geç
+        rec.skip()
+        return
+    token = json.loads(body)["token"]
+
+    etag, scenarios = None, []
+    iteration = 0
+    while True:
+        # --duration verildiyse süreye, verilmediyse --iterations'a göre durur
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                break
+        elif iteration >= args.iterations:
+            break
+        iteration += 1
+
+        # İstemci menüyü ETag ile yeniler; değişmediyse 304 ve elindekini kullanır
+        headers = {"If-None-Match": etag} if etag else None
+        status, body, resp_headers = call(rec, "get-menu", args.base_url, "GET",
+                                          f"/api/get-menu?token={quote(token)}", headers=headers)
+        if status == 200:
+            scenarios = json.loads(body).get("scenarios", [])
+            etag = resp_headers.get("ETag") or resp_headers.get("etag")
+        groups = sorted({s["group_name"] for s in scenarios if s.get("group_name")})
+        if not groups:
+            continue
+        group_name = rnd.choice(groups)
+
+        status, _, _ = call(rec, "get-group-package", args.base_url, "POST", "/api/get-group-package",
+                            {"token": token, "group_name": group_name, "stream": args.stream})
+        if status != 200:
+            continue
+
+        if rnd.random() < args.single_ratio:
+            candidates = [s for s in scenarios if s.get("group_name") == group_name]
+            item = {"type": "single", "item_id": rnd.choice(candidates)["id"]}
+        else:
+            item = {"type": "group", "item_id": group_name}
+        call(rec, "confirm-transaction", args.base_url, "POST", "/api/confirm-transaction",
+             dict(item, token=token))
+
+        call(rec, "get-balance", args.base_url, "GET", f"/api/get-balance?token={quote(token)}")
+        rec.flow_done()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(result, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nKarşılaştırma: {baseline.get('label') or baseline_path} -> {result['label'] or 'bu koşu'}")
+    print(f"{'endpoint':<22}{'p50':>18}{'p95':>18}{'p99':>18}")
+    for name in ENDPOINTS:
+        old, new = baseline["endpoints"].get(name), result["endpoints"].get(name)
+        if not old or not new or not old["count"] or not new["count"]:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{old[key]:.1f}->{new[key]:.1f} ({change:+.0f}%)")
+        print(f"{name:<22}" + "".join(f"{c:>18}" for c in cells))
+    old_rps, new_rps = baseline.get("throughput_rps", 0), result["throughput_rps"]
+    print(f"{'throughput (istek/sn)':<22}{old_rps:>18} -> {new_rps}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ghost Server uçtan uca yük testi")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--users", type=int, default=100, help="Kullanılacak seed hesabı sayısı")
+    parser.add_argument("--first-user", type=int, default=1)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=5, help="Sanal kullanıcı başına akış sayısı")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Verilirse her sanal kullanıcı bu kadar saniye akış tekrarlar "
+                             "(--users ile --concurrency eşit olmalı)")
+    parser.add_argument("--single-ratio", type=float, default=0.3,
+                        help="confirm-transaction'ın 'single' olma olasılığı")
+    parser.add_argument("--stream", action="store_true", help="get-group-package stream modunda")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="")
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="Önceki koşunun JSON çıktısı")
+    args = parser.parse_args()
+
+    rec = Recorder()
+    indexes = range(args.first_user, args.first_user + args.users)
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda i: virtual_user(i, args, rec, deadline), indexes))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in rec.latencies.values())
+    endpoints = {}
+    for name in ENDPOINTS:
+        summary = summarize(rec.latencies[name])
+        summary["rps"] = round(len(rec.latencies[name]) / elapsed, 1)
+        summary["statuses"] = {str(k): v for k, v in sorted(rec.statuses[name].items())}
+        summary["rate_limited"] = rec.rate_limited[name]
+        endpoints[name] = summary
+
+    result = {
+        "label": args.label,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "password")},
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "flows": rec.flows,
+        "skipped_accounts": rec.skipped_accounts,
+        "throughput_rps": round(total / elapsed, 1),
+        "flows_per_s": round(rec.flows / elapsed, 1),
+        "endpoints": endpoints,
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    warn_rate_limited(sum(rec.rate_limited.values()))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+-- Benchmark için temel şema (boş bir Postgres'e uygulanır, sonra sql/ migration'ları gelir).
+-- Kolonlar sunucunun kullandığı sorgulardan çıkarıldı; üretim şemasında ek kolonlar olabilir.
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id          serial PRIMARY KEY,
+    email            text NOT NULL,
+    password_hash    text NOT NULL,
+    role             text NOT NULL DEFAULT 'user',
+    status           text NOT NULL DEFAULT 'Aktif',
+    company_name     text,
+    allowed_groups   text,
+    credits_balance  numeric NOT NULL DEFAULT 0,
+    max_device_limit integer NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS user_devices (
+    device_id   serial PRIMARY KEY,
+    user_id     integer NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    hwid        text NOT NULL,
+    device_name text,
+    last_login  timestamp DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scenario_groups (
+    group_id     serial PRIMARY KEY,
+    group_name   text NOT NULL UNIQUE,
+    cost_per_run numeric NOT NULL DEFAULT 50
+);
+
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_id         serial PRIMARY KEY,
+    group_name          text,
+    risk_title          text,
+    description         text,
+    code_payload        text,
+    source_type         text,
+    risk_message        text,
+    legislation         text,
+    risk_reason         text,
+    solution_suggestion text,
+    cross_check_rule    text,
+    cost_per_run        numeric DEFAULT 0,
+    is_active           boolean NOT NULL DEFAULT TRUE,
+    is_pinned           boolean NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS logs (
+    log_id      bigserial PRIMARY KEY,
+    user_id     integer,
+    action      text,
+    scenario_id integer,
+    details     text,
+    credit_cost numeric DEFAULT 0,
+    created_at  timestamp DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS system_settings (
+    setting_key   text PRIMARY KEY,
+    setting_value text
+);
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+import threading
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:  # opsiyonel bağımlılık, yoksa stdlib json
+    orjson = None
+
+from db_pool import acquire_read
+from db_listener import listener
+from metrics import cache_requests
+from compression import PrecompressedBody
+
+CATALOG_TTL = float(os.environ.get("CATALOG_CACHE_TTL", "300"))
+CATALOG_RETRY = float(os.environ.get("CATALOG_CACHE_RETRY", "5"))
+CATALOG_CHANNEL = "ghost_catalog"
+
+MENU_SQL = """
+    SELECT scenario_id as id, group_name, risk_title, description, 
+        risk_message, legislation, risk_reason, solution_suggestion, 
+        source_type, cost_per_run, is_active, cross_check_rule as cross_check,
+        payload_hash
+    FROM scenarios 
+    WHERE is_active = TRUE
+    ORDER BY scenario_id
+"""
+
+
+def _json_default(value):
+    # DB satırlarındaki tipler jsonable_encoder ile aynı şekilde yazılır
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+def dump_json(content):
+    """
+    FastAPI JSONResponse ile aynı çıktı (Türkçe karakterler kaçırılmadan, boşluksuz).
+    DB satırları jsonable_encoder'dan geçirilmeden verilebilir; orjson kuruluysa o kullanılır.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def groups_key(allowed_groups_str):
+    """users.allowed_groups -> görünüm anahtarı. None = kısıtlama yok (tüm katalog)."""
+    if allowed_groups_str and len(allowed_groups_str.strip()) > 0:
+        return tuple(sorted(set(allowed_groups_str.split(','))))
+    return None
+
+
+ENCODING_TAGS = {"gzip": "gz", "br": "br"}
+
+
+class MenuView(PrecompressedBody):
+    """Bir allowed_groups kümesi için hazır serialize edilmiş (ve ilk istekte sıkıştırılan) menü gövdesi."""
+
+    def __init__(self, body):
+        super().__init__(body)
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def etag_for(self, encoding):
+        """Güçlü ETag her içerik kodlaması için farklı olmalı (ham / gzip / br gövdeler ayrı temsil)."""
+        content_encoding = self.content_encoding(encoding)
+        if content_encoding is None:
+            return self.etag
+        return self.etag[:-1] + "-" + ENCODING_TAGS.get(content_encoding, content_encoding) + '"'
+
+
+class CatalogSnapshot:
+    def __init__(self, rows):
+        self.rows = jsonable_encoder(rows)
+        self.version = hashlib.sha256(dump_json(self.rows)).hexdigest()[:16]
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def view(self, key):
+        view = self._views.get(key)
+        if view is None:
+            if key is None:
+                scenarios = self.rows
+            else:
+                allowed = set(key)
+                scenarios = [row for row in self.rows if row["group_name"] in allowed]
+            view = MenuView(dump_json({"scenarios": scenarios}))
+            with self._lock:
+                view = self._views.setdefault(key, view)
+        return view
+
+
+class CatalogCache:
+    """
+    Aktif senaryo kataloğunun bellekteki anlık görüntüsü.
+    Her allowed_groups kümesi için gövde bir kez serialize edilir ve ETag'i hesaplanır;
+    katalog değişene kadar (NOTIFY veya TTL) aynı byte'lar tekrar kullanılır.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL, retry=CATALOG_RETRY):
+        self.ttl = ttl
+        self.retry = retry
+        self._snapshot = None
+        self._expires = 0.0
+        self._from_primary = False
+        self._refresh_lock = threading.Lock()
+
+    def snapshot(self):
+        if self._snapshot is not None and time.monotonic() < self._expires:
+            cache_requests.inc("catalog", "hit")
+            return self._snapshot
+        if not self._refresh_lock.acquire(blocking=self._snapshot is None):
+            cache_requests.inc("catalog", "stale")
+            return self._snapshot
+        cache_requests.inc("catalog", "miss")
+        try:
+            if self._snapshot is None or time.monotonic() >= self._expires:
+                self._reload()
+        finally:
+            self._refresh_lock.release()
+        return self._snapshot
+
+    def view(self, allowed_groups_str):
+        """Snapshot yoksa (DB hiç okunamadıysa) None döner."""
+        snap = self.snapshot()
+        if snap is None:
+            return None
+        return snap.view(groups_key(allowed_groups_str))
+
+    def _reload(self):
+        try:
+            from_primary, self._from_primary = self._from_primary, False
+            conn = acquire_read(primary=from_primary)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(MENU_SQL)
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            snap = CatalogSnapshot(rows)
+            # İçerik değişmediyse eski snapshot'ı (ve hazır görünümlerini) koru
+            if self._snapshot is None or self._snapshot.version != snap.version:
+                self._snapshot = snap
+            self._expires = time.monotonic() + self.ttl
+        except Exception as e:
+            print(f"Katalog Yükleme Hatası: {e}")
+            self._from_primary = self._from_primary or from_primary
+            self._expires = time.monotonic() + self.retry
+
+    def invalidate(self, payload=None):
+        # NOTIFY primary'deki commit'ten gelir; replika henüz uygulamamış olabilir
+        self._from_primary = True
+        self._expires = 0.0
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+catalog_cache = CatalogCache()
+listener.subscribe(CATALOG_CHANNEL, catalog_cache.invalidate)
+listener.on_reconnect(catalog_cache.invalidate)
@@ -0,0 +1,108 @@
+"""
+Yanıt sıkıştırma. Accept-Encoding'e göre br (brotli kuruluysa) veya gzip seçilir.
+Önbellekteki hazır gövdeler (menü görünümleri, grup paketleri) PrecompressedBody ile
+her kodlama için bir kez sıkıştırılır ve sonraki isteklerde aynı byte'lar döner.
+"""
+import os
+import gzip
+import threading
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # opsiyonel bağımlılık
+    brotli = None
+
+# Bundan küçük gövdeleri sıkıştırmaya değmez
+MIN_COMPRESS_BYTES = 1024
+# İstek başına sıkıştırma (hız öncelikli)
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+# Bir kez sıkıştırılıp tekrar kullanılan gövdeler (oran öncelikli)
+PRECOMPRESS_GZIP_LEVEL = int(os.environ.get("PRECOMPRESS_GZIP_LEVEL", "9"))
+PRECOMPRESS_BROTLI_QUALITY = int(os.environ.get("PRECOMPRESS_BROTLI_QUALITY", "9"))
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """Accept-Encoding'den desteklenen en iyi kodlama ('br' / 'gzip') veya None."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding, precompress=False):
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL)
+    return body
+
+
+class PrecompressedBody:
+    """Hazır JSON gövdesi + kodlama başına bir kez üretilen sıkıştırılmış kopyaları."""
+
+    def __init__(self, body, precompress=True):
+        self.body = body
+        # Uzun yaşayan gövdeler (menü) oran için yüksek seviyeyle, kısa ömürlüler hızlı sıkıştırılır
+        self.precompress = precompress
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def content_encoding(self, encoding):
+        """İstenen kodlamayla dönülecek gerçek Content-Encoding (küçük gövde sıkıştırılmaz)."""
+        if encoding is None or len(self.body) < MIN_COMPRESS_BYTES:
+            return None
+        return encoding
+
+    def encoded(self, encoding):
+        """(byte'lar, Content-Encoding veya None)."""
+        if self.content_encoding(encoding) is None:
+            return self.body, None
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = compress(self.body, encoding, self.precompress)
+        return data, encoding
+
+
+def encoded_response(body, encoding, headers=None, status_code=200):
+    """PrecompressedBody'yi seçilen kodlamayla döner (sıkıştırma önceden yapılmış olmalı)."""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    data, content_encoding = body.encoded(encoding)
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=data, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def json_response(body, accept_encoding=None, headers=None, status_code=200):
+    """Hazır JSON byte'larını, istemci kabul ediyorsa sıkıştırarak döner."""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(accept_encoding)
+    if len(body) >= MIN_COMPRESS_BYTES and encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
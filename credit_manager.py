@@ -1,5 +1,107 @@
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_pool, replicas
+from audit_log import audit_log
+from balance_cache import balance_cache
+from idempotency import RESULT_CTE, reserve, maybe_purge, fingerprint, idempotency_cache, IdempotencyMismatch
+
+# --- TEK SORGUDA FİYATLA + KONTROL ET + DÜŞ + LOGLA ---
+# UPDATE ... WHERE credits_balance >= cost satır kilidini aldıktan sonra koşulu tekrar
+# değerlendirir; aynı hesaptan eşzamanlı onaylar bakiyeyi eksiye düşüremez.
+# {price_sql} tek satır/tek kolon (cost) dönen güvenilir bir SQL parçasıdır.
+# AUDIT_LOG_MODE=sync ise log satırı da aynı cümlede yazılır, değilse audit_log kuyruğuna gider.
+DEDUCT_SQL = """
+    WITH price AS (
+        SELECT ({price_sql}) AS cost
+    ),
+    debit AS (
+        UPDATE users u SET credits_balance = u.credits_balance - price.cost
+        FROM price
+        WHERE u.user_id = %(user_id)s AND price.cost > 0 AND u.credits_balance >= price.cost
+        RETURNING u.credits_balance, u.balance_seq
+    ){log_cte}{idem_cte}
+    SELECT price.cost,
+           debit.credits_balance AS new_balance,
+           debit.balance_seq AS new_seq,
+           (SELECT credits_balance FROM users WHERE user_id = %(user_id)s) AS old_balance,
+           (SELECT balance_seq FROM users WHERE user_id = %(user_id)s) AS old_seq
+    FROM price LEFT JOIN debit ON TRUE
+"""
+
+LOG_CTE = """,
+    log AS (
+        INSERT INTO logs (user_id, action, scenario_id, details, credit_cost)
+        SELECT %(user_id)s, %(action)s, %(scenario_id)s, %(details)s, price.cost
+        FROM price, debit
+    )"""
+
+# Fiyat ifadeleri (confirm-transaction ile aynı kurallar: grup bulunamazsa 50)
+PRICE_GROUP_SQL = "COALESCE((SELECT cost_per_run FROM scenario_groups WHERE group_name = %(item_id)s), 50)"
+PRICE_SINGLE_SQL = """COALESCE((
+    SELECT COALESCE(g.cost_per_run, 50)
+    FROM scenarios s
+    LEFT JOIN scenario_groups g ON s.group_name = g.group_name
+    WHERE s.scenario_id = %(item_id)s
+), 50)"""
+PRICE_ALL_GROUPS_SQL = "SELECT COALESCE(SUM(cost_per_run), 0) FROM scenario_groups"
+PRICE_GROUP_OR_ZERO_SQL = "COALESCE((SELECT cost_per_run FROM scenario_groups WHERE group_name = %(item_id)s), 0)"
+
+
+# --- TOPLU ONAY (confirm-batch) ---
+# Kalemler dizi parametre olarak gelir; hepsi tek join ile fiyatlanır, toplam tek UPDATE ile
+# düşülür, loglar tek INSERT ile yazılır. Tek cümle = ya hepsi ya hiçbiri.
+# Fiyat kuralları deduct_item ile aynı: grup/senaryo grubu bulunamazsa 50.
+CONFIRM_BATCH_MAX_ITEMS = int(os.environ.get("CONFIRM_BATCH_MAX_ITEMS", "200"))
+
+BATCH_DEDUCT_SQL = """
+    WITH items AS (
+        SELECT i.ord, i.item_type, i.group_name, i.scenario_id
+        FROM unnest(%(types)s::text[], %(groups)s::text[], %(scenario_ids)s::int[])
+             WITH ORDINALITY AS i(item_type, group_name, scenario_id, ord)
+    ),
+    priced AS (
+        SELECT items.*,
+               CASE items.item_type
+                   WHEN 'group' THEN COALESCE(g.cost_per_run, 50)
+                   ELSE COALESCE(sg.cost_per_run, 50)
+               END AS cost
+        FROM items
+        LEFT JOIN scenario_groups g ON items.item_type = 'group' AND g.group_name = items.group_name
+        LEFT JOIN scenarios s ON items.item_type = 'single' AND s.scenario_id = items.scenario_id
+        LEFT JOIN scenario_groups sg ON sg.group_name = s.group_name
+    ),
+    total AS (
+        SELECT COALESCE(SUM(cost), 0) AS cost FROM priced
+    ),
+    debit AS (
+        UPDATE users u SET credits_balance = u.credits_balance - total.cost
+        FROM total
+        WHERE u.user_id = %(user_id)s AND total.cost > 0 AND u.credits_balance >= total.cost
+        RETURNING u.credits_balance, u.balance_seq
+    ){log_cte}
+    SELECT total.cost,
+           debit.credits_balance AS new_balance,
+           debit.balance_seq AS new_seq,
+           (SELECT credits_balance FROM users WHERE user_id = %(user_id)s) AS old_balance,
+           (SELECT balance_seq FROM users WHERE user_id = %(user_id)s) AS old_seq,
+           (SELECT array_agg(cost ORDER BY ord) FROM priced) AS costs
+    FROM total LEFT JOIN debit ON TRUE
+"""
+
+# details/scenario_id deduct_item ile aynı: grup -> (0, 'Grup: <ad>'), tekil -> (senaryo, NULL)
+BATCH_LOG_CTE = """,
+    log AS (
+        INSERT INTO logs (user_id, action, scenario_id, details, credit_cost)
+        SELECT %(user_id)s, 'run_complete',
+               CASE WHEN priced.item_type = 'group' THEN 0 ELSE priced.scenario_id END,
+               CASE WHEN priced.item_type = 'group' THEN 'Grup: ' || priced.group_name END,
+               priced.cost
+        FROM priced, debit
+        WHERE priced.cost > 0
+        ORDER BY priced.ord
+    )"""
+
 
 class CreditManager:
     @staticmethod
@@ -16,32 +118,168 @@ class CreditManager:
             return row['cost_per_run'] if row else 0
 
     @staticmethod
-    def process_deduction(conn, user_id, group_name):
+    def deduct(conn, user_id, price_sql, item_id, action, scenario_id=None, details=None,
+               idempotency_key=None, request_fingerprint=None):
+        """
+        Tek round trip'te fiyatlar, bakiyeyi kontrol eder, düşer ve loglar; başarılıysa commit eder.
+        Dönüş: (başarılı_mı, maliyet, bakiye). Yetersiz bakiyede bakiye = mevcut bakiye.
+        idempotency_key verilirse aynı anahtarla daha önce yapılmış düşümün sonucu tekrar düşmeden döner
+        (anahtar farklı istekle kullanıldıysa IdempotencyMismatch).
+        """
+        if idempotency_key:
+            replay = reserve(conn, user_id, idempotency_key, request_fingerprint)
+            if replay is not None:
+                conn.rollback()
+                return True, replay[0], replay[1]
+
         cursor = conn.cursor()
         try:
-            # 1. Maliyet Bul
-            cost = CreditManager.calculate_group_cost(cursor, group_name)
-            
-            # 2. Bakiye Kontrol
-            cursor.execute("SELECT credits_balance FROM users WHERE user_id = %s", (user_id,))
-            user = cursor.fetchone()
-            current_balance = user['credits_balance'] if user else 0
-            
-            if current_balance < cost:
-                return False, f"Yetersiz Bakiye! (Gereken: {cost}, Mevcut: {current_balance})", 0, current_balance, 402
-            
-            # 3. Düşüm İşlemi
-            if cost > 0:
-                cursor.execute("UPDATE users SET credits_balance = credits_balance - %s WHERE user_id = %s", (cost, user_id))
-                cursor.execute("INSERT INTO logs (user_id, action, details, credit_cost) VALUES (%s, %s, %s, %s)", 
-                               (user_id, 'run_group_audit', f"Grup: {group_name}", cost))
-                conn.commit()
-                current_balance -= cost
-                
-            return True, "İşlem Başarılı", cost, current_balance, 200
-            
+            log_cte = LOG_CTE if audit_log.inline else ""
+            idem_cte = RESULT_CTE if idempotency_key else ""
+            cursor.execute(DEDUCT_SQL.format(price_sql=price_sql, log_cte=log_cte, idem_cte=idem_cte), {
+                "item_id": item_id,
+                "user_id": user_id,
+                "action": action,
+                "scenario_id": scenario_id,
+                "details": details,
+                "idempotency_key": idempotency_key,
+            })
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        cost = row['cost'] or 0
+        if cost <= 0:
+            balance_cache.update(user_id, row['old_balance'], row['old_seq'])
+            return True, 0, row['old_balance'] or 0
+        if row['new_balance'] is None:
+            conn.rollback()
+            balance_cache.update(user_id, row['old_balance'], row['old_seq'])
+            return False, cost, row['old_balance'] or 0
+
+        conn.commit()
+        # Bu kullanıcının okumaları bir süre primary'de kalsın (yeni bakiyeyi görsün)
+        replicas.mark_write(user_id)
+        # get-balance önbelleği DB'ye gitmeden yeni bakiyeyi görsün (diğer worker'lar NOTIFY ile)
+        balance_cache.update(user_id, row['new_balance'], row['new_seq'])
+        if not audit_log.inline:
+            # Sadece commit edilmiş düşümler loglanır
+            audit_log.enqueue(user_id, action, scenario_id, details, cost)
+        if idempotency_key:
+            idempotency_cache.put(user_id, idempotency_key, request_fingerprint, cost, row['new_balance'])
+            maybe_purge(conn)
+        return True, cost, row['new_balance']
+
+    @staticmethod
+    def item_fingerprint(item_type, item_id):
+        """confirm-transaction isteğinin idempotency özeti (main_server hızlı yolu da kullanır)."""
+        return fingerprint("confirm", item_type, item_id)
+
+    @staticmethod
+    def group_fingerprint(group_name):
+        return fingerprint("group_audit", group_name or "")
+
+    @staticmethod
+    def deduct_item(conn, user_id, item_type, item_id, idempotency_key=None):
+        """confirm-transaction kuralları: 'group' -> grup fiyatı, 'single' -> senaryonun grup fiyatı."""
+        idem = {"idempotency_key": idempotency_key,
+                "request_fingerprint": CreditManager.item_fingerprint(item_type, item_id)}
+        if item_type == 'group':
+            # details'teki grup adı kullanım özetlerinde (usage_daily) grubu belirler
+            return CreditManager.deduct(conn, user_id, PRICE_GROUP_SQL, item_id,
+                                        'run_complete', scenario_id=0, details=f"Grup: {item_id}", **idem)
+        elif item_type == 'single':
+            return CreditManager.deduct(conn, user_id, PRICE_SINGLE_SQL, int(item_id),
+                                        'run_complete', scenario_id=int(item_id), **idem)
+        return True, 0, None
+
+    @staticmethod
+    def deduct_batch(conn, user_id, items):
+        """
+        items: [(tip, item_id), ...] ('group' -> grup adı, 'single' -> scenario_id).
+        Hepsi tek cümlede fiyatlanır ve toplam düşülür; başarılıysa commit eder.
+        Dönüş: (başarılı_mı, kalem_maliyetleri, toplam, bakiye). Yetersiz bakiyede hiçbir şey düşülmez.
+        """
+        types, groups, scenario_ids = [], [], []
+        for item_type, item_id in items:
+            types.append(item_type)
+            groups.append(str(item_id) if item_type == 'group' else None)
+            scenario_ids.append(int(item_id) if item_type == 'single' else None)
+
+        cursor = conn.cursor()
+        try:
+            log_cte = BATCH_LOG_CTE if audit_log.inline else ""
+            cursor.execute(BATCH_DEDUCT_SQL.format(log_cte=log_cte), {
+                "user_id": user_id,
+                "types": types,
+                "groups": groups,
+                "scenario_ids": scenario_ids,
+            })
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        costs = list(row['costs'] or [])
+        total = row['cost'] or 0
+        if total <= 0:
+            balance_cache.update(user_id, row['old_balance'], row['old_seq'])
+            return True, costs, 0, row['old_balance'] or 0
+        if row['new_balance'] is None:
+            conn.rollback()
+            balance_cache.update(user_id, row['old_balance'], row['old_seq'])
+            return False, costs, total, row['old_balance'] or 0
+
+        conn.commit()
+        replicas.mark_write(user_id)
+        balance_cache.update(user_id, row['new_balance'], row['new_seq'])
+        if not audit_log.inline:
+            for (item_type, item_id), cost in zip(items, costs):
+                if cost <= 0:
+                    continue
+                if item_type == 'group':
+                    audit_log.enqueue(user_id, 'run_complete', 0, f"Grup: {item_id}", cost)
+                else:
+                    audit_log.enqueue(user_id, 'run_complete', int(item_id), None, cost)
+        return True, costs, total, row['new_balance']
+
+    @staticmethod
+    def process_deduction(conn, user_id, group_name, idempotency_key=None):
+        request_fingerprint = CreditManager.group_fingerprint(group_name)
+        if idempotency_key:
+            # Bu worker'da daha önce işlendiyse DB'ye hiç gitmeden aynı sonuç
+            try:
+                replay = idempotency_cache.get(user_id, idempotency_key, request_fingerprint)
+            except IdempotencyMismatch:
+                return False, "Bu işlem anahtarı farklı bir işlem için kullanılmış", 0, 0, 409
+            if replay is not None:
+                return True, "İşlem Başarılı", replay[0], replay[1], 200
+
+        # conn verilmezse havuzdan ödünç al, iş bitince geri ver
+        owns_conn = conn is None
+        if owns_conn:
+            conn = get_pool().acquire()
+        try:
+            # Eğer grup adı boşsa veya TÜMÜ ise tüm grupların toplamı, grup yoksa 0
+            if not group_name or group_name == "TÜMÜ":
+                price_sql = PRICE_ALL_GROUPS_SQL
+            else:
+                price_sql = PRICE_GROUP_OR_ZERO_SQL
+
+            ok, cost, balance = CreditManager.deduct(conn, user_id, price_sql, group_name,
+                                                     'run_group_audit', details=f"Grup: {group_name}",
+                                                     idempotency_key=idempotency_key,
+                                                     request_fingerprint=request_fingerprint)
+            if not ok:
+                return False, f"Yetersiz Bakiye! (Gereken: {cost}, Mevcut: {balance})", 0, balance, 402
+
+            return True, "İşlem Başarılı", cost, balance, 200
+
+        except IdempotencyMismatch:
+            conn.rollback()
+            return False, "Bu işlem anahtarı farklı bir işlem için kullanılmış", 0, 0, 409
         except Exception as e:
             conn.rollback()
             return False, str(e), 0, 0, 500
         finally:
-            cursor.close()
+            if owns_conn:
+                conn.close()
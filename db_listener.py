@@ -0,0 +1,82 @@
+import select
+import threading
+import psycopg2
+import psycopg2.extensions
+
+from db_pool import get_dsn_kwargs
+
+
+class NotifyListener:
+    """
+    Postgres LISTEN/NOTIFY dinleyicisi. Havuzdan ayrı, kendi bağlantısını tutar.
+    Birden fazla uvicorn worker'ı olsa da her biri kendi dinleyicisiyle
+    admin değişikliklerinden anında haberdar olur.
+    Bağlantı koparsa yeniden bağlanır; koptuğu sürede kaçan bildirimler için
+    on_reconnect callback'leri çağrılır (önbellekler kendini tazeler).
+    """
+
+    def __init__(self, poll_interval=5.0, retry_delay=3.0):
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self._handlers = {}        # kanal -> [callback(payload)]
+        self._on_reconnect = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, channel, callback):
+        self._handlers.setdefault(channel, []).append(callback)
+
+    def on_reconnect(self, callback):
+        self._on_reconnect.append(callback)
+
+    def start(self):
+        if self._thread is not None or not self._handlers:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ghost-db-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self):
+        first = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**get_dsn_kwargs())
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                for channel in self._handlers:
+                    cur.execute(f'LISTEN "{channel}"')
+                if not first:
+                    for callback in self._on_reconnect:
+                        callback()
+                first = False
+                self._listen(conn)
+            except Exception as e:
+                print(f"Listener Hatası: {e}")
+                self._stop.wait(self.retry_delay)
+            finally:
+                if conn is not None:
+                    try: conn.close()
+                    except Exception: pass
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                note = conn.notifies.pop(0)
+                for callback in self._handlers.get(note.channel, []):
+                    try:
+                        callback(note.payload)
+                    except Exception as e:
+                        print(f"Listener Callback Hatası ({note.channel}): {e}")
+
+
+listener = NotifyListener()
@@ -0,0 +1,435 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+
+from metrics import TimedCursor, Gauge, Counter, Histogram, COLLECTORS, db_pool_wait, db_pool_timeouts, db_pool_in_use
+
+# --- HAVUZ AYARLARI (Environment Variable ile değiştirilebilir) ---
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+# Havuz doluysa en fazla bu kadar saniye bekle, sonra 503 dön (asılı kalma yok)
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "2.0"))
+# Bu süreden (sn) eski bağlantılar kapatılıp yenisi açılır
+POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", "1800"))
+# Bu süreden (sn) uzun boşta kalan bağlantı verilmeden önce SELECT 1 ile test edilir
+POOL_HEALTHCHECK_IDLE = float(os.environ.get("DB_POOL_HEALTHCHECK_IDLE", "30"))
+# DB thread'i başına en fazla bu kadar iş kuyrukta bekleyebilir, fazlası 503
+EXECUTOR_QUEUE_FACTOR = int(os.environ.get("DB_EXECUTOR_QUEUE_FACTOR", "4"))
+# Tüm DB thread'leri meşgulken işler ortalama bu kadar ms'den uzun kuyrukta bekliyorsa
+# yeni istekler kuyruğa girmeden 503 alır (yük atma). 0 = kapalı
+LOAD_SHED_WAIT_MS = float(os.environ.get("DB_LOAD_SHED_WAIT_MS", "250"))
+
+# --- OKUMA REPLİKALARI (opsiyonel) ---
+# Virgülle ayrılmış DSN listesi. Boşsa tüm okumalar primary'ye gider.
+REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Bu kadar saniyeden fazla geride kalan replika kullanılmaz
+REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "5"))
+# Replika sağlığı / gecikmesi bu aralıkla yeniden ölçülür
+REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", "5"))
+# Yazma yapan kullanıcının okumaları bu süre primary'de kalır (kendi yazdığını görsün)
+REPLICA_STICKY_SECONDS = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", "10"))
+
+
+class PoolExhausted(Exception):
+    """Havuzdaki tüm bağlantılar meşgul ve bekleme süresi doldu."""
+
+
+def get_dsn_kwargs():
+    # 1. Önce Render'ın Environment Variable'ına bak (Cloud için)
+    db_url = os.environ.get('DATABASE_URL')
+    if db_url:
+        return {"dsn": db_url}
+    # 2. Cloud yoksa yerel ayarlar
+    return {
+        "dbname": 'ghost_db',
+        "user": 'ghost_user',
+        "password": 'ghost123',
+        "host": 'localhost',
+        "port": '5432',
+    }
+
+
+class PooledConnection:
+    """
+    Havuzdan ödünç alınan bağlantı. Handler'lar eskisi gibi conn.close() çağırır,
+    ama bağlantı kapanmaz, havuza geri döner. İkinci close() çağrısı etkisizdir.
+    """
+
+    def __init__(self, db_pool, raw_conn):
+        self._pool = db_pool
+        self._conn = raw_conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DatabasePool:
+    """
+    Basit thread-safe bağlantı havuzu.
+    psycopg2.pool minconn üstündeki bağlantıları her iadede kapatıyor (yoğunlukta
+    yine her istek yeni bağlantı açıyordu), o yüzden boşta bağlantıları kendimiz tutuyoruz.
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, healthcheck_idle=POOL_HEALTHCHECK_IDLE, **connect_kwargs):
+        connect_kwargs.setdefault("cursor_factory", TimedCursor)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.recycle = recycle
+        self.healthcheck_idle = healthcheck_idle
+        self._connect_kwargs = connect_kwargs
+        # Aynı anda en fazla maxconn bağlantı dışarıda olabilir
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = []   # [(conn, açılış zamanı, son kullanım zamanı)]
+        self._born = {}   # id(conn) -> açılış zamanı
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, self._born[id(conn)], time.monotonic()))
+
+    def warm(self, count):
+        """Boşta en az count bağlantı olacak şekilde (maxconn'u aşmadan) önceden bağlantı açar."""
+        opened = 0
+        while True:
+            with self._lock:
+                if len(self._idle) >= min(count, self.maxconn) or len(self._born) >= self.maxconn:
+                    return opened
+            conn = self._connect()
+            with self._lock:
+                self._idle.append((conn, self._born[id(conn)], time.monotonic()))
+            opened += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._lock:
+            self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def acquire(self, timeout=None):
+        wait = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=wait):
+            db_pool_timeouts.inc()
+            raise PoolExhausted(f"DB havuzu dolu ({self.maxconn} bağlantı)")
+        db_pool_wait.observe(value=time.perf_counter() - started)
+        try:
+            conn = PooledConnection(self, self._checkout())
+        except Exception:
+            self._slots.release()
+            raise
+        db_pool_in_use.inc()
+        return conn
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                # En son kullanılanı al (LIFO) -> soğuk bağlantılar yaşlanıp recycle olur
+                conn, born, last_used = self._idle.pop()
+
+            now = time.monotonic()
+            if conn.closed or now - born > self.recycle:
+                self._discard(conn)
+                continue
+            if now - last_used > self.healthcheck_idle and not self._is_alive(conn):
+                self._discard(conn)
+                continue
+            return conn
+        return self._connect()
+
+    def _is_alive(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def release(self, conn):
+        try:
+            if conn.closed or self._closed:
+                self._discard(conn)
+                return
+            # Yarım kalmış transaction havuza taşınmasın
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+            born = self._born.get(id(conn), 0)
+            if time.monotonic() - born > self.recycle:
+                self._discard(conn)
+                return
+            with self._lock:
+                self._idle.append((conn, born, time.monotonic()))
+        finally:
+            db_pool_in_use.dec()
+            self._slots.release()
+
+    def closeall(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Havuzu ilk ihtiyaçta oluşturur. DB kapalıysa hata fırlatır, bir sonraki çağrıda tekrar dener."""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = DatabasePool(**get_dsn_kwargs())
+    return _db_pool
+
+
+def close_pool():
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
+    replicas.closeall()
+
+
+# --- OKUMA REPLİKALARI ---
+# Sadece okuyan ve birkaç saniyelik gecikmeyi tolere eden yollar (menü kataloğu, ayarlar,
+# senaryo listeleri, bakiye gösterimi) replikaya gider. Replika kapalıysa veya
+# REPLICA_MAX_LAG'dan fazla gerideyse primary kullanılır.
+#
+# İki yerel Postgres ile denemek için: ikinci instance'ı primary'nin streaming replikası
+# olarak kurun (pg_basebackup -R) ve
+#   DATABASE_URL=postgresql://...:5432/ghost_db DATABASE_REPLICA_URLS=postgresql://...:5433/ghost_db
+
+# Boşta primary'de WAL üretilmezken replay zamanı eskir; alınan = uygulanan ise gecikme 0
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+"""
+
+replica_healthy = Gauge("ghost_db_replica_healthy", "Replika kullanılabilir mi (1/0)", ("replica",))
+replica_lag = Gauge("ghost_db_replica_lag_seconds", "Son ölçülen replika gecikmesi", ("replica",))
+read_routing = Counter("ghost_db_reads_total", "Okuma bağlantılarının gittiği yer", ("target",))
+
+
+class Replica:
+    def __init__(self, name, dsn):
+        self.name = name
+        self.dsn = dsn
+        self.healthy = False
+        self.lag = None
+        self._pool = None
+        self._checked_at = 0.0
+        self._check_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = DatabasePool(minconn=0, dsn=self.dsn)
+        return self._pool
+
+    def maybe_check(self):
+        if time.monotonic() - self._checked_at < REPLICA_CHECK_INTERVAL:
+            return
+        # Aynı anda tek thread ölçsün, diğerleri son bilinen durumla devam etsin
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            conn = self.pool().acquire()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(REPLICA_LAG_SQL)
+                self.lag = float(cursor.fetchone()["lag"])
+            finally:
+                conn.close()
+            was_healthy, self.healthy = self.healthy, self.lag <= REPLICA_MAX_LAG
+            if was_healthy and not self.healthy:
+                print(f"UYARI: Replika {self.name} {self.lag:.1f} sn geride, okumalar primary'ye gidiyor.")
+        except Exception as e:
+            if self.healthy:
+                print(f"UYARI: Replika {self.name} erişilemiyor, okumalar primary'ye gidiyor: {e}")
+            self.healthy = False
+        finally:
+            self._check_lock.release()
+            replica_healthy.set(self.name, value=1 if self.healthy else 0)
+            if self.lag is not None:
+                replica_lag.set(self.name, value=self.lag)
+
+    def mark_down(self, error):
+        print(f"UYARI: Replika {self.name} hata verdi, primary'ye geçiliyor: {error}")
+        self.healthy = False
+        self._checked_at = time.monotonic()
+        replica_healthy.set(self.name, value=0)
+
+    def closeall(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+
+class ReplicaSet:
+    def __init__(self, urls):
+        self.replicas = [Replica(f"r{i}", url) for i, url in enumerate(urls)]
+        self._next = 0
+        self._writers = {}   # user_id -> son yazma zamanı
+        self._writers_lock = threading.Lock()
+
+    def mark_write(self, user_id):
+        if not self.replicas or user_id is None:
+            return
+        now = time.monotonic()
+        with self._writers_lock:
+            self._writers[user_id] = now
+            # Sözlük büyümesin: süresi dolanları arada bir temizle
+            if len(self._writers) > 10000:
+                self._writers = {uid: ts for uid, ts in self._writers.items()
+                                 if now - ts < REPLICA_STICKY_SECONDS}
+
+    def _is_sticky(self, user_id):
+        if user_id is None:
+            return False
+        written = self._writers.get(user_id)
+        return written is not None and time.monotonic() - written < REPLICA_STICKY_SECONDS
+
+    def acquire(self, user_id=None):
+        """Sağlıklı bir replikadan bağlantı; uygun replika yoksa None (çağıran primary'ye gider)."""
+        if not self.replicas or self._is_sticky(user_id):
+            return None
+        count = len(self.replicas)
+        start = self._next = (self._next + 1) % count
+        for i in range(count):
+            replica = self.replicas[(start + i) % count]
+            replica.maybe_check()
+            if not replica.healthy:
+                continue
+            try:
+                return replica.pool().acquire()
+            except PoolExhausted:
+                continue
+            except Exception as e:
+                replica.mark_down(e)
+        return None
+
+    def closeall(self):
+        for replica in self.replicas:
+            replica.closeall()
+
+
+replicas = ReplicaSet(REPLICA_URLS)
+
+
+def acquire_read(user_id=None, primary=False):
+    """
+    Okuma bağlantısı: replika varsa ve sağlıklıysa oradan, yoksa primary'den.
+    user_id son REPLICA_STICKY_SECONDS içinde yazma yaptıysa veya primary=True ise
+    primary (read-after-write).
+    """
+    conn = None if primary else replicas.acquire(user_id)
+    if conn is not None:
+        read_routing.inc("replica")
+        return conn
+    if replicas.replicas:
+        read_routing.inc("primary")
+    return get_pool().acquire()
+
+
+# --- ASYNC CEPHE ---
+# Bloklayıcı psycopg2 işleri event loop yerine bu sınırlı thread havuzunda koşar.
+# Thread sayısı havuz boyutuna eşit: her thread en fazla bir bağlantı tutar.
+_db_executor = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix="ghost-db")
+_pending = 0
+_pending_lock = threading.Lock()
+# Kuyruk bekleme süresinin üstel hareketli ortalaması (sn)
+_queue_wait_avg = 0.0
+
+db_queue_wait = Histogram("ghost_db_queue_wait_seconds", "İşin DB thread'i boşalana kadar beklediği süre")
+db_load_shed = Counter("ghost_db_load_shed_total", "Kuyruk beklemesi eşiği aştığı için 503 dönen istekler")
+
+
+def _run_tracked(fn, submitted):
+    global _pending, _queue_wait_avg
+    waited = time.perf_counter() - submitted
+    db_queue_wait.observe(value=waited)
+    _queue_wait_avg += (waited - _queue_wait_avg) * 0.2
+    try:
+        return fn()
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+def _should_shed():
+    # Boş thread varsa iş hemen başlar; eski (yüksek) ortalama tek başına 503 sebebi olmasın
+    return (LOAD_SHED_WAIT_MS > 0 and _pending >= POOL_MAX
+            and _queue_wait_avg * 1000 > LOAD_SHED_WAIT_MS)
+
+
+async def run_db(fn, *args, **kwargs):
+    """fn(*args) fonksiyonunu DB thread'inde çalıştırır ve sonucunu bekler."""
+    global _pending
+    with _pending_lock:
+        if _pending >= POOL_MAX * (1 + EXECUTOR_QUEUE_FACTOR):
+            raise PoolExhausted("DB kuyruğu dolu")
+        if _should_shed():
+            db_load_shed.inc()
+            raise PoolExhausted(f"DB kuyruğunda ortalama bekleme {_queue_wait_avg * 1000:.0f} ms")
+        _pending += 1
+    loop = asyncio.get_running_loop()
+    try:
+        future = loop.run_in_executor(_db_executor, _run_tracked,
+                                      functools.partial(fn, *args, **kwargs), time.perf_counter())
+    except Exception:
+        with _pending_lock:
+            _pending -= 1
+        raise
+    # İstemci bağlantıyı kesse bile iş thread'de tamamlanır, sayaç orada düşer
+    return await future
+
+
+db_pending = Gauge("ghost_db_executor_pending", "DB thread'lerinde çalışan + kuyrukta bekleyen iş sayısı")
+COLLECTORS.append(lambda: db_pending.set(value=_pending))
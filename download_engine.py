@@ -0,0 +1,363 @@
+"""
+Installer / updater için platform bağımsız indirme ve açma motoru.
+(tkinter / win32 bağımlılığı yok, Linux'ta yerel bir HTTP sunucusuna karşı denenebilir)
+
+- Sunucu Range destekliyorsa dosya birden fazla parçada paralel indirilir.
+- Yarım kalan indirme <hedef>.part + <hedef>.part.json ile kaldığı yerden devam eder.
+- Sonuç /api/check-version'ın verdiği package_hash (sha256) ile doğrulanır.
+- apply_update(): sürüm farkı kadar dosya indirip update_target_path'e uygular.
+"""
+import os
+import json
+import shutil
+import hashlib
+import zipfile
+import threading
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024            # okuma/yazma tamponu (eskisi 8 KB idi)
+MIN_PART_SIZE = 4 * 1024 * 1024     # bundan küçük dosyalar tek parçada iner
+STATE_SAVE_EVERY = 4 * 1024 * 1024  # bu kadar byte'ta bir ilerleme diske yazılır
+
+
+class DownloadError(Exception):
+    pass
+
+
+class IntegrityError(DownloadError):
+    """İndirilen dosyanın özeti beklenenle eşleşmedi."""
+
+
+def _probe(session, url, verify, timeout):
+    """Boyut, Range desteği ve ETag'i öğrenir (HEAD yerine 1 byte'lık Range GET: her sunucuda çalışır)."""
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, verify=verify, timeout=timeout) as r:
+        r.raise_for_status()
+        etag = r.headers.get("ETag")
+        if r.status_code == 206 and "/" in r.headers.get("Content-Range", ""):
+            size = int(r.headers["Content-Range"].rsplit("/", 1)[1])
+            return size, True, etag
+        length = r.headers.get("Content-Length")
+        return (int(length) if length else None), False, etag
+
+
+def _plan_segments(size, connections):
+    parts = max(1, min(connections, size // MIN_PART_SIZE))
+    step = -(-size // parts)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+class _State:
+    """Parça ilerlemesi: [başlangıç, bitiş, inen_byte] listesi + kaynak bilgisi."""
+
+    def __init__(self, path, url, size, etag, segments):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.etag = etag
+        self.segments = segments
+        self.lock = threading.Lock()
+        # Parça thread'leri aynı .tmp dosyasına yazıp birbirinin replace'ini bozmasın
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, url, size, etag):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Sunucudaki dosya değiştiyse eski parçalar işe yaramaz
+        if data.get("url") != url or data.get("size") != size or data.get("etag") != etag:
+            return None
+        return cls(path, url, size, etag, data["segments"])
+
+    def save(self):
+        with self._save_lock:
+            with self.lock:
+                data = {"url": self.url, "size": self.size, "etag": self.etag,
+                        "segments": [list(seg) for seg in self.segments]}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+    def done_bytes(self):
+        with self.lock:
+            return sum(seg[2] for seg in self.segments)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def download(url, dest_path, expected_sha256=None, connections=4, progress=None,
+             session=None, verify=True, timeout=30):
+    """
+    url'deki dosyayı dest_path'e indirir ve (verildiyse) sha256 ile doğrular.
+    progress(inen_byte, toplam_byte) farklı thread'lerden çağrılabilir.
+    """
+    session = session or requests.Session()
+    part_path = dest_path + ".part"
+    state_path = part_path + ".json"
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+
+    size, ranged, etag = _probe(session, url, verify, timeout)
+
+    if ranged and size:
+        digest = _download_ranged(session, url, part_path, state_path, size, etag,
+                                  connections, progress, verify, timeout)
+    else:
+        digest = _download_single(session, url, part_path, size, progress, verify, timeout)
+
+    if expected_sha256:
+        # Paralel modda parçalar sırasız iner, özet tek geçişte dosyadan hesaplanır
+        digest = digest or file_sha256(part_path)
+        if digest.lower() != expected_sha256.lower():
+            os.remove(part_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            raise IntegrityError("İndirilen dosya doğrulanamadı (hash uyuşmuyor).")
+
+    os.replace(part_path, dest_path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    return dest_path
+
+
+def _download_single(session, url, part_path, size, progress, verify, timeout):
+    """Range desteği olmayan sunucu: tek akış, özet yazarken hesaplanır (dosya tekrar okunmaz)."""
+    digest = hashlib.sha256()
+    done = 0
+    with session.get(url, stream=True, verify=verify, timeout=timeout) as r:
+        r.raise_for_status()
+        with open(part_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                done += len(chunk)
+                if progress:
+                    progress(done, size or done)
+    return digest.hexdigest()
+
+
+def _download_ranged(session, url, part_path, state_path, size, etag, connections,
+                     progress, verify, timeout):
+    state = None
+    if os.path.exists(part_path) and os.path.getsize(part_path) == size:
+        state = _State.load(state_path, url, size, etag)
+    if state is None:
+        state = _State(state_path, url, size, etag, _plan_segments(size, connections))
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        state.save()
+
+    errors = []
+
+    def worker(seg):
+        try:
+            _fetch_segment(session, url, part_path, state, seg, progress, verify, timeout)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seg,), daemon=True)
+               for seg in state.segments if seg[2] < seg[1] - seg[0] + 1]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    state.save()
+
+    if errors:
+        # .part ve .part.json yerinde kalır: bir sonraki deneme kaldığı yerden devam eder
+        raise DownloadError(f"İndirme yarıda kaldı: {errors[0]}")
+    return None
+
+
+def _fetch_segment(session, url, part_path, state, seg, progress, verify, timeout):
+    start, end, done = seg
+    headers = {"Range": f"bytes={start + done}-{end}"}
+    if state.etag:
+        # Dosya arada değiştiyse 206 yerine 200 + tam dosya gelir
+        headers["If-Range"] = state.etag
+    with session.get(url, headers=headers, stream=True, verify=verify, timeout=timeout) as r:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise DownloadError("Sunucudaki dosya indirme sırasında değişti.")
+        unsaved = 0
+        with open(part_path, "r+b") as f:
+            f.seek(start + done)
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                chunk = chunk[:end - start + 1 - seg[2]]
+                f.write(chunk)
+                with state.lock:
+                    seg[2] += len(chunk)
+                unsaved += len(chunk)
+                if unsaved >= STATE_SAVE_EVERY:
+                    f.flush()
+                    state.save()
+                    unsaved = 0
+                if progress:
+                    progress(state.done_bytes(), state.size)
+                if seg[2] >= end - start + 1:
+                    break
+            f.flush()
+    if seg[2] < end - start + 1:
+        raise DownloadError("Bağlantı parça bitmeden kapandı.")
+
+
+def _safe_target(root, member_name):
+    target = os.path.abspath(os.path.join(root, member_name))
+    if os.path.commonpath([target, os.path.abspath(root)]) != os.path.abspath(root):
+        raise DownloadError(f"Arşivde geçersiz yol: {member_name}")
+    return target
+
+
+def extract_archive(zip_path, target_dir, progress=None):
+    """
+    Zip'i üye üye açar (zip slip korumalı). Arşiv tek bir klasörden oluşuyorsa
+    (örn: GhostServer-main/) içeriği doğrudan target_dir'e çıkarılır.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    with zipfile.ZipFile(zip_path) as z:
+        members = z.infolist()
+        tops = {m.filename.replace("\\", "/").split("/", 1)[0] for m in members}
+        strip = ""
+        if len(tops) == 1 and all("/" in m.filename.replace("\\", "/") or m.is_dir() for m in members):
+            strip = tops.pop() + "/"
+
+        total = sum(m.file_size for m in members) or 1
+        done = 0
+        for m in members:
+            name = m.filename.replace("\\", "/")
+            if strip:
+                name = name[len(strip):]
+            if not name:
+                continue
+            target = _safe_target(target_dir, name)
+            if m.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with z.open(m) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            done += m.file_size
+            if progress:
+                progress(done, total)
+
+
+# --- FARK (DELTA) GÜNCELLEME ---
+LOCAL_MANIFEST = ".ghost_manifest.json"
+STAGING_DIR = ".update-staging"
+BACKUP_DIR = ".update-backup"
+
+
+def local_manifest(target_dir):
+    """Kurulu dosyaların {yol: sha256} listesi. Son güncellemede yazılan manifest varsa o kullanılır."""
+    try:
+        with open(os.path.join(target_dir, LOCAL_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(target_dir):
+        dirnames[:] = [d for d in dirnames if d not in (STAGING_DIR, BACKUP_DIR)]
+        for filename in filenames:
+            full = os.path.join(dirpath, filename)
+            rel = os.path.relpath(full, target_dir).replace(os.sep, "/")
+            if rel != LOCAL_MANIFEST:
+                files[rel] = file_sha256(full)
+    return {"version": None, "files": files}
+
+
+def save_local_manifest(target_dir, version, files):
+    """Kurulu sürümü ve dosya özetlerini yazar; sonraki apply_update sunucuya bu sürümü bildirir."""
+    tmp = os.path.join(target_dir, LOCAL_MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "files": files}, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(target_dir, LOCAL_MANIFEST))
+
+
+def apply_update(server_url, target_dir, current_version=None, target_version=None,
+                 progress=None, session=None, verify=True, timeout=30):
+    """
+    /api/update-delta ile sadece değişen dosyaları indirir, hepsini doğruladıktan sonra
+    target_dir'e (update_target_path) uygular. Uygulama sırasında hata olursa
+    değiştirilen dosyalar yedekten geri alınır. Dönüş: sunucunun delta cevabı.
+    """
+    session = session or requests.Session()
+    manifest = local_manifest(target_dir)
+    resp = session.post(server_url.rstrip("/") + "/api/update-delta", json={
+        "current_version": current_version or manifest.get("version"),
+        "target_version": target_version,
+        "files": manifest["files"],
+    }, verify=verify, timeout=timeout)
+    resp.raise_for_status()
+    delta = resp.json()
+
+    staging = os.path.join(target_dir, STAGING_DIR)
+    backup = os.path.join(target_dir, BACKUP_DIR)
+    for path in (staging, backup):
+        shutil.rmtree(path, ignore_errors=True)
+
+    # 1. Değişen dosyaları geçici klasöre indir ve tek tek doğrula
+    total = delta.get("bytes") or 1
+    done = 0
+    for item in delta["changed"]:
+        staged = _safe_target(staging, item["path"])
+        download(server_url.rstrip("/") + item["url"], staged, expected_sha256=item["sha256"],
+                 connections=1 if item["size"] < MIN_PART_SIZE * 2 else 4,
+                 session=session, verify=verify, timeout=timeout)
+        done += item["size"]
+        if progress:
+            progress(done, total)
+
+    # 2. Hepsi inince yerine koy; hata olursa yedekten geri al
+    applied = []  # (hedef, yedek_yolu veya None)
+    try:
+        for item in delta["changed"]:
+            target = _safe_target(target_dir, item["path"])
+            saved = _move_to_backup(target, backup, item["path"])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(_safe_target(staging, item["path"]), target)
+            applied.append((target, saved))
+        for path in delta["removed"]:
+            target = _safe_target(target_dir, path)
+            saved = _move_to_backup(target, backup, path)
+            applied.append((None, saved and (target, saved)))
+    except Exception:
+        for target, saved in reversed(applied):
+            if target is None:
+                if saved:
+                    os.replace(saved[1], saved[0])
+                continue
+            if os.path.exists(target):
+                os.remove(target)
+            if saved:
+                os.replace(saved, target)
+        raise
+
+    # 3. Yeni manifesti en son yaz: yarım kalan güncelleme bir sonraki denemede tekrar hesaplanır
+    files = dict(manifest["files"])
+    for item in delta["changed"]:
+        files[item["path"]] = item["sha256"]
+    for path in delta["removed"]:
+        files.pop(path, None)
+    save_local_manifest(target_dir, delta.get("to"), files)
+
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.rmtree(backup, ignore_errors=True)
+    return delta
+
+
+def _move_to_backup(target, backup_root, rel_path):
+    if not os.path.exists(target):
+        return None
+    saved = _safe_target(backup_root, rel_path)
+    os.makedirs(os.path.dirname(saved), exist_ok=True)
+    os.replace(target, saved)
+    return saved
@@ -0,0 +1,51 @@
+import os
+
+from catalog_cache import dump_json
+from metrics import TimedCursor
+
+# Sunucu tarafı cursor her turda bu kadar satır çeker -> bellek grup boyutundan bağımsız
+STREAM_ITERSIZE = int(os.environ.get("GROUP_STREAM_ITERSIZE", "200"))
+# İstemciye bu boyutu geçince parça gönder
+STREAM_CHUNK_BYTES = int(os.environ.get("GROUP_STREAM_CHUNK_BYTES", str(64 * 1024)))
+# İstemci "stream" göndermezse varsayılan mod
+STREAM_DEFAULT = os.environ.get("GROUP_PACKAGE_STREAM", "0") == "1"
+
+GROUP_PACKAGE_SQL = """
+    SELECT scenario_id as id, risk_title, code_payload, source_type, 
+           risk_message, legislation, risk_reason, solution_suggestion, 
+           cross_check_rule as cross_check, is_pinned, group_name, payload_hash
+    FROM scenarios 
+    WHERE group_name = %s AND is_active = TRUE
+"""
+
+
+def stream_group_package(conn, group_name, cost):
+    """
+    /api/get-group-package gövdesini parça parça üretir (named cursor + chunked transfer).
+    Çıktı, normal moddaki JSON ile aynı yapıdadır. Bağlantı akış bitince (veya istemci
+    koparsa) havuza döner.
+    """
+    cursor = None
+    try:
+        cursor = conn.cursor(name="group_package_stream", cursor_factory=TimedCursor)
+        cursor.itersize = STREAM_ITERSIZE
+        cursor.execute(GROUP_PACKAGE_SQL, (group_name,))
+
+        head = dump_json({"success": True, "cost_to_deduct": cost})
+        buffer = bytearray(head[:-1] + b',"scenarios":[')
+        first = True
+        for row in cursor:
+            if not first:
+                buffer += b","
+            buffer += dump_json(row)
+            first = False
+            if len(buffer) >= STREAM_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b"]}"
+        yield bytes(buffer)
+    finally:
+        if cursor is not None:
+            try: cursor.close()
+            except Exception: pass
+        conn.close()
@@ -0,0 +1,166 @@
+"""
+Kredi düşümlerinde istemci idempotency anahtarı.
+Zaman aşımı sonrası tekrar gönderilen onay, ilk isteğin sonucunu alır; ikinci kez düşülmez.
+- Önce süreç içi LRU (DB'ye hiç gidilmez).
+- Yoksa idempotency_keys tablosu (sql/009_idempotency_keys.sql): anahtar, düşümle aynı
+  transaction'da ayrılır. Aynı anahtarla eşzamanlı gelen ikinci istek unique index'te ilkinin
+  commit'ini bekler ve onun sonucunu okur (diğer worker'lar ve yeniden başlatma sonrası da geçerli).
+- Sadece başarılı düşümler saklanır; yetersiz bakiyede anahtar serbest kalır.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from metrics import Counter
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "20000"))
+# Süresi dolan satırlar en fazla bu aralıkla (sn) ve tek seferde bu kadar satır silinir
+IDEMPOTENCY_PURGE_INTERVAL = float(os.environ.get("IDEMPOTENCY_PURGE_INTERVAL", "600"))
+IDEMPOTENCY_PURGE_BATCH = int(os.environ.get("IDEMPOTENCY_PURGE_BATCH", "5000"))
+MAX_KEY_LENGTH = 128
+
+# Satır eklenirse anahtar yenidir; süresi dolmuş satır varsa sıfırlanıp yeniden kullanılır.
+# Satır dönmezse anahtar daha önce kullanılmış (LOOKUP_SQL ile sonucu okunur).
+RESERVE_SQL = """
+    INSERT INTO idempotency_keys (user_id, idem_key, fingerprint)
+    VALUES (%(user_id)s, %(idempotency_key)s, %(fingerprint)s)
+    ON CONFLICT (user_id, idem_key) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint, cost = NULL, balance = NULL, created_at = now()
+        WHERE idempotency_keys.created_at < now() - make_interval(secs => %(ttl)s)
+    RETURNING 1
+"""
+
+LOOKUP_SQL = """
+    SELECT fingerprint, cost, balance
+    FROM idempotency_keys
+    WHERE user_id = %(user_id)s AND idem_key = %(idempotency_key)s
+"""
+
+# credit_manager.DEDUCT_SQL'e eklenir: sonuç, düşümle aynı cümlede anahtara yazılır
+RESULT_CTE = """,
+    idem AS (
+        UPDATE idempotency_keys k SET cost = price.cost, balance = debit.credits_balance
+        FROM price, debit
+        WHERE k.user_id = %(user_id)s AND k.idem_key = %(idempotency_key)s
+    )"""
+
+PURGE_SQL = """
+    DELETE FROM idempotency_keys
+    WHERE ctid IN (
+        SELECT ctid FROM idempotency_keys
+        WHERE created_at < now() - make_interval(secs => %(ttl)s)
+        LIMIT %(limit)s
+    )
+"""
+
+idempotency_requests = Counter("ghost_idempotency_requests_total",
+                               "Anahtarlı düşümler (new = ilk istek, cache/db = tekrar, conflict = farklı istek)",
+                               ("result",))
+
+
+class IdempotencyMismatch(Exception):
+    """Aynı anahtar farklı bir işlem (kalem/grup) için tekrar kullanıldı."""
+
+
+def normalize_key(key):
+    """Boşsa None; çok uzunsa ValueError."""
+    if key is None:
+        return None
+    key = str(key).strip()
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"idempotency_key en fazla {MAX_KEY_LENGTH} karakter olabilir")
+    return key
+
+
+def fingerprint(*parts):
+    """İsteğin özeti: aynı anahtarla farklı işlem gelirse yakalanır."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+class IdempotencyCache:
+    def __init__(self, max_size=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # (user_id, anahtar) -> (fingerprint, maliyet, bakiye, son kullanma)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key, fp):
+        """Önceki sonuç (maliyet, bakiye) veya None. Anahtar başka istekle kullanıldıysa IdempotencyMismatch."""
+        if user_id is None or not key:
+            return None
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                return None
+            if entry[3] < time.monotonic():
+                del self._entries[(user_id, key)]
+                return None
+            self._entries.move_to_end((user_id, key))
+        if entry[0] != fp:
+            idempotency_requests.inc("conflict")
+            raise IdempotencyMismatch(key)
+        idempotency_requests.inc("cache")
+        return entry[1], entry[2]
+
+    def put(self, user_id, key, fp, cost, balance):
+        with self._lock:
+            self._entries[(user_id, key)] = (fp, cost, balance, time.monotonic() + self.ttl)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+idempotency_cache = IdempotencyCache()
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def reserve(conn, user_id, key, fp):
+    """
+    Anahtarı açık transaction'da ayırır. Yeni anahtarsa None (düşüme devam), daha önce
+    işlenmişse o sonucun (maliyet, bakiye) değeri. Farklı istekle kullanıldıysa IdempotencyMismatch.
+    """
+    params = {"user_id": user_id, "idempotency_key": key, "fingerprint": fp, "ttl": IDEMPOTENCY_TTL}
+    cursor = conn.cursor()
+    try:
+        cursor.execute(RESERVE_SQL, params)
+        if cursor.fetchone():
+            idempotency_requests.inc("new")
+            return None
+        cursor.execute(LOOKUP_SQL, params)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None or row["cost"] is None:
+        # Sonuçsuz satır commit edilmez; yine de olursa istek yeniymiş gibi işlenir
+        return None
+    if row["fingerprint"] != fp:
+        idempotency_requests.inc("conflict")
+        raise IdempotencyMismatch(key)
+    idempotency_requests.inc("db")
+    idempotency_cache.put(user_id, key, fp, row["cost"], row["balance"])
+    return row["cost"], row["balance"]
+
+
+def maybe_purge(conn):
+    """Süresi dolan anahtarları arada bir siler (worker başına en fazla IDEMPOTENCY_PURGE_INTERVAL'de bir)."""
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < IDEMPOTENCY_PURGE_INTERVAL or not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        _last_purge = now
+        cursor = conn.cursor()
+        cursor.execute(PURGE_SQL, {"ttl": IDEMPOTENCY_TTL, "limit": IDEMPOTENCY_PURGE_BATCH})
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Idempotency Temizlik Hatası: {e}")
+    finally:
+        _purge_lock.release()
@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import requests
-import zipfile
 import os
 import sys
 import threading
@@ -9,8 +8,8 @@ import subprocess
 import winshell  # pip install pywin32
 from win32com.client import Dispatch
 import pythoncom 
-import shutil
 import urllib3 # <--- EKLENDİ
+import download_engine
 
 # --- UYARILARI GİZLE (Sessiz Mod) ---
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -72,34 +71,13 @@ class GhostInstaller:
             resp = requests.get(API_CHECK_URL, verify=False, timeout=10)
             if resp.status_code != 200: raise Exception("Sunucu hatası.")
             
-            download_url = resp.json().get("download_url")
-            if not download_url: raise Exception("İndirme linki yok!")
-
-            # 3. İNDİR
-            self.update_status("Dosyalar indiriliyor...", 30)
-            zip_path = os.path.join(INSTALL_PATH, "setup.zip")
-            with requests.get(download_url, stream=True, verify=False) as r:
-                r.raise_for_status()
-                with open(zip_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-
-            # 4. ZIP AÇ
-            self.update_status("Dosyalar çıkartılıyor...", 60)
-            with zipfile.ZipFile(zip_path, 'r') as z:
-                z.extractall(INSTALL_PATH)
-            
-            try: os.remove(zip_path)
-            except: pass
-
-            # 5. KLASÖR YAPISINI DÜZELT (Flatten)
-            # Zip içinden tek bir klasör çıkarsa (örn: GhostServer-main), içindekileri ana dizine al
-            items = os.listdir(INSTALL_PATH)
-            if len(items) == 1 and os.path.isdir(os.path.join(INSTALL_PATH, items[0])):
-                nested_folder = os.path.join(INSTALL_PATH, items[0])
-                for file_name in os.listdir(nested_folder):
-                    shutil.move(os.path.join(nested_folder, file_name), INSTALL_PATH)
-                os.rmdir(nested_folder)
+            info = resp.json()
+            # Güncellenen dosyaların kökü (sunucudaki update_target_path, kurulum klasörüne göre)
+            update_dir = os.path.normpath(os.path.join(INSTALL_PATH, info.get("target_path") or "."))
+
+            # 3a. DAHA ÖNCE KURULDUYSA: sadece değişen dosyalar (/api/update-delta)
+            if not self.try_delta_update(info, update_dir):
+                self.install_full_package(info, update_dir)
 
             # 6. HEDEF BELİRLE
             target_exe = os.path.join(INSTALL_PATH, "launcher.exe")
@@ -107,7 +85,7 @@ class GhostInstaller:
                 target_exe = os.path.join(INSTALL_PATH, "launcher.py")
 
             # 7. KISAYOL VE BAŞLATMA
-            self.update_status("Kısayol oluşturuluyor...", 80)
+            self.update_status("Kısayol oluşturuluyor...", 85)
             self.create_shortcut(target_exe)
 
             self.update_status("Kurulum Tamamlandı!", 100)
@@ -122,6 +100,66 @@ class GhostInstaller:
             self.lbl_info.config(text="Kurulum Başarısız", fg="#d63031")
             self.btn_action.config(state="normal", text="TEKRAR DENE")
 
+    def try_delta_update(self, info, update_dir):
+        """
+        Önceki kurulum/güncelleme yerel manifest bıraktıysa sadece değişen dosyaları indirir.
+        Sunucuda sürüm ağacı yoksa veya güncelleme yarıda kalırsa (dosyalar yedekten geri alınır)
+        False döner ve tam paket kurulur.
+        """
+        if not os.path.exists(os.path.join(update_dir, download_engine.LOCAL_MANIFEST)):
+            return False
+        self.update_status("Güncelleme kontrol ediliyor...", 30)
+        try:
+            delta = download_engine.apply_update(
+                SERVER_URL, update_dir, target_version=info.get("latest_version"),
+                progress=lambda done, total: self.update_status(
+                    f"Güncelleniyor... {done // (1024 * 1024)} / {total // (1024 * 1024)} MB",
+                    30 + 50 * done / max(total, 1)),
+                verify=False,
+            )
+        except Exception:
+            return False
+        self.update_status(f"Güncellendi: {len(delta['changed'])} dosya", 80)
+        return True
+
+    def install_full_package(self, info, update_dir):
+        # package_hash sadece package_url'deki dosyaya aittir; eski sunucu package_url dönmüyorsa
+        # download_url indirilir ama özet başka dosyanın olabileceği için doğrulanmaz
+        package_url = info.get("package_url")
+        download_url = package_url or info.get("download_url")
+        if not download_url: raise Exception("İndirme linki yok!")
+        if download_url.startswith("/"): download_url = SERVER_URL + download_url
+        expected_hash = info.get("package_hash") if package_url else None
+
+        # 3. İNDİR (paralel parçalar, yarıda kalırsa kaldığı yerden devam, hash doğrulamalı)
+        self.update_status("Dosyalar indiriliyor...", 30)
+        zip_path = os.path.join(INSTALL_PATH, "setup.zip")
+        download_engine.download(
+            download_url, zip_path,
+            expected_sha256=expected_hash or None,
+            progress=lambda done, total: self.update_status(
+                f"Dosyalar indiriliyor... {done // (1024 * 1024)} / {total // (1024 * 1024)} MB",
+                30 + 30 * done / max(total, 1)),
+            verify=False,
+        )
+
+        # 4. ZIP AÇ (tek klasörlü arşivler düzleştirilerek açılır)
+        self.update_status("Dosyalar çıkartılıyor...", 60)
+        download_engine.extract_archive(
+            zip_path, INSTALL_PATH,
+            progress=lambda done, total: self.update_status("Dosyalar çıkartılıyor...", 60 + 20 * done / total))
+        
+        try: os.remove(zip_path)
+        except: pass
+
+        # 5. KURULU SÜRÜMÜ KAYDET (sonraki çalıştırma sadece farkı indirir)
+        if os.path.isdir(update_dir):
+            # Önceki kurulumdan kalan manifest artık geçersiz: dosyalar yeniden özetlenir
+            try: os.remove(os.path.join(update_dir, download_engine.LOCAL_MANIFEST))
+            except FileNotFoundError: pass
+            files = download_engine.local_manifest(update_dir)["files"]
+            download_engine.save_local_manifest(update_dir, info.get("latest_version"), files)
+
     def create_shortcut(self, target_path):
         try:
             pythoncom.CoInitialize()
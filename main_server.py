@@ -1,12 +1,30 @@
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from fastapi import FastAPI, Request, Form, Body
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import hashlib
-from fastapi.responses import FileResponse
+import math
+from urllib.parse import quote
+from db_pool import get_pool, close_pool, run_db, acquire_read, PoolExhausted
+from db_listener import listener
+from settings_cache import settings_cache
+from catalog_cache import catalog_cache, etag_matches, dump_json, groups_key
+from credit_manager import CreditManager, CONFIRM_BATCH_MAX_ITEMS
+from audit_log import audit_log
+from session_tokens import issue_token, resolve_session, issue_admin_token, admin_session, AdminRequired, ADMIN_COOKIE, ADMIN_TOKEN_TTL
+from compression import json_response, encoded_response, choose_encoding, PrecompressedBody
+from release_files import release_index, version_store, file_response
+from group_stream import GROUP_PACKAGE_SQL, STREAM_DEFAULT, stream_group_package
+from metrics import MetricsMiddleware, render_prometheus
+from usage_stats import dashboard_stats, usage_report, EMPTY_STATS
+from admin_scenarios import list_scenarios, get_scenario, list_groups, PAGE_SIZE
+from rate_limit import rate_limiter, client_key, check_login, RateLimited
+from singleflight import group_package_flight, check_version_flight
+from balance_cache import balance_cache, balance_version, BALANCE_MAX_WAIT
+from warmup import warmup
+from idempotency import idempotency_cache, normalize_key, IdempotencyMismatch
 app = FastAPI()
 
 app.add_middleware(
@@ -16,56 +34,85 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Route bazında gecikme / durum kodu metrikleri (/metrics)
+app.add_middleware(MetricsMiddleware)
 
 templates = Jinja2Templates(directory="templates")
 
-# main.py dosyasının başındaki o kısmı bul ve bununla değiştir:
-
-def get_db_connection():
-    # 1. Önce Render'ın Environment Variable'ına bak (Cloud için)
-    db_url = os.environ.get('DATABASE_URL')
-    
-    # 2. Eğer Cloud adresi varsa onu kullan
-    if db_url:
-        try:
-            conn = psycopg2.connect(db_url, cursor_factory=RealDictCursor)
-            return conn
-        except Exception as e:
-            print(f"Cloud DB Hatası: {e}")
-            return None
-            
-    # 3. Eğer Cloud yoksa (Local bilgisayardaysan) bunu kullan
-    else:
-        try:
-            # Burası senin yerel ayarların
-            conn = psycopg2.connect(
-                dbname='ghost_db', 
-                user='ghost_user', 
-                password='ghost123', 
-                host='localhost', 
-                port='5432',
-                cursor_factory=RealDictCursor
-            )
-            return conn
-        except Exception as e:
-            print(f"Local DB Hatası: {e}")
-            return None
-
-def get_system_settings(cursor):
+# Havuz doluysa istek asılı kalmasın, hemen 503 dönsün
+@app.exception_handler(PoolExhausted)
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    return JSONResponse(
+        content={"status": "error", "message": "Sunucu yoğun, lütfen tekrar deneyin."},
+        status_code=503,
+        headers={"Retry-After": "1"},
+    )
+
+# Kullanıcı/cihaz bütçesini aşan istek DB'ye gitmeden reddedilir
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        content={"status": "error", "message": "Çok fazla istek, lütfen biraz bekleyin."},
+        status_code=429,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+# Admin oturumu olmayan panel/API istekleri: API'ye 401, panele giriş formu
+@app.exception_handler(AdminRequired)
+async def admin_required_handler(request: Request, exc: AdminRequired):
+    if request.url.path.startswith("/api/"):
+        return JSONResponse(content={"status": "error", "message": "Admin girişi gerekli."}, status_code=401)
+    return templates.TemplateResponse("login.html", {"request": request, "error": "Admin girişi gerekli"}, status_code=401)
+
+@app.on_event("startup")
+def start_listener():
+    listener.start()
+    audit_log.start()
+    # DB bağlantıları, ayarlar ve katalog arka planda hazırlanır (/health/ready)
+    warmup.start()
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    warmup.stop()
+    listener.stop()
+    # Kuyruktaki loglar havuz kapanmadan yazılsın
+    audit_log.stop()
+    close_pool()
+
+# NOT: Handler'lar async ama psycopg2 bloklayıcı. Event loop'u kilitlememek için
+# her DB işi _xxx() senkron fonksiyonunda, run_db ile DB thread'lerinde çalışır.
+
+def get_db_connection(readonly=False, user_id=None):
+    """
+    Havuzdan bağlantı ödünç verir. conn.close() bağlantıyı kapatmaz, havuza iade eder.
+    DB'ye ulaşılamıyorsa None döner; havuz doluysa PoolExhausted fırlar (-> 503).
+    readonly=True: sadece okuyan yollar; DATABASE_REPLICA_URLS varsa replikaya gider
+    (user_id yakın zamanda yazma yaptıysa primary'de kalır).
+    """
     try:
-        cursor.execute("SELECT * FROM system_settings")
-        rows = cursor.fetchall()
-        settings = {row['setting_key']: row['setting_value'] for row in rows}
-        return settings
-    except:
-        return {}
+        if readonly:
+            return acquire_read(user_id)
+        return get_pool().acquire()
+    except PoolExhausted:
+        raise
+    except Exception as e:
+        print(f"DB Hatası: {e}")
+        return None
+
+def get_system_settings():
+    # Önbellekten gelir (TTL + NOTIFY). DB geçici yoksa son bilinen değerler döner.
+    return settings_cache.get()
 
 # --- API ENDPOINTS ---
 
 # main_server.py -> /api/login fonksiyonunun GÜNCEL HALİ
 
 @app.post("/api/login")
-async def api_login(payload: dict = Body(...)):
+async def api_login(request: Request, payload: dict = Body(...)):
+    check_login(request, payload.get("email"))
+    return await run_db(_api_login, payload)
+
+def _api_login(payload):
     email = payload.get("email")
     password = payload.get("password")
     hwid = payload.get("hwid") 
@@ -75,127 +122,98 @@ async def api_login(payload: dict = Body(...)):
     if not conn: return JSONResponse(content={"status": "error", "message": "DB Hatası"}, status_code=500)
     
     try:
+        input_hash = hashlib.sha256((password or "").encode()).hexdigest()
+
+        # Kullanıcı, durum, şifre, cihaz limiti ve cihaz kaydı: tek round trip (sql/004_login_function.sql)
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
+        cursor.execute("SELECT * FROM ghost_login(%s, %s, %s, %s)", (email, input_hash, hwid, device_name))
         user = cursor.fetchone()
-        
-        settings = get_system_settings(cursor)
-        
-        if user:
-            # --- 1. DURUM KONTROLÜ (YENİ EKLENDİ) ---
-            # Eğer kullanıcı 'Aktif' değilse, şifreye bile bakmadan reddet.
-            if user.get("status") != "Aktif":
-                conn.close()
-                return JSONResponse(content={"status": "error", "message": "Hesabınız PASİF durumdadır. Lütfen yönetici ile iletişime geçiniz."}, status_code=403)
-            # ----------------------------------------
-
-            input_hash = hashlib.sha256(password.encode()).hexdigest()
-            if input_hash == user["password_hash"]:
-                
-                user_id = user["user_id"]
-                limit = user.get("max_device_limit", 1) 
-                if limit is None: limit = 1
-                
-                # --- 2. CİHAZ KONTROLÜ ---
-                cursor.execute("SELECT * FROM user_devices WHERE user_id = %s AND hwid = %s", (user_id, hwid))
-                existing_device = cursor.fetchone()
-                
-                if existing_device:
-                    cursor.execute("UPDATE user_devices SET last_login = CURRENT_TIMESTAMP WHERE device_id = %s", (existing_device['device_id'],))
-                    conn.commit()
-                else:
-                    cursor.execute("SELECT count(*) as cnt FROM user_devices WHERE user_id = %s", (user_id,))
-                    res = cursor.fetchone()
-                    if res['cnt'] < limit:
-                        cursor.execute("INSERT INTO user_devices (user_id, hwid, device_name) VALUES (%s, %s, %s)", (user_id, hwid, device_name))
-                        conn.commit()
-                    else:
-                        conn.close()
-                        return JSONResponse(content={"status": "error", "message": f"Cihaz Limiti Doldu! (Maks: {limit} Cihaz)"}, status_code=403)
-
-                # --- GİRİŞ BAŞARILI ---
-                fake_token = f"{user['user_id']}"
-                response_data = {
-                    "status": "success",
-                    "token": fake_token,
-                    
-                    # --- EKLENEN SATIR BURASI ---
-                    "download_url": settings.get("download_url", ""), 
-                    # ----------------------------
-                    
-                    "company": user.get("company_name"),
-                    "credits": user.get("credits_balance", 0),
-                    "security": {
-                        "latest_version": settings.get("latest_version", "1.0.0"),
-                        "main_exe_hash": settings.get("main_exe_hash", ""),
-                        "force_update": settings.get("force_update", "False"),
-                        "download_url": settings.get("download_url", "")
-                    }
-                }
-                conn.close()
-                return JSONResponse(content=response_data)
-        
+        conn.commit()
         conn.close()
-        return JSONResponse(content={"status": "error", "message": "Hatalı Giriş"}, status_code=401)
+
+        result = user["result"] if user else "bad_credentials"
+
+        # --- 1. DURUM KONTROLÜ ---
+        # Eğer kullanıcı 'Aktif' değilse, şifreye bile bakmadan reddet.
+        if result == "inactive":
+            return JSONResponse(content={"status": "error", "message": "Hesabınız PASİF durumdadır. Lütfen yönetici ile iletişime geçiniz."}, status_code=403)
+
+        # --- 2. CİHAZ KONTROLÜ ---
+        if result == "device_limit":
+            return JSONResponse(content={"status": "error", "message": f"Cihaz Limiti Doldu! (Maks: {user['device_limit']} Cihaz)"}, status_code=403)
+
+        if result != "ok":
+            return JSONResponse(content={"status": "error", "message": "Hatalı Giriş"}, status_code=401)
+
+        settings = get_system_settings()
+
+        # --- GİRİŞ BAŞARILI ---
+        # İmzalı token: sonraki çağrılar kullanıcıyı DB'ye gitmeden tanır
+        token = issue_token(user["user_id"], user.get("allowed_groups"), user.get("status"))
+        warmup.login_succeeded()
+        response_data = {
+            "status": "success",
+            "token": token,
+            
+            # --- EKLENEN SATIR BURASI ---
+            "download_url": settings.get("download_url", ""), 
+            # ----------------------------
+            
+            "company": user.get("company_name"),
+            "credits": user.get("credits_balance") or 0,
+            "security": {
+                "latest_version": settings.get("latest_version", "1.0.0"),
+                "main_exe_hash": settings.get("main_exe_hash", ""),
+                "force_update": settings.get("force_update", "False"),
+                "download_url": settings.get("download_url", "")
+            }
+        }
+        return JSONResponse(content=jsonable_encoder(response_data))
     except Exception as e:
         if conn: conn.close()
         return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
 
 
 @app.get("/api/get-menu")
-async def get_menu(token: str):
-    conn = get_db_connection()
-    if not conn: return {"scenarios": []}
-    
+async def get_menu(token: str, request: Request):
+    rate_limiter.hit("get-menu", client_key(request, token))
+    return await run_db(_get_menu, token, request.headers.get("if-none-match"),
+                        request.headers.get("accept-encoding"))
+
+def _get_menu(token, if_none_match=None, accept_encoding=None):
     try:
-        cursor = conn.cursor()
-        
-        # 1. Önce Token'dan Kullanıcıyı ve İzinlerini Bul
-        try: user_id = int(token)
-        except: return {"scenarios": []}
-        
-        cursor.execute("SELECT allowed_groups FROM users WHERE user_id = %s", (user_id,))
-        user_row = cursor.fetchone()
-        
-        if not user_row:
-            conn.close()
+        # 1. Token'dan Kullanıcıyı ve İzinlerini Bul (imzalı token, DB'ye gitmez)
+        session = resolve_session(token)
+        if not session:
             return {"scenarios": []}
             
-        allowed_groups_str = user_row.get("allowed_groups") # Örn: "Stok,Cari" veya None
-        
-        # 2. SQL Sorgusunu Hazırla
-        base_sql = """
-            SELECT scenario_id as id, group_name, risk_title, description, 
-                risk_message, legislation, risk_reason, solution_suggestion, 
-                source_type, cost_per_run, is_active, cross_check_rule as cross_check
-            FROM scenarios 
-            WHERE is_active = TRUE
-        """
-        
-        params = []
+        allowed_groups_str = session.allowed_groups # Örn: "Stok,Cari" veya None
         
-        # Eğer kullanıcının grup kısıtlaması VARSA, filtrele
-        if allowed_groups_str and len(allowed_groups_str.strip()) > 0:
-            # String'i listeye çevirip SQL IN yapısı kuruyoruz
-            group_list = allowed_groups_str.split(',')
-            base_sql += " AND group_name = ANY(%s)"
-            params.append(group_list)
-            
-        # Kısıtlama yoksa (None ise) tümünü getirir (WHERE is_active = TRUE kalır)
+        # 2. Katalog bellekte hazır; kullanıcının grup kümesine ait serialize edilmiş gövde gelir
+        view = catalog_cache.view(allowed_groups_str)
+        if view is None:
+            return {"scenarios": []}
 
-        cursor.execute(base_sql, tuple(params))
-        scenarios = cursor.fetchall()
-        
-        conn.close()
-        return {"scenarios": scenarios}
+        encoding = choose_encoding(accept_encoding)
+        etag = view.etag_for(encoding)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        # Görünüm her kodlama için bir kez sıkıştırılır, sonraki istekler aynı byte'ları alır
+        return encoded_response(view, encoding, headers)
         
+    except PoolExhausted:
+        raise
     except Exception as e:
         print(f"Menü Hatası: {e}")
-        if conn: conn.close()
         return {"scenarios": []}
 
 @app.post("/api/get-code")
-async def get_code(payload: dict = Body(...)):
+async def get_code(request: Request, payload: dict = Body(...)):
+    rate_limiter.hit("get-code", client_key(request, payload.get("token")))
+    return await run_db(_get_code, payload)
+
+def _get_code(payload):
     """
     TEKLİ ÇEKİM (GÜNCELLENDİ): 
     Artık krediyi BURADA DÜŞMÜYOR. Sadece bakiyeyi kontrol ediyor.
@@ -203,19 +221,19 @@ async def get_code(payload: dict = Body(...)):
     token = payload.get("token")
     scenario_id = payload.get("scenario_id")
     
-    conn = get_db_connection()
+    session = resolve_session(token)
+    if not session: return JSONResponse(content={"error": "Token hatası"}, status_code=401)
+    user_id = session.user_id
+
+    conn = get_db_connection(readonly=True, user_id=user_id)
     if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
 
     try:
         cursor = conn.cursor()
-        try: user_id = int(token)
-        except: 
-            conn.close()
-            return JSONResponse(content={"error": "Token hatası"}, status_code=401)
 
         # 1. Maliyet Kontrolü
         sql_query = """
-            SELECT s.code_payload, 
+            SELECT s.code_payload, s.payload_hash,
                    COALESCE(g.cost_per_run, 50) as dynamic_cost
             FROM scenarios s
             LEFT JOIN scenario_groups g ON s.group_name = g.group_name
@@ -241,30 +259,70 @@ async def get_code(payload: dict = Body(...)):
         # NOT: Burada 'UPDATE users...' satırını kaldırdık!
         
         conn.close()
-        return {"code": scenario["code_payload"], "cost": cost}
+        return {"code": scenario["code_payload"], "cost": cost, "payload_hash": scenario["payload_hash"]}
 
     except Exception as e:
         if conn: conn.close()
         return JSONResponse(content={"error": f"Sunucu Hatası: {str(e)}"}, status_code=500)
 
 @app.post("/api/get-group-package")
-async def get_group_package(payload: dict = Body(...)):
+async def get_group_package(request: Request, payload: dict = Body(...)):
+    rate_limiter.hit("get-group-package", client_key(request, payload.get("token")))
+    result = await run_db(_get_group_package, payload)
+    if isinstance(result, Response):
+        return result  # hata veya stream
+    cost = result
+    group_name = payload.get("group_name")
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    try:
+        # Paket herkes için aynı: aynı anda aynı grubu isteyenler tek sorguyu ve tek sıkıştırmayı paylaşır
+        package = await group_package_flight.do((group_name, cost, encoding), run_db,
+                                                _build_group_package, group_name, cost, encoding)
+    except PoolExhausted:
+        raise
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    return encoded_response(package, encoding)
+
+def _build_group_package(group_name, cost, encoding):
+    # İstemciye ne kadar keseceğini bildiriyoruz (cost_to_deduct)
+    head = dump_json({"success": True, "cost_to_deduct": cost})
+    package = PrecompressedBody(head[:-1] + b',"scenarios":' + _fetch_group_scenarios(group_name) + b'}',
+                                precompress=False)
+    # Sıkıştırma da bu thread'de yapılsın, event loop'u bloklamasın
+    package.encoded(encoding)
+    return package
+
+def _fetch_group_scenarios(group_name):
+    """Grubun aktif senaryoları, serialize edilmiş JSON dizisi olarak (kullanıcıdan bağımsız)."""
+    conn = get_db_connection(readonly=True)
+    if not conn: raise RuntimeError("Sunucu Bağlantısı Yok")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GROUP_PACKAGE_SQL, (group_name,))
+        return dump_json(cursor.fetchall())
+    finally:
+        conn.close()
+
+def _get_group_package(payload):
     """
     TOPLU ÇEKİM (GÜNCELLENDİ):
     Sadece bakiyeyi kontrol eder, krediyi düşmez.
+    Kullanıcıya özel kısım (token + bakiye) burada; yeterliyse maliyet döner ve senaryolar
+    ortak sorguyla (_fetch_group_scenarios) gelir. Stream modunda yanıt burada üretilir.
     """
     token = payload.get("token")
     group_name = payload.get("group_name")
     
-    conn = get_db_connection()
+    session = resolve_session(token)
+    if not session: return JSONResponse(content={"error": "Token hatası"}, status_code=401)
+    user_id = session.user_id
+
+    conn = get_db_connection(readonly=True, user_id=user_id)
     if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
 
     try:
         cursor = conn.cursor()
-        try: user_id = int(token)
-        except: 
-            conn.close()
-            return JSONResponse(content={"error": "Token hatası"}, status_code=401)
 
         # 1. Maliyet Kontrolü
         cursor.execute("SELECT cost_per_run FROM scenario_groups WHERE group_name = %s", (group_name,))
@@ -282,112 +340,298 @@ async def get_group_package(payload: dict = Body(...)):
         # NOT: Para kesme kaldırıldı.
             
         # 3. Senaryoları Getir
-        cursor.execute("""
-            SELECT scenario_id as id, risk_title, code_payload, source_type, 
-                   risk_message, legislation, risk_reason, solution_suggestion, 
-                   cross_check_rule as cross_check, is_pinned, group_name
-            FROM scenarios 
-            WHERE group_name = %s AND is_active = TRUE
-        """, (group_name,))
-        scenarios = cursor.fetchall()
-        
+        if payload.get("stream", STREAM_DEFAULT):
+            # Büyük gruplar: sunucu tarafı cursor ile parça parça gönder, bellek sabit kalır.
+            # Bağlantı akış bitince generator içinde havuza döner.
+            return StreamingResponse(stream_group_package(conn, group_name, cost), media_type="application/json")
+
         conn.close()
-        return {
-            "success": True, 
-            "cost_to_deduct": cost, # İstemciye ne kadar keseceğini bildiriyoruz
-            "scenarios": scenarios
-        }
+        return cost
 
     except Exception as e:
         if conn: conn.close()
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+# --- İÇERİK ÖZETİ İLE SCRIPT SENKRONİZASYONU ---
+@app.post("/api/sync-payloads")
+async def sync_payloads(request: Request, payload: dict = Body(...)):
+    rate_limiter.hit("sync-payloads", client_key(request, payload.get("token")))
+    return await run_db(_sync_payloads, payload, request.headers.get("accept-encoding"))
+
+def _sync_payloads(payload, accept_encoding=None):
+    """
+    İstemci elindeki script özetlerini gönderir ({"have": {"12": "<sha256>", ...}}),
+    sadece eksik veya değişmiş code_payload'lar döner.
+    Kapsam: group_name verilirse o grup, scenario_ids verilirse o senaryolar,
+    ikisi de yoksa kullanıcının izinli gruplarındaki tüm aktif senaryolar.
+    Kredi kontrolü get-code / get-group-package ile aynı: indirilecek her script'in
+    grup maliyeti bakiyeyi aşmamalı. Kredi burada düşmez.
+    """
+    session = resolve_session(payload.get("token"))
+    if not session: return JSONResponse(content={"error": "Token hatası"}, status_code=401)
+
+    try:
+        have = {int(k): str(v) for k, v in (payload.get("have") or {}).items()}
+        scenario_ids = [int(x) for x in payload.get("scenario_ids") or []]
+    except (TypeError, ValueError, AttributeError):
+        return JSONResponse(content={"error": "Geçersiz istek"}, status_code=400)
+    group_name = payload.get("group_name")
+
+    sql = """
+        SELECT s.scenario_id as id, s.payload_hash,
+               CASE WHEN h.hash IS DISTINCT FROM s.payload_hash THEN s.code_payload END as code_payload,
+               COALESCE(g.cost_per_run, 50) as cost,
+               u.credits_balance
+        FROM scenarios s
+        LEFT JOIN scenario_groups g ON s.group_name = g.group_name
+        LEFT JOIN unnest(%s::int[], %s::text[]) AS h(id, hash) ON h.id = s.scenario_id
+        CROSS JOIN (SELECT credits_balance FROM users WHERE user_id = %s) u
+        WHERE s.is_active = TRUE
+    """
+    params = [list(have.keys()), list(have.values()), session.user_id]
+    if group_name:
+        sql += " AND s.group_name = %s"
+        params.append(group_name)
+    elif scenario_ids:
+        sql += " AND s.scenario_id = ANY(%s)"
+        params.append(scenario_ids)
+    allowed = groups_key(session.allowed_groups)
+    if allowed is not None:
+        sql += " AND s.group_name = ANY(%s)"
+        params.append(list(allowed))
+
+    conn = get_db_connection(readonly=True, user_id=session.user_id)
+    if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, tuple(params))
+        rows = cursor.fetchall()
+        conn.close()
+    except Exception as e:
+        conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    changed = [row for row in rows if row["code_payload"] is not None]
+    if changed and max(row["cost"] for row in changed) > changed[0]["credits_balance"]:
+        return JSONResponse(content={"error": "YETERSİZ KREDİ"}, status_code=402)
+
+    available = {row["id"] for row in rows}
+    body = dump_json(jsonable_encoder({
+        "success": True,
+        "payloads": [{"id": row["id"], "payload_hash": row["payload_hash"], "code_payload": row["code_payload"]}
+                     for row in changed],
+        "unchanged": [row["id"] for row in rows if row["code_payload"] is None],
+        # İstemcide olup artık pasif / kapsam dışı olanlar
+        "removed": sorted(set(have) - available),
+    }))
+    return json_response(body, accept_encoding)
+
 # --- YENİ EKLENEN ENDPOINT: İŞLEM TAMAMLANDI ONAYI ---
 @app.post("/api/confirm-transaction")
-async def confirm_transaction(payload: dict = Body(...)):
+async def confirm_transaction(request: Request, payload: dict = Body(...)):
+    try:
+        idempotency_key = normalize_key(payload.get("idempotency_key") or request.headers.get("idempotency-key"))
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    rate_limiter.hit("confirm-transaction", client_key(request, payload.get("token")))
+    return await run_db(_confirm_transaction, payload, idempotency_key)
+
+def _idempotency_conflict():
+    return JSONResponse(content={"error": "Bu işlem anahtarı farklı bir işlem için kullanılmış"}, status_code=409)
+
+def _confirm_replay(cost, balance):
+    return JSONResponse(content=jsonable_encoder({"success": True, "deducted": cost, "credits": balance}),
+                        headers={"Idempotent-Replayed": "true"})
+
+def _confirm_transaction(payload, idempotency_key=None):
     """
     Kullanıcı analizi başarıyla bitirdiğinde burası çağrılır ve 
     KREDİ BURADA DÜŞER.
+    idempotency_key: istemcinin tekrar denemelerde aynı gönderdiği anahtar; ikinci kez düşülmez.
     """
     token = payload.get("token")
     item_id = payload.get("item_id") # scenario_id veya group_name
     item_type = payload.get("type")  # 'single' veya 'group'
     
+    session = resolve_session(token)
+    if not session: return JSONResponse(content={"error": "Token hatası"}, status_code=401)
+    user_id = session.user_id
+
+    if idempotency_key:
+        # Tekrar gönderilen onay bu worker'da işlendiyse (token doğrulandıktan sonra) DB'ye gitmeden cevaplanır
+        try:
+            replay = idempotency_cache.get(user_id, idempotency_key,
+                                           CreditManager.item_fingerprint(item_type, item_id))
+        except IdempotencyMismatch:
+            return _idempotency_conflict()
+        if replay is not None:
+            return _confirm_replay(*replay)
+
     conn = get_db_connection()
     if not conn: return JSONResponse(content={"error": "DB Hatası"}, status_code=500)
     
     try:
-        cursor = conn.cursor()
-        user_id = int(token)
-        
-        cost = 0
-        details_txt = ""
-        scen_id_log = 0
-
-        # Maliyeti Tekrar Hesapla (Güvenlik İçin)
-        if item_type == 'group':
-            cursor.execute("SELECT cost_per_run FROM scenario_groups WHERE group_name = %s", (item_id,))
-            res = cursor.fetchone()
-            cost = res['cost_per_run'] if res else 50
-            details_txt = f"Group Run: {item_id}"
-            
-        elif item_type == 'single':
-            # Single modda grup fiyatını bulmamız lazım
-            # Önce senaryonun grubunu bul, sonra grubun fiyatını
-            sql = """
-                SELECT COALESCE(g.cost_per_run, 50) as cost 
-                FROM scenarios s
-                LEFT JOIN scenario_groups g ON s.group_name = g.group_name
-                WHERE s.scenario_id = %s
-            """
-            cursor.execute(sql, (item_id,))
-            res = cursor.fetchone()
-            cost = res['cost'] if res else 50
-            scen_id_log = int(item_id)
-            details_txt = f"Single Run: {item_id}"
-
-        # KREDİYİ DÜŞ VE LOGLA
-        if cost > 0:
-            cursor.execute("UPDATE users SET credits_balance = credits_balance - %s WHERE user_id = %s", (cost, user_id))
-            
-            cursor.execute("""
-                INSERT INTO logs (user_id, action, scenario_id, credit_cost) 
-                VALUES (%s, %s, %s, %s)
-            """, (user_id, 'run_complete', scen_id_log, int(cost)))
-            
-            conn.commit()
+        # Maliyeti Tekrar Hesapla (Güvenlik İçin), bakiyeyi kontrol et, düş ve logla: tek sorgu
+        ok, cost, balance = CreditManager.deduct_item(conn, user_id, item_type, item_id, idempotency_key)
+        if not ok:
+            conn.close()
+            return JSONResponse(content=jsonable_encoder({"error": "YETERSİZ KREDİ", "required": cost, "credits": balance}), status_code=402)
             
         conn.close()
-        return {"success": True, "deducted": cost}
-        
+        return {"success": True, "deducted": cost, "credits": balance}
+
+    except IdempotencyMismatch:
+        conn.close()
+        return _idempotency_conflict()
     except Exception as e:
         print(f"Confirm Error: {e}")
         if conn: conn.close()
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-@app.get("/api/get-balance")
-async def get_balance(token: str):
+@app.post("/api/confirm-batch")
+async def confirm_batch(request: Request, payload: dict = Body(...)):
+    rate_limiter.hit("confirm-batch", client_key(request, payload.get("token")))
+    return await run_db(_confirm_batch, payload)
+
+def _confirm_batch(payload):
+    """
+    Birden fazla kalemi tek seferde onaylar: {"token": ..., "items": [{"type": ..., "item_id": ...}, ...]}
+    Toplam tek işlemde düşülür; bakiye yetmezse hiçbir kalem düşülmez.
+    """
+    session = resolve_session(payload.get("token"))
+    if not session: return JSONResponse(content={"error": "Token hatası"}, status_code=401)
+    user_id = session.user_id
+
+    raw_items = payload.get("items")
+    if not isinstance(raw_items, list) or not raw_items:
+        return JSONResponse(content={"error": "items boş olamaz"}, status_code=400)
+    if len(raw_items) > CONFIRM_BATCH_MAX_ITEMS:
+        return JSONResponse(content={"error": f"En fazla {CONFIRM_BATCH_MAX_ITEMS} kalem onaylanabilir"}, status_code=400)
+    items = []
+    for raw in raw_items:
+        item_type = raw.get("type") if isinstance(raw, dict) else None
+        item_id = raw.get("item_id") if isinstance(raw, dict) else None
+        if item_type not in ("group", "single") or item_id in (None, ""):
+            return JSONResponse(content={"error": f"Geçersiz kalem: {raw!r}"}, status_code=400)
+        if item_type == "single" and not str(item_id).isdigit():
+            return JSONResponse(content={"error": f"Geçersiz senaryo id: {item_id!r}"}, status_code=400)
+        items.append((item_type, item_id))
+
     conn = get_db_connection()
-    if not conn: return {"credits": 0}
+    if not conn: return JSONResponse(content={"error": "DB Hatası"}, status_code=500)
+
+    try:
+        ok, costs, total, balance = CreditManager.deduct_batch(conn, user_id, items)
+        conn.close()
+        if not ok:
+            return JSONResponse(content=jsonable_encoder({"error": "YETERSİZ KREDİ", "required": total, "credits": balance}), status_code=402)
+        return JSONResponse(content=jsonable_encoder({
+            "success": True,
+            "deducted": total,
+            "credits": balance,
+            "items": [{"type": t, "item_id": i, "cost": c} for (t, i), c in zip(items, costs)],
+        }))
+
+    except Exception as e:
+        print(f"Confirm Batch Error: {e}")
+        if conn: conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/get-balance")
+async def get_balance(token: str, request: Request, version: str = None, wait: float = 0):
+    """
+    version (veya If-None-Match) verilirse bakiye değişmediyse 304 döner.
+    wait > 0 ise değişmemiş bakiye için cevap, bakiye değişene ya da süre dolana kadar bekletilir.
+    """
+    rate_limiter.hit("get-balance", client_key(request, token))
+    known = version or request.headers.get("if-none-match")
+    user_id, body = await run_db(_get_balance, token)
+    if user_id is None:
+        return body
+
+    if wait > 0 and _balance_unchanged(known, body["version"]):
+        # Bekleme event loop'ta; DB thread'i tutulmaz
+        if await balance_cache.wait_for_change(user_id, body["version"], min(wait, BALANCE_MAX_WAIT)):
+            user_id, body = await run_db(_get_balance, token)
+            if user_id is None:
+                return body
+
+    headers = {"ETag": f'"{body["version"]}"', "Cache-Control": "no-cache"}
+    if _balance_unchanged(known, body["version"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(body), headers=headers)
+
+def _balance_unchanged(known, version):
+    return bool(known) and (known == version or etag_matches(known, f'"{version}"'))
+
+def _get_balance(token):
+    """(user_id, gövde). Oturum/DB hatasında user_id None ve gövde eski davranıştaki gibi {"credits": 0}."""
+    session = resolve_session(token)
+    if not session: return None, {"credits": 0}
+    user_id = session.user_id
+
+    # Düşüm yolları ve NOTIFY önbelleği güncel tutar; çoğu istek DB'ye gitmez
+    cached = balance_cache.get(user_id)
+    if cached:
+        return user_id, {"credits": cached[0], "version": cached[1]}
+
+    conn = get_db_connection(readonly=True, user_id=user_id)
+    if not conn: return None, {"credits": 0}
     try:
         cursor = conn.cursor()
-        user_id = int(token)
-        cursor.execute("SELECT credits_balance FROM users WHERE user_id = %s", (user_id,))
+        cursor.execute("SELECT credits_balance, balance_seq FROM users WHERE user_id = %s", (user_id,))
         res = cursor.fetchone()
         conn.close()
-        return {"credits": res["credits_balance"] if res else 0}
+        if not res: return None, {"credits": 0}
+        # Gecikmeli replikadan okunan değer, önbellekteki daha yeni sıra numaralı değeri ezmez
+        balance, seq = balance_cache.update(user_id, res["credits_balance"] or 0, res["balance_seq"])
+        return user_id, {"credits": balance, "version": balance_version(seq)}
     except:
         conn.close()
-        return {"credits": 0}
+        return None, {"credits": 0}
 
 # --- WEB ADMIN ---
+# Admin cookie'si sadece HTTPS'te gönderilsin (TLS proxy'de bitiyorsa ADMIN_COOKIE_SECURE=1)
+ADMIN_COOKIE_SECURE = os.environ.get("ADMIN_COOKIE_SECURE", "0") == "1"
+
+def require_admin(request):
+    """
+    Panel cookie'si veya Authorization: Bearer <token> -> admin Session; yoksa AdminRequired.
+    Revocation kontrolü DB'ye gidebilir, o yüzden _xxx() fonksiyonlarının içinde çağrılır.
+    """
+    token = request.cookies.get(ADMIN_COOKIE)
+    auth = request.headers.get("authorization", "")
+    if not token and auth[:7].lower() == "bearer ":
+        token = auth[7:].strip()
+    return admin_session(token)
+
 # ✅ Bu kod dosya aramaz, her zaman çalışır
 @app.get("/")
 async def root():
     return {"message": "Ghost Server is Online 👻", "status": "active"}
 
+# Liveness: süreç cevap veriyor mu (DB'ye bakmaz)
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
+
+# Readiness: ısınma (DB bağlantıları, ayarlar, katalog) bitene kadar 503
+@app.get("/health/ready")
+async def health_ready():
+    status = warmup.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+# --- METRİKLER ---
+# Prometheus text formatı; her worker kendi sayaçlarını döner
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/web-login")
 async def web_login(request: Request, email: str = Form(...), password: str = Form(...)):
+    return await run_db(_web_login, request, email, password)
+
+def _web_login(request, email, password):
     conn = get_db_connection()
     if not conn: return templates.TemplateResponse("login.html", {"request": request, "error": "Veritabanı Bağlantı Hatası"})
     try:
@@ -398,83 +642,240 @@ async def web_login(request: Request, email: str = Form(...), password: str = Fo
         if user:
             input_hash = hashlib.sha256(password.encode()).hexdigest()
             if input_hash == user["password_hash"]:
-                if user["role"] == "admin": return RedirectResponse(url="/admin/dashboard", status_code=303)
+                if user["role"] == "admin":
+                    response = RedirectResponse(url="/admin/dashboard", status_code=303)
+                    response.set_cookie(ADMIN_COOKIE, issue_admin_token(user["user_id"], user.get("status")),
+                                        max_age=ADMIN_TOKEN_TTL, httponly=True, samesite="strict",
+                                        secure=ADMIN_COOKIE_SECURE or request.url.scheme == "https")
+                    return response
                 else: return templates.TemplateResponse("user_dashboard.html", {"request": request, "user": user})
         return templates.TemplateResponse("login.html", {"request": request, "error": "Hatalı Giriş"})
     except Exception as e:
         if conn: conn.close()
         return templates.TemplateResponse("login.html", {"request": request, "error": f"Hata: {e}"})
 
+@app.get("/admin/logout")
+async def admin_logout():
+    response = RedirectResponse(url="/", status_code=303)
+    response.delete_cookie(ADMIN_COOKIE)
+    return response
+
 @app.get("/admin/dashboard", response_class=HTMLResponse)
 async def admin_dashboard(request: Request):
-    return templates.TemplateResponse("admin_dashboard.html", {"request": request, "stats": {}, "scenarios": []})
+    return await run_db(_admin_dashboard, request)
+
+def _admin_dashboard(request):
+    require_admin(request)
+    # Kartlar özet tablolardan gelir (sql/006), logs taranmaz
+    stats = dict(EMPTY_STATS)
+    conn = get_db_connection(readonly=True)
+    if conn:
+        try:
+            stats = dashboard_stats(conn)
+        except Exception as e:
+            print(f"İstatistik Hatası: {e}")
+        finally:
+            conn.close()
+    # Senaryo tablosu sayfa açıldıktan sonra /api/admin/scenarios ile parça parça yüklenir
+    return templates.TemplateResponse("admin_dashboard.html", {"request": request, "stats": stats})
 
-@app.get("/api/check-version")
-async def check_version():
+@app.get("/api/admin/stats")
+async def admin_stats(request: Request, days: int = 30, user_id: int = None):
+    return await run_db(_admin_stats, request, days, user_id)
+
+def _admin_stats(request, days, user_id):
+    require_admin(request)
+    conn = get_db_connection(readonly=True)
+    if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
+    try:
+        # Audit log yazıcısının durumu (mod, kuyruk, spool) sadece admin'e; sayaçlar /metrics'te de var
+        content = {"stats": dashboard_stats(conn), **usage_report(conn, days, user_id), "log_sink": audit_log.snapshot()}
+        conn.close()
+        return JSONResponse(content=jsonable_encoder(content))
+    except Exception as e:
+        conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/admin/scenarios")
+async def admin_scenarios(request: Request, group: str = None, q: str = None, after: int = 0, limit: int = PAGE_SIZE):
+    return await run_db(_admin_scenarios, request, group, q, after, limit)
+
+def _admin_scenarios(request, group, q, after, limit):
+    require_admin(request)
+    conn = get_db_connection(readonly=True)
+    if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
+    try:
+        page = list_scenarios(conn, group, q, after, limit)
+        conn.close()
+        return JSONResponse(content=jsonable_encoder(page))
+    except Exception as e:
+        conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/admin/scenarios/{scenario_id}")
+async def admin_scenario_detail(request: Request, scenario_id: int):
+    return await run_db(_admin_scenario_detail, request, scenario_id)
+
+def _admin_scenario_detail(request, scenario_id):
+    require_admin(request)
     conn = get_db_connection()
-    if not conn: return {"latest_version": "1.0.0"}
-    
+    if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
     try:
-        cursor = conn.cursor()
-        settings = get_system_settings(cursor)
+        scenario = get_scenario(conn, scenario_id)
         conn.close()
-        
-        return {
-            "latest_version": settings.get("latest_version", "1.0.0"),
-            "force_update": settings.get("force_update", "False"),
-            "download_url": settings.get("download_url", ""),
-            "main_exe_hash": settings.get("main_exe_hash", "UNKNOWN"),
-            # --- YENİ EKLENEN KISIM ---
-            # Eğer veritabanında bu ayar yoksa varsayılan olarak '.' (ana dizin) döner.
-            "target_path": settings.get("update_target_path", ".") 
-        }
+        if not scenario: return JSONResponse(content={"error": "Senaryo bulunamadı"}, status_code=404)
+        return JSONResponse(content=jsonable_encoder(scenario))
     except Exception as e:
-        if conn: conn.close()
-        return {"latest_version": "1.0.0"}
+        conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/admin/scenario-groups")
+async def admin_scenario_groups(request: Request):
+    return await run_db(_admin_scenario_groups, request)
+
+def _admin_scenario_groups(request):
+    require_admin(request)
+    conn = get_db_connection(readonly=True)
+    if not conn: return JSONResponse(content={"error": "Sunucu Bağlantısı Yok"}, status_code=503)
+    try:
+        groups = list_groups(conn)
+        conn.close()
+        return {"groups": groups}
+    except Exception as e:
+        conn.close()
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/check-version")
+async def check_version():
+    # Tüm istemciler için aynı cevap: eşzamanlı istekler tek hesaplamayı paylaşır
+    return await check_version_flight.do("latest", run_db, _check_version)
+
+def _check_version():
+    settings = get_system_settings()
+    package = _current_package()
+    return {
+        "latest_version": settings.get("latest_version", "1.0.0"),
+        "force_update": settings.get("force_update", "False"),
+        "download_url": settings.get("download_url", ""),
+        "main_exe_hash": settings.get("main_exe_hash", "UNKNOWN"),
+        # --- YENİ EKLENEN KISIM ---
+        # Eğer veritabanında bu ayar yoksa varsayılan olarak '.' (ana dizin) döner.
+        "target_path": settings.get("update_target_path", "."),
+        # Installer'ın indireceği paket ve onun içerik özeti (ikisi hep aynı dosyaya ait):
+        # sunucuda tam paket varsa kendisi, yoksa ayarlardaki download_url ve package_hash
+        "package_url": "/api/download-full-package" if package else settings.get("download_url", ""),
+        "package_hash": package.sha256 if package else settings.get("package_hash", ""),
+        "package_size": package.size if package else None,
+    }
+
+# --- SÜRÜM DOSYALARI (Installer buradan indirir) ---
+@app.api_route("/api/download-full-package", methods=["GET", "HEAD"])
+async def download_full_package(request: Request):
+    release = await run_db(_current_package)
+    if not release:
+        return JSONResponse(content={"error": "Paket bulunamadı"}, status_code=404)
+    return file_response(release, request.headers.get("if-none-match"))
+
+@app.get("/api/releases")
+async def list_releases():
+    files = await run_db(release_index.files)
+    return {"files": [{"name": f.name, "size": f.size, "sha256": f.sha256} for f in files.values()]}
+
+@app.api_route("/api/releases/{name}", methods=["GET", "HEAD"])
+async def download_release(name: str, request: Request):
+    release = await run_db(release_index.get, name)
+    if not release:
+        return JSONResponse(content={"error": "Dosya bulunamadı"}, status_code=404)
+    return file_response(release, request.headers.get("if-none-match"))
+
+# --- FARK (DELTA) GÜNCELLEMELERİ ---
+@app.get("/api/update-manifest")
+async def update_manifest(version: str = None):
+    return await run_db(_update_manifest, version)
+
+def _update_manifest(version=None):
+    version = version or get_system_settings().get("latest_version", "1.0.0")
+    manifest = version_store.manifest(version)
+    if manifest is None:
+        return JSONResponse(content={"error": "Sürüm bulunamadı"}, status_code=404)
+    return {"version": version, "files": manifest}
+
+@app.post("/api/update-delta")
+async def update_delta(payload: dict = Body(...)):
+    return await run_db(_update_delta, payload)
+
+def _update_delta(payload):
+    """
+    İstemci mevcut sürümünü (ve varsa kendi dosya özetlerini) gönderir,
+    hedef sürüme geçmek için sadece değişen dosyaların listesi döner.
+    """
+    target_version = payload.get("target_version") or get_system_settings().get("latest_version", "1.0.0")
+    current_version = payload.get("current_version")
+    have = payload.get("files")
+    if not isinstance(have, dict):
+        # İstemci dosya listesi göndermediyse sunucudaki eski sürüm manifestine güven
+        have = {path: info["sha256"] for path, info in (version_store.manifest(current_version) or {}).items()}
+
+    # Silinecekler eski ve yeni sürüm manifestlerinin farkından çıkar (istemcinin kendi dosyaları kalır)
+    delta = version_store.delta(target_version, have, current_version)
+    if delta is None:
+        return JSONResponse(content={"error": "Sürüm bulunamadı"}, status_code=404)
+    for item in delta["changed"]:
+        item["url"] = f"/api/update-file/{quote(target_version)}/{quote(item['path'])}"
+    return {
+        "from": current_version,
+        "to": target_version,
+        "changed": delta["changed"],
+        "removed": delta["removed"],
+        "bytes": sum(item["size"] for item in delta["changed"]),
+    }
+
+@app.api_route("/api/update-file/{version}/{path:path}", methods=["GET", "HEAD"])
+async def update_file(version: str, path: str, request: Request):
+    release = await run_db(version_store.file, version, path)
+    if not release:
+        return JSONResponse(content={"error": "Dosya bulunamadı"}, status_code=404)
+    return file_response(release, request.headers.get("if-none-match"))
+
+def _current_package():
+    return release_index.current_package(get_system_settings().get("full_package_file"))
 
 # --- WEB STREAM İÇİN EKLENECEK KISIM ---
 
 # --- INSTALLER KONFİGÜRASYON API'Sİ ---
 @app.get("/api/get-installer-config")
 async def get_installer_config():
+    return await run_db(_get_installer_config)
+
+def _get_installer_config():
     """
     Installer.exe çalışınca buraya sorar: "Hangi linki indireyim?"
     """
-    conn = get_db_connection()
-    
-    # Varsayılan "Kurtarıcı" Ayarlar (Veritabanı boşsa veya hata varsa bu döner)
+    # Varsayılan "Kurtarıcı" Ayarlar (Veritabanı boşsa ve hiç ayar okunamadıysa bu döner)
     default_config = {
         "full_setup_url": "https://ghostserver-rgyz.onrender.com/api/download-full-package",
         "install_dir": r"C:\GhostAuditor"
     }
 
-    if not conn: 
-        print("UYARI: DB Bağlantısı yok, varsayılan ayarlar dönülüyor.")
-        return default_config
-    
-    try:
-        cursor = conn.cursor()
-        settings = get_system_settings(cursor)
-        conn.close()
-        
-        # Veritabanından gelen ayar varsa onu, yoksa varsayılanı kullan
-        final_url = settings.get("full_setup_url")
-        if not final_url or len(final_url) < 5: 
-            final_url = default_config["full_setup_url"]
-
-        final_dir = settings.get("install_dir")
-        if not final_dir: 
-            final_dir = default_config["install_dir"]
-
-        return {
-            "full_setup_url": final_url,
-            "install_dir": final_dir
-        }
-    except Exception as e:
-        print(f"Config API Hatası: {e}")
-        if conn: conn.close()
+    settings = get_system_settings()
+    if not settings:
+        print("UYARI: Ayar okunamadı, varsayılan ayarlar dönülüyor.")
         return default_config
 
+    # Veritabanından gelen ayar varsa onu, yoksa varsayılanı kullan
+    final_url = settings.get("full_setup_url")
+    if not final_url or len(final_url) < 5: 
+        final_url = default_config["full_setup_url"]
+
+    final_dir = settings.get("install_dir")
+    if not final_dir: 
+        final_dir = default_config["install_dir"]
+
+    return {
+        "full_setup_url": final_url,
+        "install_dir": final_dir
+    }
+
 
 
 
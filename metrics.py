@@ -0,0 +1,197 @@
+"""
+Bağımlılıksız, süreç içi metrikler ve /metrics için Prometheus metin çıktısı.
+Her uvicorn worker'ı kendi sayaçlarını tutar (Prometheus her worker'ı ayrı kazır).
+"""
+import os
+import re
+import time
+import bisect
+import threading
+
+from psycopg2.extras import RealDictCursor
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))  # 0 = kapalı
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = self._header()
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in sorted(self._values.items()):
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {running}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+REGISTRY = []
+# Render anında değer okuyan fonksiyonlar (örn: audit log kuyruk derinliği)
+COLLECTORS = []
+
+
+def render_prometheus():
+    for collect in COLLECTORS:
+        try:
+            collect()
+        except Exception as e:
+            print(f"Metrik Toplama Hatası: {e}")
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- HTTP ---
+http_requests = Counter("ghost_http_requests_total", "HTTP istek sayısı", ("method", "route", "status"))
+http_latency = Histogram("ghost_http_request_duration_seconds", "HTTP istek süresi", ("method", "route"))
+http_in_flight = Gauge("ghost_http_requests_in_flight", "Şu an işlenen istek sayısı")
+
+# --- DB ---
+db_query_latency = Histogram("ghost_db_query_duration_seconds", "SQL cümlesi süresi", ("query",))
+db_query_errors = Counter("ghost_db_query_errors_total", "Hata veren SQL cümleleri", ("query",))
+db_pool_wait = Histogram("ghost_db_pool_wait_seconds", "Havuzdan bağlantı bekleme süresi")
+db_pool_timeouts = Counter("ghost_db_pool_timeouts_total", "Havuz dolu olduğu için 503 dönen istekler")
+db_pool_in_use = Gauge("ghost_db_pool_connections_in_use", "Ödünç verilmiş bağlantı sayısı")
+
+# --- ÖNBELLEKLER ---
+cache_requests = Counter("ghost_cache_requests_total", "Önbellek erişimleri", ("cache", "result"))
+
+
+class MetricsMiddleware:
+    """Route bazında gecikme, durum kodu ve uçuştaki istek sayısı (saf ASGI, streaming'i bozmaz)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            # Eşleşmeyen yollar tek etikette toplanır (kardinalite patlamasın)
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_latency.observe(method, path, value=time.perf_counter() - started)
+            http_requests.inc(method, path, status["code"])
+
+
+_WS = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"VALUES\s*\(.*", re.IGNORECASE | re.DOTALL)
+
+
+def query_label(sql):
+    """SQL'i etiket olarak kullanılabilir hale getirir: boşluklar, sabitler ve VALUES listeleri atılır."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    sql = _VALUE_LISTS.sub("VALUES (...)", sql)
+    sql = _LITERALS.sub("?", _WS.sub(" ", sql).strip())
+    return sql[:160]
+
+
+class TimedCursor(RealDictCursor):
+    """Her execute'u normalleştirilmiş sorgu etiketiyle zamanlar; SLOW_QUERY_MS üstünü loglar."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            db_query_errors.inc(query_label(query))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            label = query_label(query)
+            db_query_latency.observe(label, value=elapsed)
+            if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+                print(f"YAVAŞ SORGU ({elapsed * 1000:.1f} ms): {label}")
@@ -0,0 +1,184 @@
+"""
+Kullanıcı / cihaz bazında token bucket rate limit.
+Her route'un bütçesi "saniyede X istek, en fazla Y birikmiş" şeklindedir; aşan istek DB'ye
+hiç gitmeden 429 + Retry-After alır.
+
+Varsayılan backend süreç içidir (her uvicorn worker kendi kovasını tutar, yani gerçek limit
+worker sayısıyla çarpılır). RATE_LIMIT_REDIS_URL verilirse kovalar Redis'te tutulur ve limit
+tüm worker'lar için ortaktır; Redis'e ulaşılamazsa yerel kovalara düşülür.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # opsiyonel bağımlılık
+    redis = None
+
+from metrics import Counter
+from session_tokens import token_user_id
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL", "")
+# Yerel backend'de en fazla bu kadar anahtar tutulur (en eski kullanılan atılır)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "50000"))
+
+# route -> (saniyedeki istek, kova kapasitesi)
+DEFAULT_BUDGETS = {
+    # Login iki kovadan harcar: hedef e-posta (parola denemesi) ve istemci IP'si (aynı NAT
+    # arkasındaki ofis bilgisayarları da bu kovayı paylaştığı için daha geniş)
+    "login": (0.2, 5),
+    "login-ip": (1, 20),
+    "get-menu": (2, 10),
+    "get-code": (10, 30),
+    "get-group-package": (2, 10),
+    "sync-payloads": (2, 10),
+    "confirm-transaction": (5, 20),
+    "confirm-batch": (1, 5),
+    "get-balance": (1, 5),
+}
+
+
+def parse_budgets(spec, defaults=DEFAULT_BUDGETS):
+    """RATE_LIMITS="get-code=10:30,get-balance=1:5" -> defaults üzerine yazılmış sözlük. 0 = limitsiz."""
+    budgets = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        try:
+            route, value = item.split("=", 1)
+            rate, _, burst = value.partition(":")
+            rate = float(rate)
+            budgets[route.strip()] = (rate, float(burst) if burst else max(rate, 1))
+        except ValueError:
+            print(f"UYARI: Geçersiz RATE_LIMITS girdisi atlandı: {item!r}")
+    return budgets
+
+
+rate_limited = Counter("ghost_rate_limited_total", "429 ile reddedilen istekler", ("route",))
+
+
+class RateLimited(Exception):
+    def __init__(self, route, retry_after):
+        super().__init__(f"{route} için istek limiti aşıldı")
+        self.route = route
+        self.retry_after = retry_after
+
+
+class LocalBuckets:
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # anahtar -> [token, son güncelleme]
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Bir token harcar. İzin varsa 0, yoksa kaç saniye sonra tekrar denenebileceği."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+
+# Kova Redis'te hash olarak durur; oku + doldur + harca tek atomik adımda
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    def __init__(self, url):
+        # Kısa timeout: Redis yavaşsa istekleri bekletmek yerine yerel kovaya düş
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(_REDIS_TAKE)
+        self._fallback = LocalBuckets()
+        self._warned = False
+
+    def take(self, key, rate, burst):
+        try:
+            return float(self._script(keys=["ghost:rl:" + key], args=[rate, burst, time.time()]))
+        except Exception as e:
+            if not self._warned:
+                print(f"UYARI: Rate limit Redis'e ulaşamadı, yerel limite düşüldü: {e}")
+                self._warned = True
+            return self._fallback.take(key, rate, burst)
+
+
+class RateLimiter:
+    def __init__(self, budgets=None, backend=None, enabled=RATE_LIMIT_ENABLED):
+        self.budgets = budgets if budgets is not None else parse_budgets(os.environ.get("RATE_LIMITS"))
+        self.enabled = enabled
+        if backend is None:
+            backend = LocalBuckets()
+            if RATE_LIMIT_REDIS_URL:
+                if redis is None:
+                    print("UYARI: RATE_LIMIT_REDIS_URL verildi ama 'redis' paketi kurulu değil, yerel limit kullanılıyor.")
+                else:
+                    backend = RedisBuckets(RATE_LIMIT_REDIS_URL)
+        self.backend = backend
+
+    def hit(self, route, key):
+        """Limit aşıldıysa RateLimited fırlatır (main_server -> 429)."""
+        if not self.enabled or key is None:
+            return
+        rate, burst = self.budgets.get(route, (0, 0))
+        if rate <= 0:
+            return
+        wait = self.backend.take(f"{route}:{key}", rate, burst)
+        if wait > 0:
+            rate_limited.inc(route)
+            raise RateLimited(route, wait)
+
+
+def _client_ip(request):
+    client = getattr(request, "client", None)
+    return f"ip{client.host}" if client else None
+
+
+def client_key(request, token=None):
+    """
+    Öncelik: imzalı token'ın sahibi, yoksa istemci IP'si.
+    İmzasız / geçersiz token IP kovasına düşer (token'daki id'ye güvenilmez).
+    """
+    user_id = token_user_id(token) if token is not None else None
+    if user_id is not None:
+        return f"u{user_id}"
+    return _client_ip(request)
+
+
+def check_login(request, email):
+    """
+    Login için hem e-posta hem IP kovası harcanır. İstemcinin gönderdiği hwid anahtar olmaz:
+    her denemede yeni hwid gönderip limiti aşmak mümkün olmasın.
+    """
+    if email:
+        rate_limiter.hit("login", "e" + str(email).strip().lower())
+    rate_limiter.hit("login-ip", _client_ip(request))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from catalog_cache import etag_matches
+
+RELEASES_DIR = os.environ.get("RELEASES_DIR", "releases")
+RELEASE_INDEX_TTL = float(os.environ.get("RELEASE_INDEX_TTL", "30"))
+# Aynı anda en fazla bu kadar indirme; fazlası 503 (API endpoint'leri aç kalmasın)
+DOWNLOAD_MAX_CONCURRENT = int(os.environ.get("DOWNLOAD_MAX_CONCURRENT", "200"))
+HASH_BUFFER = 1024 * 1024
+
+
+class ReleaseFile:
+    def __init__(self, name, path, stat_result, sha256):
+        self.name = name
+        self.path = path
+        self.stat = stat_result
+        self.size = stat_result.st_size
+        self.sha256 = sha256
+
+    @property
+    def etag(self):
+        # Güçlü ETag: dosya içeriğinin özeti (mtime'a değil içeriğe bağlı)
+        return f'"{self.sha256}"'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFFER), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReleaseIndex:
+    """
+    RELEASES_DIR altındaki sürüm dosyalarının bellekteki listesi (ad, boyut, sha256).
+    Özetler (boyut, mtime) değişmedikçe tekrar hesaplanmaz.
+    """
+
+    def __init__(self, root=RELEASES_DIR, ttl=RELEASE_INDEX_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._files = {}
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def files(self):
+        if time.monotonic() >= self._expires:
+            with self._lock:
+                if time.monotonic() >= self._expires:
+                    self._scan()
+        return self._files
+
+    def get(self, name):
+        return self.files().get(name)
+
+    def _scan(self):
+        files = {}
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            st = entry.stat()
+            old = self._files.get(entry.name)
+            if old and old.size == st.st_size and old.stat.st_mtime == st.st_mtime:
+                files[entry.name] = old
+                continue
+            files[entry.name] = ReleaseFile(entry.name, entry.path, st, file_sha256(entry.path))
+        self._files = files
+        self._expires = time.monotonic() + self.ttl
+
+    def current_package(self, preferred=None):
+        """Ayarlarda full_package_file varsa o, yoksa en yeni .zip dosyası."""
+        files = self.files()
+        if preferred and preferred in files:
+            return files[preferred]
+        archives = [f for f in files.values() if f.name.lower().endswith(".zip")]
+        if not archives:
+            return None
+        return max(archives, key=lambda f: f.stat.st_mtime)
+
+    def invalidate(self):
+        self._expires = 0.0
+
+
+class LimitedFileResponse(FileResponse):
+    """Eşzamanlı indirme sayısını sınırlayan FileResponse (Range/If-Range/HEAD Starlette'te)."""
+
+    active = 0
+
+    async def __call__(self, scope, receive, send):
+        if LimitedFileResponse.active >= DOWNLOAD_MAX_CONCURRENT:
+            response = JSONResponse(content={"error": "Sunucu yoğun, lütfen tekrar deneyin."},
+                                    status_code=503, headers={"Retry-After": "5"})
+            await response(scope, receive, send)
+            return
+        LimitedFileResponse.active += 1
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            LimitedFileResponse.active -= 1
+
+
+def file_response(release, if_none_match=None):
+    headers = {"ETag": release.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, release.etag):
+        return Response(status_code=304, headers=headers)
+    # stat_result verildiği için tekrar stat yapılmaz; sunucu destekliyorsa
+    # (http.response.pathsend) dosya zero-copy gönderilir, Range istekleri 206 döner.
+    return LimitedFileResponse(release.path, stat_result=release.stat, filename=release.name,
+                               media_type="application/octet-stream", headers=headers)
+
+
+class VersionStore:
+    """
+    RELEASES_DIR/versions/<sürüm>/ altındaki açılmış sürüm ağaçları ve manifestleri
+    (dosya yolu -> sha256, boyut). Manifest sürüm klasörüne .manifest.json olarak
+    bir kez yazılır; sürüm klasörleri değişmez kabul edilir.
+    """
+
+    MANIFEST_NAME = ".manifest.json"
+
+    def __init__(self, root=os.path.join(RELEASES_DIR, "versions")):
+        self.root = root
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def version_dir(self, version):
+        if not version or version in (".", "..") or "/" in version or "\\" in version:
+            return None
+        path = os.path.join(self.root, version)
+        return path if os.path.isdir(path) else None
+
+    def manifest(self, version):
+        cached = self._manifests.get(version)
+        if cached is not None:
+            return cached
+        root = self.version_dir(version)
+        if root is None:
+            return None
+        with self._lock:
+            if version not in self._manifests:
+                self._manifests[version] = self._load_or_build(root)
+        return self._manifests[version]
+
+    def _load_or_build(self, root):
+        manifest_path = os.path.join(root, self.MANIFEST_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        files = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, root).replace(os.sep, "/")
+                if rel == self.MANIFEST_NAME:
+                    continue
+                files[rel] = {"sha256": file_sha256(full), "size": os.path.getsize(full)}
+        tmp = manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(files, f, ensure_ascii=False)
+        os.replace(tmp, manifest_path)
+        return files
+
+    def file(self, version, rel_path):
+        """Manifestte olan bir dosya için (yol, stat) döner; yoksa None."""
+        manifest = self.manifest(version)
+        if manifest is None or rel_path not in manifest:
+            return None
+        full = os.path.join(self.version_dir(version), *rel_path.split("/"))
+        return ReleaseFile(rel_path.rsplit("/", 1)[-1], full, os.stat(full), manifest[rel_path]["sha256"])
+
+    def delta(self, target_version, have, from_version=None):
+        """
+        have: istemcideki dosyalar {yol: sha256} -> hedef sürüme geçmek için
+        indirilecek (değişen/yeni) ve silinecek dosyalar.
+        Sadece from_version manifestinde olup hedefte olmayan dosyalar silinir; kullanıcının
+        kendi dosyaları (log, ayar, eklenti) sürüm paketinde hiç olmadığı için dokunulmaz.
+        from_version bilinmiyorsa hiçbir dosya silinmez.
+        """
+        target = self.manifest(target_version)
+        if target is None:
+            return None
+        source = self.manifest(from_version) or {}
+        changed = [{"path": path, "sha256": info["sha256"], "size": info["size"]}
+                   for path, info in sorted(target.items()) if have.get(path) != info["sha256"]]
+        removed = sorted(path for path in source if path not in target and path in have)
+        return {"changed": changed, "removed": removed}
+
+
+release_index = ReleaseIndex()
+version_store = VersionStore()
@@ -0,0 +1,310 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from datetime import date
+from dataclasses import dataclass
+
+from db_pool import acquire_read, PoolExhausted
+from db_listener import listener
+
+TOKEN_PREFIX = "g1"
+TOKEN_TTL = int(os.environ.get("SESSION_TOKEN_TTL", str(12 * 3600)))
+# Eski istemciler login'de str(user_id) token almıştı. Bu token imzasızdır (user_id'yi bilen herkes
+# o kullanıcı olur), o yüzden varsayılan kapalı. Geçiş için açılırsa LEGACY_TOKENS_UNTIL (YYYY-AA-GG)
+# ile bitiş tarihi verilmeli; o tarihten sonra kendiliğinden reddedilir.
+ALLOW_LEGACY_TOKENS = os.environ.get("ALLOW_LEGACY_TOKENS", "0") == "1"
+LEGACY_TOKENS_UNTIL = os.environ.get("LEGACY_TOKENS_UNTIL", "")
+ACTIVE_STATUS = "Aktif"
+REVOCATION_REFRESH = float(os.environ.get("REVOCATION_REFRESH", "30"))
+USER_AUTH_CHANNEL = "ghost_user_auth"
+# Web admin paneli oturumu: /web-login'de admin'e verilen imzalı token bu cookie'de taşınır
+ADMIN_COOKIE = "ghost_admin"
+ADMIN_TOKEN_TTL = int(os.environ.get("ADMIN_TOKEN_TTL", str(8 * 3600)))
+ADMIN_ROLE = "admin"
+
+_secret = os.environ.get("SESSION_SECRET", "").encode()
+if not _secret:
+    # Süreç başına rastgele anahtar: token'lar diğer worker'larda ve her yeniden başlatmada geçersiz olur.
+    # Sadece tek süreçli yerel deneme için SESSION_SECRET_EPHEMERAL=1 ile izin verilir.
+    if os.environ.get("SESSION_SECRET_EPHEMERAL", "0") != "1":
+        raise RuntimeError("SESSION_SECRET tanımlı değil (yerel deneme için SESSION_SECRET_EPHEMERAL=1)")
+    print("UYARI: SESSION_SECRET tanımlı değil, geçici anahtar üretildi (SESSION_SECRET_EPHEMERAL=1).")
+    _secret = secrets.token_bytes(32)
+
+
+def _legacy_cutoff(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RuntimeError(f"Geçersiz LEGACY_TOKENS_UNTIL: {value!r} (YYYY-AA-GG olmalı)")
+
+
+_legacy_until = _legacy_cutoff(LEGACY_TOKENS_UNTIL)
+if ALLOW_LEGACY_TOKENS and _legacy_until is None:
+    raise RuntimeError("ALLOW_LEGACY_TOKENS=1 için LEGACY_TOKENS_UNTIL (bitiş tarihi) zorunlu")
+
+
+def legacy_tokens_allowed():
+    """Eski tip str(user_id) token şu an kabul ediliyor mu."""
+    return ALLOW_LEGACY_TOKENS and date.today() <= _legacy_until
+
+
+@dataclass(frozen=True)
+class Session:
+    user_id: int
+    allowed_groups: str = None
+    status: str = None
+    issued_at: float = 0.0
+    role: str = None
+
+
+class AdminRequired(Exception):
+    """Admin oturumu yok, süresi dolmuş veya kullanıcı admin değil."""
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(body):
+    return _b64(hmac.new(_secret, body.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_id, allowed_groups=None, status=None, ttl=TOKEN_TTL, role=None):
+    now = time.time()
+    payload = {"uid": user_id, "grp": allowed_groups, "st": status,
+               "iat": round(now, 3), "exp": int(now + ttl)}
+    if role:
+        payload["rl"] = role
+    body = TOKEN_PREFIX + "." + _b64(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode())
+    return body + "." + _sign(body)
+
+
+# Bu kadar eski yetki değişikliklerine bakmaya gerek yok: öncesinde üretilen token'ların süresi dolmuştur
+REVOCATION_WINDOW = max(TOKEN_TTL, ADMIN_TOKEN_TTL)
+
+# Pasif kullanıcılar ve pencere içinde yetkisi değişenler (auth_changed_at, sql/003)
+REVOCATION_SQL = """
+    SELECT user_id, status = 'Aktif' AS active, extract(epoch FROM auth_changed_at) AS changed_at
+    FROM users
+    WHERE status IS DISTINCT FROM 'Aktif'
+       OR auth_changed_at > now() - make_interval(secs => %s)
+"""
+
+# Daha önce görülmüş kullanıcılardan silinmiş olanlar
+MISSING_USERS_SQL = """
+    SELECT k.user_id FROM unnest(%s::bigint[]) AS k(user_id)
+    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = k.user_id)
+"""
+
+USER_AUTH_SQL = """
+    SELECT status = 'Aktif' AS active, extract(epoch FROM auth_changed_at) AS changed_at
+    FROM users WHERE user_id = %s
+"""
+
+
+class RevocationList:
+    """
+    Pasif / silinmiş kullanıcılar ve yetkisi (status/allowed_groups/role) değişen kullanıcılar.
+    user_id -> bu zamandan önce üretilmiş token'lar geçersiz (pasif ve silinmişler için sonsuz).
+    Kaynak DB'deki users.auth_changed_at (yeniden başlatmada kaybolmaz); periyodik olarak tazelenir,
+    NOTIFY ile kullanıcı bazında anında güncellenir. Bu süreçte ilk kez görülen kullanıcı bir kez
+    DB'den sorulur: users'ta olmayan kullanıcının token'ı geçersizdir.
+    """
+
+    def __init__(self, refresh=REVOCATION_REFRESH):
+        self.refresh = refresh
+        self._inactive = frozenset()
+        self._missing = frozenset()
+        self._known = set()   # users'ta olduğu doğrulanmış user_id'ler
+        self._changed = {}    # user_id -> değişiklik zamanı
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._changed_lock = threading.Lock()
+
+    def revoked_since(self, user_id):
+        self._maybe_refresh()
+        if user_id not in self._known and user_id not in self._inactive and user_id not in self._missing:
+            self._lookup(user_id)
+        if user_id in self._inactive or user_id in self._missing:
+            return float("inf")
+        return self._changed.get(user_id, 0.0)
+
+    def _mark_changed(self, user_id, changed_at):
+        with self._changed_lock:
+            if changed_at > self._changed.get(user_id, 0.0):
+                self._changed[user_id] = changed_at
+
+    def _lookup(self, user_id):
+        try:
+            conn = acquire_read()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(USER_AUTH_SQL, (user_id,))
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+        except PoolExhausted:
+            raise
+        except Exception as e:
+            # DB yoksa son bilinen listelerle devam (sonraki istekte tekrar sorulur)
+            print(f"Revocation Sorgu Hatası: {e}")
+            return
+        if row is None:
+            self._missing = self._missing | {user_id}
+            return
+        if not row["active"]:
+            self._inactive = self._inactive | {user_id}
+        if row["changed_at"] is not None:
+            self._mark_changed(user_id, float(row["changed_at"]))
+        self._known.add(user_id)
+
+    def _maybe_refresh(self):
+        if time.monotonic() < self._expires:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            conn = acquire_read()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(REVOCATION_SQL, (REVOCATION_WINDOW,))
+                rows = cursor.fetchall()
+                known = list(self._known)
+                missing = []
+                if known:
+                    cursor.execute(MISSING_USERS_SQL, (known,))
+                    missing = [row["user_id"] for row in cursor.fetchall()]
+            finally:
+                conn.close()
+            self._inactive = frozenset(row["user_id"] for row in rows if not row["active"])
+            self._missing = self._missing | frozenset(missing)
+            self._known.difference_update(missing)
+            for row in rows:
+                if row["changed_at"] is not None:
+                    self._mark_changed(row["user_id"], float(row["changed_at"]))
+            # Süresi geçmiş token'lar zaten reddediliyor, eski kayıtları at
+            cutoff = time.time() - REVOCATION_WINDOW
+            with self._changed_lock:
+                self._changed = {uid: ts for uid, ts in self._changed.items() if ts > cutoff}
+            self._expires = time.monotonic() + self.refresh
+        except Exception as e:
+            print(f"Revocation Yükleme Hatası: {e}")
+            self._expires = time.monotonic() + min(self.refresh, 5)
+        finally:
+            self._lock.release()
+
+    def on_user_changed(self, payload):
+        try:
+            user_id = int(payload)
+        except (TypeError, ValueError):
+            return
+        # Önceki token'lar eski yetkiyi taşıyor: yeniden login gereksin
+        self._mark_changed(user_id, time.time())
+        # Silinmiş olabilir: bir sonraki görülüşte DB'ye tekrar sorulsun
+        self._known.discard(user_id)
+        self._expires = 0.0
+
+    def invalidate(self, payload=None):
+        self._expires = 0.0
+
+
+revocations = RevocationList()
+listener.subscribe(USER_AUTH_CHANNEL, revocations.on_user_changed)
+listener.on_reconnect(revocations.invalidate)
+
+
+def _decode(token):
+    """İmza ve süre kontrolü (revocation hariç). Geçersizse None."""
+    if not token or not isinstance(token, str) or not token.startswith(TOKEN_PREFIX + "."):
+        return None
+    body, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(signature, _sign(body)):
+        return None
+    try:
+        payload = json.loads(_unb64(body.split(".", 1)[1]))
+    except Exception:
+        return None
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+def token_user_id(token):
+    """
+    İmzası doğrulanmış token'ın sahibi (rate limit anahtarı için). Sadece CPU, DB'ye hiç gitmez;
+    revocation kontrolü handler'daki resolve_session'a kalır. Eski tip (imzasız) token'da None:
+    başkasının user_id'sini gönderip onun bütçesini tüketmek mümkün olmasın.
+    """
+    payload = _decode(token)
+    return payload["uid"] if payload is not None else None
+
+
+def verify_token(token):
+    """İmzalı token'ı DB'ye gitmeden doğrular. Geçersizse None."""
+    payload = _decode(token)
+    if payload is None:
+        return None
+    session = Session(user_id=payload["uid"], allowed_groups=payload.get("grp"),
+                      status=payload.get("st"), issued_at=payload.get("iat", 0.0), role=payload.get("rl"))
+    if session.issued_at <= revocations.revoked_since(session.user_id):
+        return None
+    return session
+
+
+def _resolve_legacy(token):
+    try:
+        user_id = int(token)
+    except (TypeError, ValueError):
+        return None
+    try:
+        conn = acquire_read()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT allowed_groups, status FROM users WHERE user_id = %s", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+    except PoolExhausted:
+        raise
+    except Exception as e:
+        print(f"Token Çözme Hatası: {e}")
+        return None
+    # İmzalı token sadece aktif kullanıcıya verilir (pasife çekilince revoke edilir); eskisi de aynı kurala uysun
+    if not row or row.get("status") != ACTIVE_STATUS:
+        return None
+    return Session(user_id=user_id, allowed_groups=row.get("allowed_groups"), status=row.get("status"))
+
+
+def resolve_session(token):
+    """İmzalı token veya (izin verildiyse) eski tip str(user_id) token -> Session / None."""
+    session = verify_token(token)
+    if session is None and legacy_tokens_allowed() and token and TOKEN_PREFIX + "." not in str(token):
+        session = _resolve_legacy(str(token))
+    return session
+
+
+def issue_admin_token(user_id, status=None):
+    return issue_token(user_id, status=status, ttl=ADMIN_TOKEN_TTL, role=ADMIN_ROLE)
+
+
+def admin_session(token):
+    """
+    Admin paneli ve /api/admin/* için: imzalı, süresi dolmamış, revoke edilmemiş ve admin rolü taşıyan
+    token -> Session. Aksi halde AdminRequired. Eski tip (imzasız) token burada hiç kabul edilmez.
+    """
+    session = verify_token(token)
+    if session is None or session.role != ADMIN_ROLE:
+        raise AdminRequired()
+    return session
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+
+from db_pool import acquire_read
+from db_listener import listener
+from metrics import cache_requests
+
+SETTINGS_TTL = float(os.environ.get("SETTINGS_CACHE_TTL", "60"))
+# DB'ye ulaşılamadığında tekrar denemeden önce eski değerlerle bu kadar idare et
+SETTINGS_RETRY = float(os.environ.get("SETTINGS_CACHE_RETRY", "5"))
+SETTINGS_CHANNEL = "ghost_settings"
+
+
+class SettingsCache:
+    """
+    system_settings tablosunun süreç içi kopyası.
+    - TTL dolunca bir thread yeniler, diğerleri bu sırada eski değeri kullanır.
+    - Admin bir ayarı değiştirince NOTIFY ile anında geçersiz kılınır.
+    - DB geçici olarak yoksa son başarılı değerler dönmeye devam eder.
+    """
+
+    def __init__(self, ttl=SETTINGS_TTL, retry=SETTINGS_RETRY):
+        self.ttl = ttl
+        self.retry = retry
+        self._values = None
+        self._expires = 0.0
+        self._from_primary = False
+        self._refresh_lock = threading.Lock()
+
+    def get(self):
+        if self._values is not None and time.monotonic() < self._expires:
+            cache_requests.inc("settings", "hit")
+            return self._values
+
+        # Aynı anda tek thread yenilesin; elimizde değer varsa diğerleri beklemesin
+        if not self._refresh_lock.acquire(blocking=self._values is None):
+            cache_requests.inc("settings", "stale")
+            return self._values
+        cache_requests.inc("settings", "miss")
+        try:
+            if self._values is None or time.monotonic() >= self._expires:
+                self._reload()
+        finally:
+            self._refresh_lock.release()
+        return self._values if self._values is not None else {}
+
+    @property
+    def loaded(self):
+        """En az bir kez DB'den okundu mu (ısınma / readiness için)."""
+        return self._values is not None
+
+    def _reload(self):
+        try:
+            from_primary, self._from_primary = self._from_primary, False
+            conn = acquire_read(primary=from_primary)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT setting_key, setting_value FROM system_settings")
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            self._values = {row['setting_key']: row['setting_value'] for row in rows}
+            self._expires = time.monotonic() + self.ttl
+        except Exception as e:
+            print(f"Ayar Yükleme Hatası: {e}")
+            self._from_primary = self._from_primary or from_primary
+            # Son bilinen değerlerle devam, kısa süre sonra tekrar dene
+            self._expires = time.monotonic() + self.retry
+
+    def invalidate(self, payload=None):
+        # NOTIFY primary'deki commit'ten gelir; replika henüz uygulamamış olabilir
+        self._from_primary = True
+        self._expires = 0.0
+
+
+settings_cache = SettingsCache()
+listener.subscribe(SETTINGS_CHANNEL, settings_cache.invalidate)
+listener.on_reconnect(settings_cache.invalidate)
@@ -0,0 +1,48 @@
+"""
+Aynı anda gelen aynı okumaları tek DB sorgusunda birleştirir (single-flight).
+Anahtar route + normalize edilmiş parametrelerdir. İlk gelen istek sorguyu başlatır,
+o bitene kadar gelen aynı anahtarlı istekler aynı sonucu bekler. Sonuç saklanmaz:
+sorgu bitince anahtar silinir, sonraki istek yeni sorgu açar.
+
+Kullanıcıya özel okumalar (bakiye kontrolü vb.) buradan geçirilmemeli.
+"""
+import asyncio
+
+from metrics import Counter
+
+singleflight_requests = Counter("ghost_singleflight_requests_total",
+                                "Birleştirilen okumalar (leader = sorguyu yapan, collapsed = bekleyen)",
+                                ("flight", "result"))
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}   # anahtar -> asyncio.Task (tek event loop, kilit gerekmez)
+
+    async def do(self, key, fn, *args):
+        """`await fn(*args)` sonucunu döner; aynı anahtarla çalışan bir çağrı varsa onu bekler."""
+        task = self._inflight.get(key)
+        if task is None:
+            singleflight_requests.inc(self.name, "leader")
+            # Ayrı task: ilk istemci bağlantıyı kesse bile bekleyenler sonucu alır
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, key=key, task=task: self._forget(key, task))
+        else:
+            singleflight_requests.inc(self.name, "collapsed")
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tüm bekleyenler iptal olduysa istisna "retrieved" sayılsın, log kirlenmesin
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self):
+        return len(self._inflight)
+
+
+group_package_flight = SingleFlight("group-package")
+check_version_flight = SingleFlight("check-version")
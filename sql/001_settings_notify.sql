@@ -0,0 +1,12 @@
+-- system_settings değişince tüm sunucu worker'larına haber ver (settings_cache.py dinler)
+CREATE OR REPLACE FUNCTION ghost_notify_settings() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('ghost_settings', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_system_settings_notify ON system_settings;
+CREATE TRIGGER trg_system_settings_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON system_settings
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_notify_settings();
@@ -0,0 +1,12 @@
+-- Senaryo kataloğu değişince tüm worker'lar menü önbelleğini yenilesin (catalog_cache.py dinler)
+CREATE OR REPLACE FUNCTION ghost_notify_catalog() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('ghost_catalog', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_scenarios_catalog_notify ON scenarios;
+CREATE TRIGGER trg_scenarios_catalog_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON scenarios
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_notify_catalog();
@@ -0,0 +1,49 @@
+-- Kullanıcı pasife alınınca, grup yetkisi veya rolü değişince imzalı token'lar hemen geçersiz olsun
+-- (session_tokens.py dinler, payload = user_id)
+
+-- Yetki değişiminin kalıcı kaydı: NOTIFY sadece o an çalışan worker'lara ulaşır. Yeniden başlayan
+-- worker bu kolonu okur ve iat'ı daha eski token'ları reddeder (NULL = hiç değişmedi).
+ALTER TABLE users ADD COLUMN IF NOT EXISTS auth_changed_at timestamptz;
+
+CREATE OR REPLACE FUNCTION ghost_bump_auth_changed_at() RETURNS trigger AS $$
+BEGIN
+    -- now() transaction başlangıcıdır; değişikliğin gerçek anı için clock_timestamp()
+    NEW.auth_changed_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_auth_changed_at ON users;
+CREATE TRIGGER trg_users_auth_changed_at
+    BEFORE UPDATE OF status, allowed_groups, role ON users
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.allowed_groups IS DISTINCT FROM NEW.allowed_groups
+          OR OLD.role IS DISTINCT FROM NEW.role)
+    EXECUTE FUNCTION ghost_bump_auth_changed_at();
+
+CREATE INDEX IF NOT EXISTS idx_users_auth_changed_at ON users (auth_changed_at)
+    WHERE auth_changed_at IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION ghost_notify_user_auth() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('ghost_user_auth', OLD.user_id::text);
+    ELSE
+        PERFORM pg_notify('ghost_user_auth', NEW.user_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_auth_notify ON users;
+CREATE TRIGGER trg_users_auth_notify
+    AFTER UPDATE OF status, allowed_groups, role ON users
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.allowed_groups IS DISTINCT FROM NEW.allowed_groups
+          OR OLD.role IS DISTINCT FROM NEW.role)
+    EXECUTE FUNCTION ghost_notify_user_auth();
+
+DROP TRIGGER IF EXISTS trg_users_delete_notify ON users;
+CREATE TRIGGER trg_users_delete_notify
+    AFTER DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION ghost_notify_user_auth();
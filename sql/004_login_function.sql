@@ -0,0 +1,66 @@
+-- /api/login: kullanıcı + durum + şifre + cihaz limiti + cihaz kaydı tek round trip'te.
+-- Aynı kullanıcının eşzamanlı login'leri advisory lock ile sıralanır, limit aşılamaz.
+
+-- Unique index öncesi mükerrer (user_id, hwid) kayıtlarını temizle (en eski kayıt kalır)
+DELETE FROM user_devices d
+USING user_devices keep
+WHERE d.user_id = keep.user_id AND d.hwid = keep.hwid AND d.device_id > keep.device_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_user_devices_user_hwid ON user_devices (user_id, hwid);
+CREATE INDEX IF NOT EXISTS ix_users_email ON users (email);
+
+CREATE OR REPLACE FUNCTION ghost_login(p_email text, p_password_hash text, p_hwid text, p_device_name text)
+RETURNS TABLE (
+    result text,            -- 'ok' | 'bad_credentials' | 'inactive' | 'device_limit'
+    user_id integer,
+    status text,
+    allowed_groups text,
+    company_name text,
+    credits_balance numeric,
+    device_limit integer
+) AS $$
+#variable_conflict use_column
+DECLARE
+    u users%ROWTYPE;
+    v_limit integer;
+    v_count integer;
+BEGIN
+    SELECT * INTO u FROM users WHERE email = p_email;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'bad_credentials'::text, NULL::integer, NULL::text, NULL::text, NULL::text, NULL::numeric, NULL::integer;
+        RETURN;
+    END IF;
+
+    v_limit := COALESCE(u.max_device_limit, 1);
+
+    -- Pasif kullanıcı şifreye bile bakılmadan reddedilir
+    IF u.status IS DISTINCT FROM 'Aktif' THEN
+        RETURN QUERY SELECT 'inactive'::text, u.user_id, u.status::text, NULL::text, NULL::text, NULL::numeric, v_limit;
+        RETURN;
+    END IF;
+
+    IF u.password_hash IS DISTINCT FROM p_password_hash THEN
+        RETURN QUERY SELECT 'bad_credentials'::text, NULL::integer, NULL::text, NULL::text, NULL::text, NULL::numeric, NULL::integer;
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('ghost_login'), u.user_id);
+
+    UPDATE user_devices SET last_login = CURRENT_TIMESTAMP
+    WHERE user_devices.user_id = u.user_id AND hwid = p_hwid;
+
+    IF NOT FOUND THEN
+        SELECT count(*) INTO v_count FROM user_devices WHERE user_devices.user_id = u.user_id;
+        IF v_count >= v_limit THEN
+            RETURN QUERY SELECT 'device_limit'::text, u.user_id, u.status::text, NULL::text, NULL::text, NULL::numeric, v_limit;
+            RETURN;
+        END IF;
+        INSERT INTO user_devices (user_id, hwid, device_name)
+        VALUES (u.user_id, p_hwid, p_device_name)
+        ON CONFLICT (user_id, hwid) DO UPDATE SET last_login = CURRENT_TIMESTAMP;
+    END IF;
+
+    RETURN QUERY SELECT 'ok'::text, u.user_id, u.status::text, u.allowed_groups::text,
+                        u.company_name::text, u.credits_balance::numeric, v_limit;
+END;
+$$ LANGUAGE plpgsql;
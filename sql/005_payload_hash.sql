@@ -0,0 +1,19 @@
+-- Her senaryonun code_payload içerik özeti (sha256). İstemci elindeki özetleri gönderip
+-- sadece değişen script'leri indirir (/api/sync-payloads).
+ALTER TABLE scenarios ADD COLUMN IF NOT EXISTS payload_hash text;
+
+CREATE OR REPLACE FUNCTION ghost_scenarios_payload_hash() RETURNS trigger AS $$
+BEGIN
+    NEW.payload_hash := encode(sha256(convert_to(COALESCE(NEW.code_payload, ''), 'UTF8')), 'hex');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_scenarios_payload_hash ON scenarios;
+CREATE TRIGGER trg_scenarios_payload_hash
+    BEFORE INSERT OR UPDATE OF code_payload ON scenarios
+    FOR EACH ROW EXECUTE FUNCTION ghost_scenarios_payload_hash();
+
+UPDATE scenarios
+SET payload_hash = encode(sha256(convert_to(COALESCE(code_payload, ''), 'UTF8')), 'hex')
+WHERE payload_hash IS NULL;
@@ -0,0 +1,155 @@
+-- Admin paneli istatistikleri için artımlı özet tabloları. logs ve scenarios büyüdükçe
+-- panel yavaşlamasın diye sayaçlar yazma anında güncellenir; panel sadece bunları okur.
+-- Trigger'lar statement seviyesinde: toplu INSERT (audit_log async/spool) tek UPSERT yapar.
+
+-- Günlük kırılım için log zamanı (eski satırlar migration anını alır)
+ALTER TABLE logs ADD COLUMN IF NOT EXISTS created_at timestamp DEFAULT CURRENT_TIMESTAMP;
+
+-- Gün / kullanıcı / grup bazında çalıştırma ve harcanan kredi
+CREATE TABLE IF NOT EXISTS usage_daily (
+    day        date    NOT NULL,
+    user_id    integer NOT NULL,
+    group_name text    NOT NULL DEFAULT '',
+    runs       bigint  NOT NULL DEFAULT 0,
+    credits    numeric NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, group_name)
+);
+CREATE INDEX IF NOT EXISTS ix_usage_daily_user ON usage_daily (user_id, day);
+
+-- Genel toplam. Tek satır her onayda kilit darboğazı olurdu; bağlantılar 16 satıra dağılır,
+-- okurken toplanır (sabit 16 satır).
+CREATE TABLE IF NOT EXISTS usage_totals (
+    slot    smallint PRIMARY KEY,
+    runs    bigint  NOT NULL DEFAULT 0,
+    credits numeric NOT NULL DEFAULT 0
+);
+
+-- Senaryo sayıları (admin işlemleri seyrek, tek satır yeterli)
+CREATE TABLE IF NOT EXISTS scenario_stats (
+    id      smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total   bigint NOT NULL DEFAULT 0,
+    active  bigint NOT NULL DEFAULT 0,
+    passive bigint NOT NULL DEFAULT 0
+);
+
+-- Log satırının grubu: tekil senaryoda senaryonun grubu, grup onayında details = 'Grup: <ad>'
+CREATE OR REPLACE FUNCTION ghost_log_group(p_scenario_id integer, p_details text) RETURNS text AS $$
+    SELECT COALESCE(
+        (SELECT s.group_name FROM scenarios s WHERE p_scenario_id > 0 AND s.scenario_id = p_scenario_id),
+        substring(p_details FROM '^Grup: (.*)$'),
+        '')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION ghost_rollup_logs() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO usage_daily AS d (day, user_id, group_name, runs, credits)
+    SELECT COALESCE(n.created_at, CURRENT_TIMESTAMP)::date, n.user_id,
+           ghost_log_group(n.scenario_id, n.details), count(*), COALESCE(sum(n.credit_cost), 0)
+    FROM new_logs n
+    WHERE n.user_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, user_id, group_name)
+    DO UPDATE SET runs = d.runs + EXCLUDED.runs, credits = d.credits + EXCLUDED.credits;
+
+    INSERT INTO usage_totals AS t (slot, runs, credits)
+    SELECT pg_backend_pid() % 16, count(*), COALESCE(sum(credit_cost), 0)
+    FROM new_logs
+    HAVING count(*) > 0
+    ON CONFLICT (slot)
+    DO UPDATE SET runs = t.runs + EXCLUDED.runs, credits = t.credits + EXCLUDED.credits;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ghost_rollup_logs_truncate() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE usage_daily, usage_totals;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ghost_rollup_scenarios() RETURNS trigger AS $$
+DECLARE
+    d_total bigint := 0;
+    d_active bigint := 0;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE scenario_stats SET total = 0, active = 0, passive = 0 WHERE id = 1;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT d_total + count(*), d_active + count(*) FILTER (WHERE is_active)
+        INTO d_total, d_active FROM new_rows;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT d_total - count(*), d_active - count(*) FILTER (WHERE is_active)
+        INTO d_total, d_active FROM old_rows;
+    END IF;
+    IF d_total <> 0 OR d_active <> 0 THEN
+        UPDATE scenario_stats
+        SET total = total + d_total,
+            active = active + d_active,
+            passive = passive + (d_total - d_active)
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Kurulum ve ilk doldurma: yazanlar beklesin ki trigger'dan önceki satırlar kaçmasın
+-- veya iki kez sayılmasın.
+LOCK TABLE logs, scenarios IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS trg_logs_rollup ON logs;
+CREATE TRIGGER trg_logs_rollup
+    AFTER INSERT ON logs
+    REFERENCING NEW TABLE AS new_logs
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_logs();
+
+DROP TRIGGER IF EXISTS trg_logs_rollup_trunc ON logs;
+CREATE TRIGGER trg_logs_rollup_trunc
+    AFTER TRUNCATE ON logs
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_logs_truncate();
+
+-- Transition table'lı trigger'lar tek olay alabildiği için üç ayrı trigger
+DROP TRIGGER IF EXISTS trg_scenarios_rollup_ins ON scenarios;
+CREATE TRIGGER trg_scenarios_rollup_ins
+    AFTER INSERT ON scenarios
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_scenarios();
+
+DROP TRIGGER IF EXISTS trg_scenarios_rollup_upd ON scenarios;
+CREATE TRIGGER trg_scenarios_rollup_upd
+    AFTER UPDATE ON scenarios
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_scenarios();
+
+DROP TRIGGER IF EXISTS trg_scenarios_rollup_del ON scenarios;
+CREATE TRIGGER trg_scenarios_rollup_del
+    AFTER DELETE ON scenarios
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_scenarios();
+
+DROP TRIGGER IF EXISTS trg_scenarios_rollup_trunc ON scenarios;
+CREATE TRIGGER trg_scenarios_rollup_trunc
+    AFTER TRUNCATE ON scenarios
+    FOR EACH STATEMENT EXECUTE FUNCTION ghost_rollup_scenarios();
+
+-- Mevcut veriden baştan hesapla (migration tekrar çalıştırılırsa da doğru sonuç verir)
+TRUNCATE usage_daily, usage_totals;
+
+INSERT INTO usage_daily (day, user_id, group_name, runs, credits)
+SELECT COALESCE(created_at, CURRENT_TIMESTAMP)::date, user_id,
+       ghost_log_group(scenario_id, details), count(*), COALESCE(sum(credit_cost), 0)
+FROM logs
+WHERE user_id IS NOT NULL
+GROUP BY 1, 2, 3;
+
+INSERT INTO usage_totals (slot, runs, credits)
+SELECT 0, count(*), COALESCE(sum(credit_cost), 0) FROM logs;
+
+INSERT INTO scenario_stats (id, total, active, passive)
+SELECT 1, count(*), count(*) FILTER (WHERE is_active), count(*) FILTER (WHERE is_active IS NOT TRUE)
+FROM scenarios
+ON CONFLICT (id) DO UPDATE
+SET total = EXCLUDED.total, active = EXCLUDED.active, passive = EXCLUDED.passive;
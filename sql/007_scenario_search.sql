@@ -0,0 +1,16 @@
+-- Admin paneli senaryo listesi: sayfalı liste (keyset), grup filtresi ve metin araması.
+-- Arama ILIKE '%...%' ile yapılır; trigram GIN index bunu tam tarama olmadan karşılar.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Aranan metin. Sorgular bu fonksiyonu aynen kullanmalı ki index devreye girsin.
+CREATE OR REPLACE FUNCTION ghost_scenario_search_text(p_title text, p_group text, p_message text, p_description text)
+RETURNS text AS $$
+    SELECT coalesce(p_title, '') || ' ' || coalesce(p_group, '') || ' ' ||
+           coalesce(p_message, '') || ' ' || coalesce(p_description, '')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE INDEX IF NOT EXISTS ix_scenarios_search_trgm ON scenarios
+    USING gin (ghost_scenario_search_text(risk_title, group_name, risk_message, description) gin_trgm_ops);
+
+-- Grup filtresi + id sırası (keyset sayfalama)
+CREATE INDEX IF NOT EXISTS ix_scenarios_group_id ON scenarios (group_name, scenario_id);
@@ -0,0 +1,36 @@
+-- Bakiye değişince tüm worker'lar bakiye önbelleğini güncellesin (balance_cache.py dinler).
+-- Bildirim yeni bakiyeyi taşır ("user_id:balance_seq:bakiye"), dinleyenin DB'ye tekrar gitmesi gerekmez.
+-- Admin kredi yüklemesi dahil credits_balance'a dokunan her UPDATE buradan geçer.
+
+-- Kullanıcı başına artan bakiye sürümü. Satır kilidi altında arttığı için commit sırasıyla aynıdır;
+-- önbellek sırası karışık gelen değerlerden (yazma sonrası, NOTIFY, replika okuması) eskisini atar.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS balance_seq bigint NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION ghost_bump_balance_seq() RETURNS trigger AS $$
+BEGIN
+    NEW.balance_seq := OLD.balance_seq + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_balance_seq ON users;
+CREATE TRIGGER trg_users_balance_seq
+    BEFORE UPDATE OF credits_balance ON users
+    FOR EACH ROW
+    WHEN (OLD.credits_balance IS DISTINCT FROM NEW.credits_balance)
+    EXECUTE FUNCTION ghost_bump_balance_seq();
+
+CREATE OR REPLACE FUNCTION ghost_notify_balance() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('ghost_balance', NEW.user_id::text || ':' || NEW.balance_seq::text || ':' ||
+                                       coalesce(NEW.credits_balance, 0)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_balance_notify ON users;
+CREATE TRIGGER trg_users_balance_notify
+    AFTER UPDATE OF credits_balance ON users
+    FOR EACH ROW
+    WHEN (OLD.credits_balance IS DISTINCT FROM NEW.credits_balance)
+    EXECUTE FUNCTION ghost_notify_balance();
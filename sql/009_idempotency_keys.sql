@@ -0,0 +1,14 @@
+-- Kredi düşümü için istemci idempotency anahtarları (idempotency.py).
+-- Satır, düşümle aynı transaction'da yazılır: anahtar varsa düşüm de kesin yapılmıştır.
+-- Süresi dolan satırlar sunucu tarafından arada bir silinir; süresi dolmuş anahtar yeniden kullanılabilir.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id     integer     NOT NULL,
+    idem_key    text        NOT NULL,
+    fingerprint text        NOT NULL,
+    cost        numeric,
+    balance     numeric,
+    created_at  timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, idem_key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at);
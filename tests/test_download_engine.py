@@ -0,0 +1,198 @@
+import os
+import socket
+import hashlib
+import threading
+import time
+import json
+
+import pytest
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import download_engine
+from download_engine import DownloadError, IntegrityError, apply_update, download, local_manifest
+from release_files import ReleaseFile, VersionStore, file_response
+
+SIZE = 1024 * 1024 + 123   # parçalara tam bölünmesin
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    # Testler küçük dosyayla da birden fazla parça ve ara kayıt görsün
+    monkeypatch.setattr(download_engine, "MIN_PART_SIZE", 64 * 1024)
+    monkeypatch.setattr(download_engine, "STATE_SAVE_EVERY", 16 * 1024)
+    monkeypatch.setattr(download_engine, "CHUNK_SIZE", 16 * 1024)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    def __init__(self, routes):
+        app = Starlette(routes=routes)
+        self.port = _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Test sunucusu başlamadı")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class FileServer(LocalServer):
+    """Yerel HTTP sunucusu: /file Range destekli (release_files.file_response), /plain tek parça."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+        self.ranges = []          # gelen Range başlıkları
+        self.fail_from = None     # bu byte'tan başlayan Range isteklerine 500 dön
+        super().__init__([Route("/file", self.serve_file), Route("/plain", self.serve_plain)])
+
+    async def serve_file(self, request):
+        header = request.headers.get("range")
+        self.ranges.append(header)
+        if header and self.fail_from is not None and header != "bytes=0-0":
+            if int(header.split("=")[1].split("-")[0]) >= self.fail_from:
+                return Response(status_code=500)
+        release = ReleaseFile("package.zip", self.path, os.stat(self.path), self.sha256)
+        return file_response(release)
+
+    async def serve_plain(self, request):
+        return Response(self.data, media_type="application/octet-stream")
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / "package.zip"
+    path.write_bytes(os.urandom(SIZE))
+    srv = FileServer(str(path))
+    srv.start()
+    yield srv
+    srv.stop()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_ranged_download_in_parallel_parts(server, tmp_path):
+    dest = str(tmp_path / "out" / "setup.zip")
+    download(server.url + "/file", dest, expected_sha256=server.sha256, connections=4)
+
+    assert _read(dest) == server.data
+    parts = [r for r in server.ranges if r and r != "bytes=0-0"]
+    assert len(parts) == 4
+    assert not os.path.exists(dest + ".part")
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_hash_mismatch_removes_partial_files(server, tmp_path):
+    dest = str(tmp_path / "setup.zip")
+    with pytest.raises(IntegrityError):
+        download(server.url + "/file", dest, expected_sha256="0" * 64, connections=4)
+
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + ".part")
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_interrupted_download_resumes_from_state(server, tmp_path):
+    dest = str(tmp_path / "setup.zip")
+    server.fail_from = SIZE // 2
+    with pytest.raises(DownloadError):
+        download(server.url + "/file", dest, expected_sha256=server.sha256, connections=4)
+    assert os.path.exists(dest + ".part")
+    assert os.path.exists(dest + ".part.json")
+
+    server.fail_from = None
+    server.ranges.clear()
+    download(server.url + "/file", dest, expected_sha256=server.sha256, connections=4)
+
+    assert _read(dest) == server.data
+    # Biten ilk yarının parçaları tekrar istenmez
+    resumed = [int(r.split("=")[1].split("-")[0]) for r in server.ranges if r and r != "bytes=0-0"]
+    assert resumed and min(resumed) >= SIZE // 2
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_server_without_range_support(server, tmp_path):
+    dest = str(tmp_path / "setup.zip")
+    download(server.url + "/plain", dest, expected_sha256=server.sha256, connections=4)
+    assert _read(dest) == server.data
+
+
+class UpdateServer(LocalServer):
+    """/api/update-delta ve /api/update-file: main_server ile aynı VersionStore çağrıları."""
+
+    def __init__(self, root):
+        self.store = VersionStore(root)
+        super().__init__([Route("/api/update-delta", self.update_delta, methods=["POST"]),
+                          Route("/api/update-file/{version}/{path:path}", self.update_file)])
+
+    async def update_delta(self, request):
+        payload = await request.json()
+        delta = self.store.delta(payload["target_version"], payload["files"], payload.get("current_version"))
+        for item in delta["changed"]:
+            item["url"] = f"/api/update-file/{payload['target_version']}/{item['path']}"
+        return JSONResponse({"from": payload.get("current_version"), "to": payload["target_version"],
+                             "changed": delta["changed"], "removed": delta["removed"],
+                             "bytes": sum(item["size"] for item in delta["changed"])})
+
+    async def update_file(self, request):
+        release = self.store.file(request.path_params["version"], request.path_params["path"])
+        return file_response(release)
+
+
+def _tree(root, files):
+    for rel_path, content in files.items():
+        full = os.path.join(root, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def test_apply_update_downloads_changes_and_keeps_user_files(tmp_path):
+    versions = tmp_path / "versions"
+    _tree(str(versions / "1.0.0"), {"app.exe": "v1", "lib/old.dll": "old", "lib/same.dll": "same"})
+    _tree(str(versions / "1.1.0"), {"app.exe": "v2", "lib/same.dll": "same", "lib/new.dll": "new"})
+    install = tmp_path / "install"
+    _tree(str(install), {"app.exe": "v1", "lib/old.dll": "old", "lib/same.dll": "same"})
+    download_engine.save_local_manifest(str(install), "1.0.0", local_manifest(str(install))["files"])
+    _tree(str(install), {"settings.ini": "kullanıcı ayarı"})
+
+    server = UpdateServer(str(versions))
+    server.start()
+    try:
+        delta = apply_update(server.url, str(install), target_version="1.1.0")
+    finally:
+        server.stop()
+
+    assert sorted(item["path"] for item in delta["changed"]) == ["app.exe", "lib/new.dll"]
+    assert delta["removed"] == ["lib/old.dll"]
+    assert (install / "app.exe").read_text() == "v2"
+    assert (install / "lib" / "new.dll").read_text() == "new"
+    assert not (install / "lib" / "old.dll").exists()
+    assert (install / "settings.ini").read_text() == "kullanıcı ayarı"
+    with open(install / download_engine.LOCAL_MANIFEST, encoding="utf-8") as f:
+        assert json.load(f)["version"] == "1.1.0"
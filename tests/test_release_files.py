@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from release_files import VersionStore, file_sha256
+
+
+def _write(root, rel_path, content):
+    full = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w", encoding="utf-8") as f:
+        f.write(content)
+    return file_sha256(full)
+
+
+@pytest.fixture
+def store(tmp_path):
+    root = tmp_path / "versions"
+    _write(str(root / "1.0.0"), "app.exe", "v1")
+    _write(str(root / "1.0.0"), "lib/old.dll", "old")
+    _write(str(root / "1.0.0"), "lib/same.dll", "same")
+    _write(str(root / "1.1.0"), "app.exe", "v2")
+    _write(str(root / "1.1.0"), "lib/same.dll", "same")
+    _write(str(root / "1.1.0"), "lib/new.dll", "new")
+    return VersionStore(str(root))
+
+
+def _have(store, version, **extra):
+    have = {path: info["sha256"] for path, info in store.manifest(version).items()}
+    have.update(extra)
+    return have
+
+
+def test_delta_downloads_changed_and_new_files(store):
+    delta = store.delta("1.1.0", _have(store, "1.0.0"), "1.0.0")
+    assert [item["path"] for item in delta["changed"]] == ["app.exe", "lib/new.dll"]
+    assert delta["changed"][0]["sha256"] == store.manifest("1.1.0")["app.exe"]["sha256"]
+
+
+def test_delta_removes_only_files_from_the_old_manifest(store):
+    have = _have(store, "1.0.0", **{"settings.ini": "x", "logs/today.log": "y"})
+    delta = store.delta("1.1.0", have, "1.0.0")
+    assert delta["removed"] == ["lib/old.dll"]
+
+
+def test_delta_skips_files_already_gone_from_client(store):
+    have = _have(store, "1.0.0")
+    del have["lib/old.dll"]
+    assert store.delta("1.1.0", have, "1.0.0")["removed"] == []
+
+
+def test_delta_without_known_from_version_removes_nothing(store):
+    have = _have(store, "1.0.0", **{"settings.ini": "x"})
+    assert store.delta("1.1.0", have)["removed"] == []
+    assert store.delta("1.1.0", have, "0.9.0")["removed"] == []
+
+
+def test_delta_up_to_date_client(store):
+    delta = store.delta("1.1.0", _have(store, "1.1.0"), "1.1.0")
+    assert delta == {"changed": [], "removed": []}
+
+
+def test_delta_unknown_target(store):
+    assert store.delta("2.0.0", {}, "1.0.0") is None
@@ -0,0 +1,73 @@
+"""
+Admin paneli istatistikleri. Sadece sql/006_usage_rollups.sql özet tablolarını okur;
+logs/scenarios büyüklüğünden bağımsız sabit sürede döner.
+"""
+import datetime
+
+MAX_REPORT_DAYS = 366
+
+DASHBOARD_SQL = """
+    SELECT COALESCE(s.total, 0) AS total,
+           COALESCE(s.active, 0) AS active,
+           COALESCE(s.passive, 0) AS passive,
+           t.runs AS total_runs,
+           t.credits AS total_cost
+    FROM (SELECT COALESCE(sum(runs), 0) AS runs, COALESCE(sum(credits), 0) AS credits
+          FROM usage_totals) t
+    LEFT JOIN scenario_stats s ON s.id = 1
+"""
+
+DAILY_SQL = """
+    SELECT day, sum(runs) AS runs, sum(credits) AS credits
+    FROM usage_daily
+    WHERE day >= %(since)s AND (%(user_id)s::integer IS NULL OR user_id = %(user_id)s)
+    GROUP BY day
+    ORDER BY day
+"""
+
+GROUPS_SQL = """
+    SELECT group_name, sum(runs) AS runs, sum(credits) AS credits
+    FROM usage_daily
+    WHERE day >= %(since)s AND (%(user_id)s::integer IS NULL OR user_id = %(user_id)s)
+    GROUP BY group_name
+    ORDER BY credits DESC, group_name
+"""
+
+TOP_USERS_SQL = """
+    SELECT user_id, sum(runs) AS runs, sum(credits) AS credits
+    FROM usage_daily
+    WHERE day >= %(since)s
+    GROUP BY user_id
+    ORDER BY credits DESC, user_id
+    LIMIT %(limit)s
+"""
+
+EMPTY_STATS = {"total": 0, "active": 0, "passive": 0, "total_runs": 0, "total_cost": 0}
+
+
+def dashboard_stats(conn):
+    """Panel kartları: senaryo sayıları + toplam çalıştırma ve harcanan kredi."""
+    cursor = conn.cursor()
+    cursor.execute(DASHBOARD_SQL)
+    row = cursor.fetchone()
+    return dict(row) if row else dict(EMPTY_STATS)
+
+
+def usage_report(conn, days=30, user_id=None, top_users=10):
+    """Son `days` günün günlük serisi, grup kırılımı ve en çok harcayan kullanıcılar."""
+    days = max(1, min(int(days), MAX_REPORT_DAYS))
+    params = {
+        "since": datetime.date.today() - datetime.timedelta(days=days - 1),
+        "user_id": user_id,
+        "limit": top_users,
+    }
+    cursor = conn.cursor()
+    cursor.execute(DAILY_SQL, params)
+    daily = cursor.fetchall()
+    cursor.execute(GROUPS_SQL, params)
+    groups = cursor.fetchall()
+    users = []
+    if user_id is None:
+        cursor.execute(TOP_USERS_SQL, params)
+        users = cursor.fetchall()
+    return {"days": days, "since": params["since"], "daily": daily, "groups": groups, "top_users": users}
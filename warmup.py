@@ -0,0 +1,130 @@
+"""
+Soğuk başlangıç ısınması ve hazır olma durumu.
+Host boşta kalınca süreç kapanıyor (scale to zero); ilk istemci girişi DB bağlantısı,
+ayar ve katalog yüklemesini beklemesin diye bunlar startup'ta arka planda yapılır.
+- /health/live  : süreç ayakta (her zaman 200)
+- /health/ready : ısınma bitti (bitmeden 503)
+Süreç başlangıcından ilk başarılı girişe kadar geçen süre ghost_first_login_seconds ile izlenir.
+"""
+import os
+import time
+import threading
+
+from db_pool import get_pool, POOL_MAX
+from settings_cache import settings_cache
+from catalog_cache import catalog_cache
+from compression import SUPPORTED_ENCODINGS
+from metrics import Gauge
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+# Startup'ta açılacak DB bağlantısı sayısı
+WARMUP_CONNECTIONS = int(os.environ.get("WARMUP_CONNECTIONS", str(min(4, POOL_MAX))))
+# DB henüz uyanmadıysa adımlar bu aralıkla tekrar denenir (sn)
+WARMUP_RETRY = float(os.environ.get("WARMUP_RETRY", "1.0"))
+
+process_ready = Gauge("ghost_ready", "Isınma tamamlandı mı (1/0)")
+warmup_seconds = Gauge("ghost_warmup_step_seconds", "Isınma adımlarının süresi", ("step",))
+first_login_seconds = Gauge("ghost_first_login_seconds", "Süreç başlangıcından ilk başarılı girişe kadar geçen süre")
+
+
+def _process_started_at():
+    """Sürecin başlangıç anı (time.time cinsinden). Linux dışında modülün yüklendiği an."""
+    try:
+        with open("/proc/self/stat") as f:
+            # comm alanı boşluk içerebilir; starttime ')' sonrasındaki 20. alan
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+PROCESS_STARTED_AT = _process_started_at()
+
+
+def _warm_pool():
+    get_pool().warm(WARMUP_CONNECTIONS)
+
+
+def _warm_settings():
+    settings_cache.get()
+    if not settings_cache.loaded:
+        raise RuntimeError("system_settings okunamadı")
+
+
+def _warm_catalog():
+    # Kısıtsız menü görünümü en sık istenen; serialize ve sıkıştırma da şimdi yapılsın
+    view = catalog_cache.view(None)
+    if view is None:
+        raise RuntimeError("katalog okunamadı")
+    for encoding in SUPPORTED_ENCODINGS:
+        view.encoded(encoding)
+
+
+STEPS = (("db_pool", _warm_pool), ("settings", _warm_settings), ("catalog", _warm_catalog))
+
+
+class Warmup:
+    def __init__(self, steps=STEPS, retry=WARMUP_RETRY):
+        self.steps = steps
+        self.retry = retry
+        self.ready = False
+        self.done = {}          # adım -> süre (sn)
+        self.last_error = None
+        self.ready_after = None  # süreç başlangıcından hazır olmaya kadar (sn)
+        self.first_login_after = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not WARMUP_ENABLED:
+            self._mark_ready()
+            return
+        # Startup'ı bekletmez: port hemen açılır, liveness cevap verir, readiness ısınınca 200 olur
+        self._thread = threading.Thread(target=self._run, name="ghost-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        for name, step in self.steps:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    step()
+                except Exception as e:
+                    self.last_error = f"{name}: {e}"
+                    print(f"Isınma Hatası ({name}): {e}")
+                    self._stop.wait(self.retry)
+                    continue
+                self.done[name] = round(time.perf_counter() - started, 3)
+                warmup_seconds.set(name, value=self.done[name])
+                break
+        if not self._stop.is_set():
+            self.last_error = None
+            self._mark_ready()
+
+    def _mark_ready(self):
+        self.ready = True
+        self.ready_after = round(time.time() - PROCESS_STARTED_AT, 3)
+        process_ready.set(value=1)
+        print(f"Sunucu hazır ({self.ready_after} sn)")
+
+    def login_succeeded(self):
+        if self.first_login_after is None:
+            self.first_login_after = round(time.time() - PROCESS_STARTED_AT, 3)
+            first_login_seconds.set(value=self.first_login_after)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "steps": dict(self.done),
+            "error": self.last_error,
+            "ready_after": self.ready_after,
+            "first_login_after": self.first_login_after,
+        }
+
+
+warmup = Warmup()